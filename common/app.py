@@ -0,0 +1,225 @@
+"""
+This module contains the application factory and launcher shared by the services.
+
+`create_app` builds the FastAPI application of a service: the lifespan initializing and closing the logging,
+tracing, profiler, slow query log and database pool, the middleware stack, the exception handlers,
+the management and batch routers, then the routers of the service. The service passes its warm-up callbacks
+and, for its own startup and shutdown, a lifespan entered once the database pool is open and exited
+once the requests in flight are drained, before the pool is closed.
+
+`run_app` is the `__main__` launcher of a service: it optionally auto-sizes the workers and the pool
+(see `common.sizing`), then runs the application with uvicorn.
+"""
+
+import logging
+import os
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
+from typing import AsyncIterator, Awaitable, Callable, Sequence
+from fastapi import APIRouter, FastAPI, Request, Response, HTTPException, status
+from fastapi.responses import RedirectResponse
+from psycopg import AsyncConnection
+import uvicorn
+
+from common.exceptions import AppException, HTTP_NOT_FOUND
+from common.database.postgresql import (
+    init_db_connection,
+    open_db_connection,
+    close_db_connection,
+    pool_connection,
+)
+from common.batch.routers import batch_router
+from common.management.routers import (
+    health_router,
+    metrics_router,
+    ping_router,
+    profile_router,
+    slow_queries_router,
+    traces_router,
+)
+from common.middleware.compression import CompressionMiddleware
+from common.middleware.drain import DrainMiddleware, drain, drain_on_signal
+from common.negotiation import negotiated_response
+from common.observability.access_log import AccessLogMiddleware
+from common.observability.logs import setup_logging, shutdown_logging
+from common.observability.loop_monitor import start_loop_monitor, stop_loop_monitor
+from common.observability.profiler import init_profiler
+from common.observability.slow_queries import (
+    init_slow_query_log,
+    close_slow_query_log,
+)
+from common.observability.tracing import TracingMiddleware, init_tracing, close_tracing
+from common.settings import ServiceSettings
+from common.sizing import auto_size
+
+
+def create_app(
+    settings: ServiceSettings,
+    routers: Sequence[APIRouter],
+    warm_ups: list[Callable[[AsyncConnection], Awaitable[None]]] | None = None,
+    service_lifespan: Callable[[], AbstractAsyncContextManager[None]] | None = None,
+    database: bool = True,
+) -> FastAPI:
+    """
+    Creates the application of a service.
+
+    Args:
+        settings (ServiceSettings): The settings of the service.
+        routers (Sequence[APIRouter]): The routers of the service, included after the management and batch routers.
+        warm_ups (list[Callable[[AsyncConnection], Awaitable[None]]] | None, optional): The callbacks executing
+            the hot read statements of the service on every new database connection.
+        service_lifespan (Callable[[], AbstractAsyncContextManager[None]] | None, optional): The startup
+            and shutdown of the service, entered once the database pool is open and exited after the drain.
+        database (bool, optional): Whether the service uses the database. Defaults to True.
+
+    Returns:
+        FastAPI: The application.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        """
+        Function that handles startup and shutdown events.
+        https://fastapi.tiangolo.com/advanced/events/
+        """
+        setup_logging(settings.log_level, settings.log_queue_size)
+        init_tracing(
+            settings.title,
+            settings.tracing_sample_rate,
+            settings.tracing_buffer_size,
+            settings.tracing_path or None,
+            settings.tracing_remote_rate_limit,
+        )
+        init_profiler(settings.profiler_token)
+        if settings.slow_query_log:
+            init_slow_query_log(
+                settings.slow_query_threshold,
+                settings.slow_query_explain_rate,
+                pool_connection,
+                settings.slow_query_log_path,
+            )
+        if database:
+            init_db_connection(
+                settings.database_url,
+                {
+                    "min_size": settings.pool_min_size,
+                    "max_size": settings.pool_max_size,
+                },
+                warm_ups,
+            )
+            await open_db_connection(wait=settings.pool_warm_up)
+        async with service_lifespan() if service_lifespan else nullcontext():
+            drain_on_signal(settings.drain_delay)
+            start_loop_monitor(
+                settings.loop_monitor_interval,
+                settings.loop_block_threshold if settings.debug else None,
+            )
+            yield
+            await stop_loop_monitor()
+            await drain(settings.drain_grace_period)
+        await close_slow_query_log()
+        close_tracing()
+        if database:
+            await close_db_connection()
+        shutdown_logging()
+
+    app = FastAPI(
+        lifespan=lifespan,
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        debug=settings.debug,
+        title=settings.title,
+        description=settings.description,
+        version=settings.version,
+    )
+
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.access_log_sample_rate,
+        slow_threshold=settings.access_log_slow_threshold,
+    )
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        level=settings.compression_level,
+        thread_minimum_size=settings.compression_thread_minimum_size,
+        cache_size=settings.compression_cache_size,
+    )
+    app.add_middleware(DrainMiddleware)
+
+    @app.exception_handler(AppException)
+    async def app_exception_handler(request: Request, exc: AppException) -> Response:
+        return negotiated_response(
+            request,
+            status_code=exc.status_code,
+            content=exc.content(),
+        )
+
+    @app.exception_handler(status.HTTP_404_NOT_FOUND)
+    async def http_404_exception_handler(
+        request: Request, exc: HTTPException
+    ) -> Response:
+        return negotiated_response(
+            request,
+            status_code=HTTP_NOT_FOUND.status_code,
+            content=HTTP_NOT_FOUND.content(),
+        )
+
+    @app.get("/", include_in_schema=False)
+    @app.get("/api/", include_in_schema=False)
+    async def read_root() -> RedirectResponse:
+        return RedirectResponse(url=app.docs_url if app.docs_url else "/docs")
+
+    # Routers
+    app.include_router(ping_router, include_in_schema=False)
+    app.include_router(health_router, include_in_schema=False)
+    app.include_router(metrics_router, include_in_schema=False)
+    app.include_router(slow_queries_router, include_in_schema=False)
+    app.include_router(traces_router, include_in_schema=False)
+    app.include_router(profile_router, include_in_schema=False)
+    app.include_router(batch_router)
+    for router in routers:
+        app.include_router(router)
+
+    return app
+
+
+def run_app(
+    target: str, settings: ServiceSettings, reserved_per_worker: int = 0
+) -> None:
+    """
+    Runs the application of a service with uvicorn.
+
+    Args:
+        target (str): The import string of the application, e.g. "customers.main:app".
+        settings (ServiceSettings): The settings of the service.
+        reserved_per_worker (int, optional): The number of connections each worker opens outside its pool,
+            reserved in the connection budget when auto-sizing. Defaults to 0.
+    """
+    if settings.auto_size:
+        logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+        settings.workers, settings.pool_min_size, settings.pool_max_size = auto_size(
+            settings.db_connection_budget,
+            settings.pool_min_size,
+            reserved_per_worker,
+        )
+        # Workers are separate processes which load the settings from the environment
+        os.environ["POOL_MIN_SIZE"] = str(settings.pool_min_size)
+        os.environ["POOL_MAX_SIZE"] = str(settings.pool_max_size)
+
+    uvicorn.run(
+        app=target,
+        workers=settings.workers,
+        reload=settings.reload if settings.workers <= 1 else False,
+        host=settings.host,
+        port=settings.port,
+        timeout_graceful_shutdown=int(settings.drain_grace_period),
+        # Requests are logged by AccessLogMiddleware
+        access_log=False,
+    )
+
+
+__all__: list[str] = [
+    "create_app",
+    "run_app",
+]
@@ -0,0 +1,5 @@
+from .batch import router as batch_router
+
+__all__: list[str] = [
+    "batch_router",
+]
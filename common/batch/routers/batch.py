@@ -0,0 +1,182 @@
+"""
+This module contains the batch endpoint.
+It executes an ordered list of API sub-requests in-process, one after another, over a single
+database connection, and returns the status, headers and body of every sub-request.
+
+With `"transaction": true` all sub-requests share one transaction: the first sub-request
+that fails (status >= 400) rolls back the whole batch, and the remaining sub-requests are not executed
+and reported with 424 Failed Dependency.
+Services running without a database (e.g. the in-memory customers repository) execute batches
+without a shared connection, and reject transactions with 400 Bad Request.
+
+The endpoint is accessible at `/api/batch`.
+"""
+
+import json
+from typing import Any
+from urllib.parse import urlsplit
+from fastapi import APIRouter, Request, status
+from psycopg import Rollback
+from starlette.types import Message
+from common.database.postgresql import bind_connection, is_db_initialized
+from common.exceptions import BATCH_TRANSACTION_NOT_SUPPORTED
+from common.negotiation import NegotiatedRoute
+from common.validations import require_json_accept
+from common.batch.schemas import (
+    BatchRequestItemSchema,
+    BatchRequestSchema,
+    BatchResponseItemSchema,
+    BatchResponseSchema,
+)
+
+
+router = APIRouter(
+    prefix="/api/batch",
+    tags=["batch"],
+    route_class=NegotiatedRoute,
+)
+
+
+async def _dispatch(
+    request: Request, item: BatchRequestItemSchema
+) -> BatchResponseItemSchema:
+    """
+    Executes a sub-request against the application and collects its response.
+    """
+    url = urlsplit(item.path)
+    body: bytes = b"" if item.body is None else json.dumps(item.body).encode()
+    # The sub-request body is JSON and the sub-response body is embedded in the JSON batch response,
+    # so the headers describing them cannot be overridden by the item
+    headers: dict[str, str] = {
+        **{name.lower(): value for name, value in item.headers.items()},
+        "accept": "application/json",
+        "content-type": "application/json",
+        "content-length": str(len(body)),
+    }
+    # The sub-response is collected as a whole, so it must not be compressed
+    headers.pop("accept-encoding", None)
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.method,
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ],
+        "state": {},
+    }
+
+    received: bool = False
+
+    async def receive() -> Message:
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    response_status: int = status.HTTP_500_INTERNAL_SERVER_ERROR
+    response_headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def send(message: Message) -> None:
+        nonlocal response_status, response_headers
+        if message["type"] == "http.response.start":
+            response_status = message["status"]
+            response_headers = {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # The error response has already been sent by the server error middleware
+        response_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    content: bytes = b"".join(chunks)
+    response_body: Any = None
+    if content:
+        if response_headers.get("content-type", "").startswith("application/json"):
+            response_body = json.loads(content)
+        else:
+            response_body = content.decode("utf-8", errors="replace")
+    response_headers.pop("content-length", None)
+
+    return BatchResponseItemSchema(
+        status=response_status,
+        headers=response_headers,
+        body=response_body,
+    )
+
+
+@router.post(
+    "",
+    response_model=BatchResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+@router.post(
+    "/",
+    response_model=BatchResponseSchema,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+@require_json_accept
+async def batch(request: Request, batch_data: BatchRequestSchema) -> BatchResponseSchema:
+    """
+    Execute multiple API requests over one database connection.
+
+    Args:
+        request (Request): The incoming request object.
+        batch_data (BatchRequestSchema): The ordered sub-requests and the transaction flag.
+
+    Returns:
+        BatchResponseSchema: The results of the sub-requests, in order.
+
+    Raises:
+        BATCH_TRANSACTION_NOT_SUPPORTED: If a transaction is requested and the service has no database.
+    """
+    if batch_data.transaction and not is_db_initialized():
+        raise BATCH_TRANSACTION_NOT_SUPPORTED
+
+    responses: list[BatchResponseItemSchema] = []
+    committed: bool = True
+
+    async with bind_connection(transaction=batch_data.transaction):
+        for item in batch_data.requests:
+            response: BatchResponseItemSchema = await _dispatch(request, item)
+            responses.append(response)
+            if batch_data.transaction and response.status >= 400:
+                committed = False
+                break
+
+        if not committed:
+            responses.extend(
+                BatchResponseItemSchema(
+                    status=status.HTTP_424_FAILED_DEPENDENCY,
+                    headers={},
+                    body=None,
+                )
+                for _ in batch_data.requests[len(responses) :]
+            )
+            raise Rollback()
+
+    return BatchResponseSchema(
+        committed=committed,
+        responses=responses,
+    )
+
+
+__all__: list[str] = [
+    "router",
+]
@@ -0,0 +1,13 @@
+from .batch import (
+    BatchRequestItemSchema,
+    BatchRequestSchema,
+    BatchResponseItemSchema,
+    BatchResponseSchema,
+)
+
+__all__: list[str] = [
+    "BatchRequestItemSchema",
+    "BatchRequestSchema",
+    "BatchResponseItemSchema",
+    "BatchResponseSchema",
+]
@@ -0,0 +1,168 @@
+"""
+This module defines the schemas for the /api/batch endpoint.
+
+The BatchRequestItemSchema class represents a single sub-request with fields for method, path, headers and body.
+The BatchRequestSchema class represents an ordered list of sub-requests and the transaction flag.
+The BatchResponseItemSchema class represents the result of a single sub-request with fields for status, headers and body.
+The BatchResponseSchema class represents the ordered list of results and whether the transaction was committed.
+"""
+
+from typing import Any, Literal
+from pydantic import BaseModel, ConfigDict, field_validator
+
+
+MAX_BATCH_SIZE: int = 100
+
+
+class BatchRequestItemSchema(BaseModel):
+    """
+    Batch sub-request object
+    """
+
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    path: str
+    # Accept and Content-Type are always JSON, whatever the item sets
+    headers: dict[str, str] = {}
+    body: Any = None
+
+    @field_validator("path")
+    @classmethod
+    def path_validator(cls, v: str) -> str:
+        """
+        Validate path field
+        """
+        if not v.startswith("/api/") or v.startswith("/api/batch"):
+            raise ValueError("Field 'path' must be an API path other than /api/batch")
+        return v
+
+    model_config: ConfigDict = {
+        "extra": "forbid",
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "method": "POST",
+                    "path": "/api/customers/",
+                    "body": {
+                        "name": "John Doe",
+                        "email": "john@example.com",
+                    },
+                }
+            ]
+        },
+    }
+
+
+class BatchRequestSchema(BaseModel):
+    """
+    Batch request object
+    """
+
+    transaction: bool = False
+    requests: list[BatchRequestItemSchema]
+
+    @field_validator("requests")
+    @classmethod
+    def requests_validator(
+        cls, v: list[BatchRequestItemSchema]
+    ) -> list[BatchRequestItemSchema]:
+        if len(v) == 0:
+            raise ValueError("Batch cannot be empty")
+        if len(v) > MAX_BATCH_SIZE:
+            raise ValueError(
+                f"Batch must not contain more than {MAX_BATCH_SIZE} requests"
+            )
+        return v
+
+    model_config: ConfigDict = {
+        "extra": "forbid",
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "transaction": False,
+                    "requests": [
+                        {
+                            "method": "POST",
+                            "path": "/api/customers/",
+                            "body": {
+                                "name": "John Doe",
+                                "email": "john@example.com",
+                            },
+                        },
+                        {
+                            "method": "GET",
+                            "path": "/api/customers/?name=John%20Doe",
+                        },
+                    ],
+                }
+            ]
+        },
+    }
+
+
+class BatchResponseItemSchema(BaseModel):
+    """
+    Batch sub-response object
+    """
+
+    status: int
+    headers: dict[str, str]
+    body: Any
+
+    model_config: ConfigDict = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "status": 201,
+                    "headers": {
+                        "content-type": "application/json",
+                    },
+                    "body": {
+                        "id": "00000000-0000-0000-0000-000000000000",
+                        "name": "John Doe",
+                        "email": "john@example.com",
+                    },
+                }
+            ]
+        },
+    }
+
+
+class BatchResponseSchema(BaseModel):
+    """
+    Batch response object
+    """
+
+    committed: bool
+    responses: list[BatchResponseItemSchema]
+
+    model_config: ConfigDict = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "committed": True,
+                    "responses": [
+                        {
+                            "status": 201,
+                            "headers": {
+                                "content-type": "application/json",
+                            },
+                            "body": {
+                                "id": "00000000-0000-0000-0000-000000000000",
+                                "name": "John Doe",
+                                "email": "john@example.com",
+                            },
+                        }
+                    ],
+                }
+            ]
+        },
+    }
+
+
+__all__: list[str] = [
+    "MAX_BATCH_SIZE",
+    "BatchRequestItemSchema",
+    "BatchRequestSchema",
+    "BatchResponseItemSchema",
+    "BatchResponseSchema",
+]
@@ -0,0 +1,257 @@
+"""
+This module manages an optional cache shared by all worker processes on a host.
+It provides functions to initialize, read, write, delete and close the cache.
+
+The cache is a fixed-size hash table stored in a memory-mapped file (by default in `/dev/shm`).
+Every worker maps the same file, so a value stored by one worker is visible to all others.
+
+The table is split into buckets of `CACHE_WAYS` slots, each slot holding one value of at most `slot_size` bytes.
+When a bucket is full, the slot closest to expiration is evicted.
+
+Reads are lock-free: every slot carries a sequence number which is odd while the slot is being written,
+so a reader that observes a changing sequence number treats the lookup as a miss.
+Writes lock only the bucket they modify, using a POSIX record lock on the backing file.
+
+Every worker holds a shared lock (`flock`) on the backing file while it maps it. The layout is (re)initialized
+only if no other process holds that lock: a worker whose configuration doesn't match the layout of a file
+mapped by running workers refuses to start, rather than resizing the file under them.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+CACHE_MAGIC: bytes = b"SHMCACH1"
+CACHE_WAYS: int = 8
+
+_HEADER: struct.Struct = struct.Struct("<8sIII")
+_HEADER_SIZE: int = 64
+# sequence, key, expires at, value length
+_SLOT: struct.Struct = struct.Struct("<Q16sdI4x")
+_SEQUENCE: struct.Struct = struct.Struct("<Q")
+
+
+class SharedMemoryCache:
+    """
+    Fixed-size hash table stored in a memory-mapped file.
+
+    Attributes:
+        path (str): The path of the backing file.
+        slots (int): The total number of slots, rounded up to a multiple of `CACHE_WAYS`.
+        slot_size (int): The maximum size of a value in bytes.
+        ttl (float): The number of seconds a value is kept in the cache.
+    """
+
+    def __init__(self, path: str, slots: int, slot_size: int, ttl: float) -> None:
+        if fcntl is None:
+            raise Exception("Shared memory cache is not supported on this platform")
+        if slots <= 0 or slot_size <= 0:
+            raise Exception("Shared memory cache size must be greater than 0")
+
+        self.path: str = path
+        self.buckets: int = -(-slots // CACHE_WAYS)
+        self.slots: int = self.buckets * CACHE_WAYS
+        self.slot_size: int = slot_size
+        self.ttl: float = ttl
+        self._stride: int = _SLOT.size + slot_size
+        self._bucket_size: int = self._stride * CACHE_WAYS
+        size: int = _HEADER_SIZE + self._bucket_size * self.buckets
+
+        self._fd: int = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Workers start concurrently, so the layout is checked and (re)initialized under an exclusive file lock
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                header: bytes = os.pread(self._fd, _HEADER.size, 0)
+                expected: bytes = _HEADER.pack(
+                    CACHE_MAGIC, self.slots, slot_size, CACHE_WAYS
+                )
+                if os.fstat(self._fd).st_size != size or header != expected:
+                    # Truncating a file mapped by other processes would crash them with SIGBUS on their next access
+                    try:
+                        fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        raise Exception(
+                            f"Shared memory cache {path} is in use with a different configuration"
+                        ) from None
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, expected, 0)
+                # Held until the file is closed, so that no other process resizes it meanwhile
+                fcntl.flock(self._fd, fcntl.LOCK_SH)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            self._mm: mmap.mmap = mmap.mmap(self._fd, size)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def _bucket(self, key: bytes) -> int:
+        # Python's hash() is randomized per process, so a stable digest is used to agree across workers
+        digest: bytes = hashlib.blake2b(key, digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.buckets
+
+    def get(self, key: bytes) -> bytes | None:
+        """
+        Returns the value stored for the key, or None if it is missing, expired or being written.
+        """
+        mm: mmap.mmap = self._mm
+        start: int = _HEADER_SIZE + self._bucket(key) * self._bucket_size
+        now: float = time.time()
+        for offset in range(start, start + self._bucket_size, self._stride):
+            sequence, slot_key, expires, length = _SLOT.unpack_from(mm, offset)
+            if slot_key != key:
+                continue
+            if sequence & 1 or expires < now:
+                return None
+            value: bytes = mm[offset + _SLOT.size : offset + _SLOT.size + length]
+            if _SEQUENCE.unpack_from(mm, offset)[0] != sequence:
+                return None
+            return value
+        return None
+
+    def set(self, key: bytes, value: bytes) -> bool:
+        """
+        Stores the value for the key, evicting the slot closest to expiration if the bucket is full.
+
+        Returns:
+            bool: False if the value is larger than the slot size and was not stored.
+        """
+        if len(value) > self.slot_size:
+            return False
+
+        bucket: int = self._bucket(key)
+        start: int = _HEADER_SIZE + bucket * self._bucket_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_size, start)
+        try:
+            mm: mmap.mmap = self._mm
+            victim: int = start
+            victim_expires: float = float("inf")
+            for offset in range(start, start + self._bucket_size, self._stride):
+                _, slot_key, expires, _ = _SLOT.unpack_from(mm, offset)
+                if slot_key == key:
+                    victim = offset
+                    break
+                if expires < victim_expires:
+                    victim, victim_expires = offset, expires
+
+            sequence: int = _SEQUENCE.unpack_from(mm, victim)[0] | 1
+            _SEQUENCE.pack_into(mm, victim, sequence)
+            mm[victim + _SLOT.size : victim + _SLOT.size + len(value)] = value
+            _SLOT.pack_into(
+                mm, victim, sequence, key, time.time() + self.ttl, len(value)
+            )
+            _SEQUENCE.pack_into(mm, victim, sequence + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_size, start)
+        return True
+
+    def delete(self, key: bytes) -> None:
+        """
+        Removes the value stored for the key, if any.
+        """
+        start: int = _HEADER_SIZE + self._bucket(key) * self._bucket_size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_size, start)
+        try:
+            mm: mmap.mmap = self._mm
+            for offset in range(start, start + self._bucket_size, self._stride):
+                sequence, slot_key, _, _ = _SLOT.unpack_from(mm, offset)
+                if slot_key == key:
+                    _SLOT.pack_into(mm, offset, (sequence | 1) + 1, bytes(16), 0.0, 0)
+                    break
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_size, start)
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the backing file. The file itself is kept for the other workers.
+        """
+        self._mm.close()
+        os.close(self._fd)
+
+
+__cache: SharedMemoryCache | None = None
+
+
+def init_cache(path: str, slots: int, slot_size: int, ttl: float) -> None:
+    """
+    Initializes the shared memory cache.
+
+    Args:
+        path (str): The path of the backing file, shared by all workers.
+        slots (int): The total number of slots.
+        slot_size (int): The maximum size of a value in bytes.
+        ttl (float): The number of seconds a value is kept in the cache.
+
+    Raises:
+        Exception: If the cache is already initialized.
+
+    Example:
+        init_cache("/dev/shm/customers.cache", 65536, 1024, 30.0)
+    """
+    global __cache
+    if __cache is not None:
+        raise Exception("Shared memory cache is already initialized")
+
+    __cache = SharedMemoryCache(path, slots, slot_size, ttl)
+
+
+def close_cache() -> None:
+    """
+    Closes the shared memory cache. Does nothing if the cache is not initialized.
+    """
+    global __cache
+    if __cache is not None:
+        try:
+            __cache.close()
+        finally:
+            __cache = None
+
+
+def is_cache_enabled() -> bool:
+    """
+    Returns True if the shared memory cache is initialized.
+    """
+    return __cache is not None
+
+
+def cache_get(key: bytes) -> bytes | None:
+    """
+    Returns the cached value for the key, or None if it is not cached or the cache is disabled.
+    """
+    return __cache.get(key) if __cache is not None else None
+
+
+def cache_set(key: bytes, value: bytes) -> None:
+    """
+    Stores the value for the key. Does nothing if the cache is disabled.
+    """
+    if __cache is not None:
+        __cache.set(key, value)
+
+
+def cache_delete(key: bytes) -> None:
+    """
+    Removes the value for the key. Does nothing if the cache is disabled.
+    """
+    if __cache is not None:
+        __cache.delete(key)
+
+
+__all__: list[str] = [
+    "SharedMemoryCache",
+    "init_cache",
+    "close_cache",
+    "is_cache_enabled",
+    "cache_get",
+    "cache_set",
+    "cache_delete",
+]
@@ -0,0 +1,133 @@
+"""
+This module contains helpers for conditional HTTP requests.
+
+The `make_etag` function builds a strong entity tag from a resource ID and its version.
+The `etag_matches` function evaluates an `If-None-Match` header against an entity tag.
+The `etag_version` function reads the version of a resource from an `If-Match` header, for conditional updates.
+
+The `add_etag_suffix` and `strip_etag_suffix` functions are used by layers that produce a different
+representation of the same resource (e.g. compressed or MessagePack bodies): the outgoing strong ETag
+gets a suffix, and the suffix is removed from `If-None-Match` before the application compares entity tags.
+"""
+
+from uuid import UUID
+
+
+# The maximum of a PostgreSQL `integer`, the type of e.g. `orders.version`
+_INTEGER_MAX: int = 2**31 - 1
+
+
+def make_etag(resource_id: UUID | str, version: int) -> str:
+    """
+    Builds a strong entity tag for a resource.
+
+    Args:
+        resource_id (UUID | str): The ID of the resource.
+        version (int): The version of the resource, e.g. its last modification time in microseconds.
+
+    Returns:
+        str: The quoted entity tag, e.g. `"0123456789abcdef0123456789abcdef.5f5e100"`.
+    """
+    return f'"{str(resource_id).replace("-", "")}.{version:x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Checks if an `If-None-Match` header matches the entity tag.
+    As required for `If-None-Match`, weak comparison is used, so `W/` prefixes are ignored.
+
+    Args:
+        if_none_match (str): The value of the `If-None-Match` header.
+        etag (str): The current entity tag of the resource.
+
+    Returns:
+        bool: True if the header is `*` or lists the entity tag.
+    """
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def etag_version(
+    if_match: str, resource_id: UUID | str, max_version: int = _INTEGER_MAX
+) -> int | None:
+    """
+    Reads the version of a resource from an `If-Match` header built with `make_etag`.
+    As required for `If-Match`, strong comparison is used, so weak entity tags and `*` do not match;
+    the representation suffix of `add_etag_suffix` is ignored. A version above `max_version`,
+    which no resource can have, does not match either.
+
+    Args:
+        if_match (str): The value of the `If-Match` header.
+        resource_id (UUID | str): The ID of the resource.
+        max_version (int, optional): The maximum version of the resource.
+            Defaults to the maximum of a PostgreSQL `integer`.
+
+    Returns:
+        int | None: The version of the first entity tag of the resource, or None if there is none.
+    """
+    prefix: str = f'"{str(resource_id).replace("-", "")}.'
+    for candidate in if_match.split(","):
+        candidate = candidate.strip()
+        if not candidate.startswith(prefix) or not candidate.endswith('"'):
+            continue
+        digits: str = candidate[len(prefix) : -1].split("-", 1)[0]
+        # Only the lowercase hexadecimal digits of make_etag, int() would also accept e.g. "0x" or "_"
+        if not digits or digits.strip("0123456789abcdef"):
+            continue
+        version: int = int(digits, 16)
+        if version <= max_version:
+            return version
+    return None
+
+
+def add_etag_suffix(etag: str, suffix: str) -> str:
+    """
+    Appends a representation suffix to a strong entity tag, weak entity tags are returned unchanged.
+
+    Example:
+        add_etag_suffix('"abc"', "gzip") == '"abc-gzip"'
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{suffix}"'
+
+
+def strip_etag_suffix(if_none_match: str, suffix: str) -> tuple[str, dict[str, str]]:
+    """
+    Removes a representation suffix from the entity tags of an `If-None-Match` header.
+
+    Args:
+        if_none_match (str): The value of the `If-None-Match` header.
+        suffix (str): The suffix added by `add_etag_suffix`.
+
+    Returns:
+        tuple[str, dict[str, str]]: The header without suffixes, and a mapping of every stripped
+            entity tag to the one sent by the client, used to echo it back in a 304 response.
+    """
+    ending: str = f'-{suffix}"'
+    etags: list[str] = []
+    stripped: dict[str, str] = {}
+    for etag in if_none_match.split(","):
+        etag = etag.strip()
+        if etag.endswith(ending):
+            stripped[etag[: -len(ending)] + '"'] = etag
+            etag = etag[: -len(ending)] + '"'
+        etags.append(etag)
+    return ", ".join(etags), stripped
+
+
+__all__: list[str] = [
+    "make_etag",
+    "etag_matches",
+    "etag_version",
+    "add_etag_suffix",
+    "strip_etag_suffix",
+]
@@ -1,18 +1,46 @@
 """
 This module manages the asynchronous connection pool for PostgreSQL databases.
 It provides functions to initialize, open, get cursor and close the connection pool.
+
+A single pool connection can be bound to the current context with `bind_connection`,
+so that every `get_cursor` call in that context (e.g. all sub-requests of a batch) reuses it,
+optionally inside one shared transaction.
+
+Long-running statements, e.g. bulk exports, use `dedicated_connection` instead, a connection outside the pool
+opened with the same connection string, so that they do not hold pool connections the requests are waiting for.
+
+Every new pool connection is warmed up before it is handed out: the registered warm-up callbacks
+execute and prepare the hot read statements of the service in autocommit mode, in read-only transactions,
+so that the first requests on the connection do not pay for planning and function compilation.
+Statements which write are prepared by their first execution instead.
 """
 
 import contextlib
-from typing import Any, AsyncIterator
-from psycopg import AsyncCursor
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable
+from psycopg import AsyncConnection, AsyncCursor, Error as PsycopgError
 from psycopg_pool import AsyncConnectionPool
-
+from common.observability.access_log import add_db_time, record_db_error
+from common.observability.tracing import TracedCursor, record_span
 
 __pool: AsyncConnectionPool | None = None
+__warm_ups: list[Callable[[AsyncConnection], Awaitable[None]]] = []
+
+logger: logging.Logger = logging.getLogger(__name__)
 
+# The connection bound by `bind_connection` and whether it runs a shared transaction
+_bound_connection: ContextVar[tuple[AsyncConnection, bool] | None] = ContextVar(
+    "bound_connection", default=None
+)
 
-def init_db_connection(db_url: str, pool_config: dict[str, Any] | None = None) -> None:
+
+def init_db_connection(
+    db_url: str,
+    pool_config: dict[str, Any] | None = None,
+    warm_ups: list[Callable[[AsyncConnection], Awaitable[None]]] | None = None,
+) -> None:
     """
     Initializes the asynchronous connection pool for PostgreSQL databases.
 
@@ -20,6 +48,9 @@ def init_db_connection(db_url: str, pool_config: dict[str, Any] | None = None) -
         db_url (str): The URL of the PostgreSQL database.
         pool_config (dict[str, Any] | None, optional): Configuration options for the connection pool.
             If not provided, default values will be used.
+        warm_ups (list[Callable[[AsyncConnection], Awaitable[None]]] | None, optional): Callbacks
+            executing the hot read statements of the service on every new connection, with `prepare=True`,
+            e.g. with `warm_up_statement`.
 
     Raises:
         Exception: If the connection pool is already initialized.
@@ -34,16 +65,69 @@ def init_db_connection(db_url: str, pool_config: dict[str, Any] | None = None) -
     if pool_config:
         pool_config.pop("conninfo", None)
         pool_config.pop("open", None)
+        pool_config.pop("configure", None)
     else:
         pool_config = {}
+    # Open the min_size connections in parallel rather than 3 at a time (the psycopg_pool default)
+    pool_config.setdefault("num_workers", max(3, pool_config.get("min_size", 4)))
+
+    __warm_ups.clear()
+    __warm_ups.extend(warm_ups or [])
+
+    __pool = AsyncConnectionPool(
+        conninfo=db_url, open=False, configure=_warm_up_connection, **pool_config
+    )
+
+
+async def _warm_up_connection(connection: AsyncConnection) -> None:
+    """
+    Runs the warm-up callbacks on a new pool connection, in autocommit mode and with read-only transactions,
+    so that a warm-up never writes nor holds locks, and the prepared statements are kept.
+    A failing callback is logged and does not prevent the connection from being used.
+    """
+    await connection.set_autocommit(True)
+    try:
+        await connection.execute("SET default_transaction_read_only = on")
+        for warm_up in __warm_ups:
+            try:
+                await warm_up(connection)
+            except Exception as e:
+                logger.warning(
+                    "PostgreSQL connection warm-up %s failed: %s",
+                    warm_up.__qualname__,
+                    e,
+                )
+        await connection.execute("RESET default_transaction_read_only")
+    finally:
+        await connection.set_autocommit(False)
 
-    __pool = AsyncConnectionPool(conninfo=db_url, open=False, **pool_config)
+
+async def warm_up_statement(
+    cursor: AsyncCursor, query: str, params: list[Any] | None = None
+) -> None:
+    """
+    Executes and prepares a read statement in a warm-up callback. psycopg only keeps a statement prepared
+    if its first execution succeeds, so the statement must be warmed up with parameters it succeeds with,
+    e.g. those of an existing row for the lookups failing with `no_data_found` on a missing one.
+
+    Args:
+        cursor (AsyncCursor): A cursor of the connection to warm up.
+        query (str): The statement, exactly as executed by the requests.
+        params (list[Any] | None, optional): The parameters of the statement. Defaults to None.
+    """
+    await cursor.execute(query, params, prepare=True)
 
 
-async def open_db_connection() -> None:
+async def open_db_connection(wait: bool = False, timeout: float = 30.0) -> None:
     """
     Opens the connection pool for PostgreSQL databases.
 
+    Args:
+        wait (bool, optional): Whether to wait until the pool holds `min_size` connections,
+            all of them warmed up, so that the first requests do not pay for connecting
+            and preparing statements. Defaults to False.
+        timeout (float, optional): The number of seconds to wait for the pool to fill. Defaults to 30.0.
+
     Raises:
         Exception: If the connection pool is not initialized or unable to open the pool.
     """
@@ -51,7 +135,7 @@ async def open_db_connection() -> None:
         raise Exception("PostgreSQL database is not initialized")
 
     try:
-        await __pool.open()
+        await __pool.open(wait=wait, timeout=timeout)
     except Exception as e:
         raise Exception("Unable to open PostgreSQL database pool:", e)
 
@@ -79,6 +163,9 @@ async def close_db_connection() -> None:
 async def get_cursor() -> AsyncIterator[AsyncCursor]:
     """
     Asynchronously obtains a cursor from the connection pool for PostgreSQL databases.
+    If a connection is bound to the current context by `bind_connection`, the cursor is obtained from it.
+    The time spent and psycopg errors are reported to the access log of the current request,
+    slow statements to the slow query log, and the pool acquisition and statements of traced requests as spans.
 
     Yields:
         AsyncCursor: A cursor object for executing SQL queries.
@@ -86,23 +173,164 @@ async def get_cursor() -> AsyncIterator[AsyncCursor]:
     Raises:
         Exception: If the connection pool is not initialized or unable to obtain a cursor.
     """
+    started: float = time.perf_counter()
+    try:
+        bound: tuple[AsyncConnection, bool] | None = _bound_connection.get()
+        if bound is not None:
+            # Inside a shared transaction this is a savepoint, otherwise a transaction of its own
+            async with bound[0].transaction():
+                async with TracedCursor(bound[0]) as cursor:
+                    yield cursor
+            return
+
+        if __pool is None:
+            raise Exception("PostgreSQL database is not initialized")
+
+        acquire_started: int = time.time_ns()
+        async with __pool.connection() as connection:
+            record_span("db.pool.acquire", acquire_started, time.time_ns())
+            async with TracedCursor(connection) as cursor:
+                try:
+                    yield cursor
+                except Exception:
+                    await connection.rollback()
+                    raise
+                else:
+                    await connection.commit()
+    except PsycopgError as e:
+        record_db_error(e)
+        raise
+    finally:
+        add_db_time(time.perf_counter() - started)
+
+
+@contextlib.asynccontextmanager
+async def bind_connection(
+    transaction: bool = False,
+) -> AsyncIterator[AsyncConnection | None]:
+    """
+    Asynchronously obtains a connection from the pool and binds it to the current context,
+    so that `get_cursor` reuses it instead of checking out a connection for every call.
+    Raising `psycopg.Rollback` inside the block rolls the shared transaction back.
+    Without a transaction, the block runs without a connection if the pool is not initialized,
+    e.g. for services running without a database.
+
+    Args:
+        transaction (bool, optional): Whether to run all statements in one transaction.
+            Each `get_cursor` block then runs in a savepoint. Defaults to False.
+
+    Yields:
+        AsyncConnection | None: The bound connection, None if the pool is not initialized.
+
+    Raises:
+        Exception: If the connection pool is not initialized for a transaction, or a connection is already bound.
+    """
     if __pool is None:
-        raise Exception("PostgreSQL database is not initialized")
+        if transaction:
+            raise Exception("PostgreSQL database is not initialized")
+        yield None
+        return
+    if _bound_connection.get() is not None:
+        raise Exception("PostgreSQL connection is already bound")
 
     async with __pool.connection() as connection:
-        async with connection.cursor() as cursor:
-            try:
-                yield cursor
-            except Exception:
-                await connection.rollback()
-                raise
+        token = _bound_connection.set((connection, transaction))
+        try:
+            if transaction:
+                async with connection.transaction():
+                    yield connection
             else:
-                await connection.commit()
+                yield connection
+        finally:
+            _bound_connection.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def dedicated_connection() -> AsyncIterator[AsyncConnection]:
+    """
+    Asynchronously opens a connection outside the pool, with the connection string of the pool,
+    and closes it at the end of the block. The connection is in autocommit mode.
+    psycopg errors are reported to the access log of the current request.
+
+    Yields:
+        AsyncConnection: The dedicated connection.
+
+    Raises:
+        Exception: If the connection pool is not initialized.
+    """
+    if __pool is None:
+        raise Exception("PostgreSQL database is not initialized")
+
+    try:
+        async with await AsyncConnection.connect(
+            __pool.conninfo, autocommit=True
+        ) as connection:
+            yield connection
+    except PsycopgError as e:
+        record_db_error(e)
+        raise
+
+
+@contextlib.asynccontextmanager
+async def pool_connection(timeout: float) -> AsyncIterator[AsyncConnection]:
+    """
+    Asynchronously obtains a connection from the pool for background work outside a request,
+    e.g. capturing the plan of a slow statement, waiting at most `timeout` seconds for it.
+    The connection is returned to the pool at the end of the block.
+
+    Args:
+        timeout (float): The maximum number of seconds to wait for a connection.
+
+    Yields:
+        AsyncConnection: The pool connection.
+
+    Raises:
+        Exception: If the connection pool is not initialized.
+        psycopg_pool.PoolTimeout: If no connection is available within the timeout.
+    """
+    if __pool is None:
+        raise Exception("PostgreSQL database is not initialized")
+
+    async with __pool.connection(timeout=timeout) as connection:
+        yield connection
+
+
+def is_db_initialized() -> bool:
+    """
+    Returns True if the connection pool is initialized, i.e. the service uses a database.
+    """
+    return __pool is not None
+
+
+def in_shared_transaction() -> bool:
+    """
+    Returns True if the current context runs in a transaction shared by `bind_connection`,
+    i.e. changes made by `get_cursor` blocks may still be rolled back.
+    """
+    bound: tuple[AsyncConnection, bool] | None = _bound_connection.get()
+    return bound is not None and bound[1]
+
+
+def get_pool_stats() -> dict[str, int]:
+    """
+    Returns the statistics of the connection pool, e.g. `pool_size`, `pool_available` and `requests_waiting`,
+    or an empty dictionary if the pool is not initialized.
+    """
+    if __pool is None:
+        return {}
+    return __pool.get_stats()
 
 
 __all__: list[str] = [
     "init_db_connection",
     "open_db_connection",
+    "warm_up_statement",
     "get_cursor",
+    "bind_connection",
+    "dedicated_connection",
+    "pool_connection",
+    "is_db_initialized",
+    "in_shared_transaction",
     "close_db_connection",
+    "get_pool_stats",
 ]
@@ -61,8 +61,53 @@ HTTP_NOT_FOUND: AppException = AppException(
     "not_found",
 )
 
+
+SERVICE_UNAVAILABLE: AppException = AppException(
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    [
+        "http",
+    ],
+    "Service is shutting down",
+    "service_unavailable",
+)
+
+HTTP_FORBIDDEN: AppException = AppException(
+    status.HTTP_403_FORBIDDEN,
+    [
+        "http",
+        "headers",
+        "Authorization",
+    ],
+    "Not allowed",
+    "forbidden",
+)
+
+
+PROFILER_BUSY: AppException = AppException(
+    status.HTTP_409_CONFLICT,
+    [
+        "http",
+    ],
+    "A profile is already running",
+    "conflict",
+)
+
+BATCH_TRANSACTION_NOT_SUPPORTED: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "body",
+        "transaction",
+    ],
+    "Transactions are not supported without a database",
+    "bad_request",
+)
+
 __all__: list[str] = [
     "AppException",
     "MUST_ACCEPT_JSON",
     "HTTP_NOT_FOUND",
+    "SERVICE_UNAVAILABLE",
+    "HTTP_FORBIDDEN",
+    "PROFILER_BUSY",
+    "BATCH_TRANSACTION_NOT_SUPPORTED",
 ]
@@ -0,0 +1,116 @@
+"""
+This module contains the ID type of the schemas and the generation of IDs by the application.
+
+Random version 4 UUIDs scatter the inserts over the whole primary key index. Version 7 UUIDs (RFC 9562)
+start with the Unix time in milliseconds, so new rows are appended to the right-most index pages,
+which keeps the index compact and its hot pages cached. They are opt-in:
+- in the database, `db_scripts/uuid7.sql` switches the defaults of the ID columns to `ecommerce.uuid_generate_v7()`
+- in the application, `init_ids(7)` makes `new_id` generate them, e.g. for the in-memory repository
+
+The `ID` type accepts both versions, so existing version 4 IDs stay valid after switching.
+Like the `UUID4` type it replaces, an invalid ID fails with a single error at the location of the field:
+`uuid_parsing` if it is not a UUID, `uuid_version` if it is a UUID of another version.
+"""
+
+import os
+import threading
+import time
+from typing import Annotated
+from uuid import UUID, uuid4
+
+from pydantic import AfterValidator
+from pydantic_core import PydanticCustomError
+
+ID_VERSIONS: tuple[int, ...] = (4, 7)
+
+_version: int = 4
+_lock: threading.Lock = threading.Lock()
+_last_ms: int = 0
+_last_random: int = 0
+
+
+def _validate_version(value: UUID) -> UUID:
+    """
+    Validates the version of an ID, with the error type of the pydantic UUID4 type.
+    """
+    if value.version not in ID_VERSIONS:
+        raise PydanticCustomError(
+            "uuid_version",
+            "UUID version 4 or 7 expected",
+            {"expected_version": ID_VERSIONS},
+        )
+    return value
+
+
+# A single validator, not a union of the UUID versions, which would report one error per version
+ID = Annotated[UUID, AfterValidator(_validate_version)]
+
+
+def uuid7() -> UUID:
+    """
+    Generates a version 7 UUID.
+    IDs generated by the process in the same millisecond are ordered too: the 74 random bits
+    of the previous ID are incremented, and the time is advanced when they overflow.
+
+    Returns:
+        UUID: The generated UUID.
+    """
+    global _last_ms, _last_random
+    with _lock:
+        ms: int = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _last_random = int.from_bytes(os.urandom(10)) >> 6
+        else:
+            _last_random += 1
+            if _last_random >> 74:
+                _last_ms += 1
+                _last_random = 0
+        ms, random_bits = _last_ms, _last_random
+
+    # 48 bits of time, 4 bits of version, 12 + 62 random bits split by 2 bits of variant
+    value: int = (
+        (ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | (random_bits >> 62) << 64
+        | 0x2 << 62
+        | random_bits & 0x3FFFFFFFFFFFFFFF
+    )
+    return UUID(int=value)
+
+
+def init_ids(version: int = 4) -> None:
+    """
+    Sets the version of the IDs generated by `new_id`.
+
+    Args:
+        version (int, optional): 4 for random IDs, 7 for time-ordered IDs. Defaults to 4.
+
+    Raises:
+        Exception: If the version is not supported.
+    """
+    global _version
+    if version not in ID_VERSIONS:
+        raise Exception(
+            f"Unsupported ID version {version}, expected one of {ID_VERSIONS}"
+        )
+    _version = version
+
+
+def new_id() -> UUID:
+    """
+    Generates a new ID of the configured version.
+
+    Returns:
+        UUID: The generated ID.
+    """
+    return uuid7() if _version == 7 else uuid4()
+
+
+__all__: list[str] = [
+    "ID",
+    "ID_VERSIONS",
+    "init_ids",
+    "new_id",
+    "uuid7",
+]
@@ -0,0 +1,34 @@
+"""
+This module contains the authorization of the management endpoints which expose internals of the service,
+e.g. the profiler and the slow query log. They are disabled (404 Not Found) unless a profiler token
+is configured, and require that token as a `Bearer <token>` authorization header (403 Forbidden otherwise).
+"""
+
+import secrets
+from common.exceptions import HTTP_FORBIDDEN, HTTP_NOT_FOUND
+from common.observability.profiler import profiler_token
+
+
+def verify_management_token(authorization: str) -> None:
+    """
+    Verifies the authorization header of a request to a protected management endpoint.
+
+    Args:
+        authorization (str): The `Bearer <token>` authorization header.
+
+    Raises:
+        AppException: HTTP_NOT_FOUND if no token is configured, HTTP_FORBIDDEN if the token doesn't match.
+    """
+    token: str = profiler_token()
+    if not token:
+        raise HTTP_NOT_FOUND
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        credentials.encode(), token.encode()
+    ):
+        raise HTTP_FORBIDDEN
+
+
+__all__: list[str] = [
+    "verify_management_token",
+]
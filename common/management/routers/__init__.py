@@ -1,7 +1,15 @@
 from .health import router as health_router
+from .metrics import router as metrics_router
 from .ping import router as ping_router
+from .profile import router as profile_router
+from .slow_queries import router as slow_queries_router
+from .traces import router as traces_router
 
 __all__: list[str] = [
     "health_router",
+    "metrics_router",
     "ping_router",
+    "profile_router",
+    "slow_queries_router",
+    "traces_router",
 ]
@@ -4,13 +4,16 @@ It provides a simple endpoint to check if the application is running and
 the database connection is working correctly.
 The endpoint returns a JSON response with the status of the application
 and the current timestamp of the database if it is accessible.
+While the application is draining on shutdown, the endpoint returns `DRAINING` with 503 Service Unavailable,
+so that load balancers stop routing requests to it.
 The endpoint is accessible at `/health` and `/health/` (with or without a trailing slash).
 """
 
 from datetime import datetime
 from typing import Any
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
 from common.database.postgresql import get_cursor
+from common.middleware.drain import is_draining
 from common.management.schemas import HealthSchema, HealthStatus
 
 
@@ -32,15 +35,26 @@ router = APIRouter(
     status_code=status.HTTP_200_OK,
     include_in_schema=False,
 )
-async def health() -> HealthSchema:
+async def health(response: Response) -> HealthSchema:
     """
     Health check endpoint.
     Returns a JSON response with the status of the application and the current timestamp of the database if it is accessible.
     If the database connection is not working, the status will be `PG_DOWN` and the timestamp will be `None`.
+    If the application is draining, the status will be `DRAINING` with 503 Service Unavailable.
+
+    Args:
+        response (Response): The response object, used to set the status code while draining.
 
     Returns:
         HealthSchema: A schema containing the status of the application and the current timestamp of the database if it is accessible.
     """
+    if is_draining():
+        response.status_code = 503
+        return HealthSchema(
+            status=HealthStatus.DRAINING,
+            timestamp=None,
+        )
+
     status: HealthStatus = HealthStatus.UP
     timestamp: datetime | None = None
     try:
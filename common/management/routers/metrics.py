@@ -0,0 +1,95 @@
+"""
+This module contains the metrics endpoint.
+It returns the metrics of the worker process serving the request in the Prometheus text format:
+- the event loop lag histogram and the number of times the loop was blocked (see `common.observability.loop_monitor`)
+- the number of HTTP requests in flight
+- the statistics of the database connection pool
+The endpoint is accessible at `/metrics` and `/metrics/` (with or without a trailing slash).
+"""
+
+from typing import Any
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from common.database.postgresql import get_pool_stats
+from common.middleware.drain import in_flight_requests
+from common.observability.loop_monitor import loop_lag
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+)
+
+
+def _metric(name: str, kind: str, help: str, samples: list[str]) -> str:
+    return "\n".join([f"# HELP {name} {help}", f"# TYPE {name} {kind}"] + samples)
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+@router.get(
+    "/",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+async def metrics() -> PlainTextResponse:
+    """
+    Metrics endpoint.
+    Returns the metrics of the worker process in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics.
+    """
+    lag: dict[str, Any] = loop_lag()
+    families: list[str] = [
+        _metric(
+            "event_loop_lag_seconds",
+            "histogram",
+            "Delay of the event loop in running a scheduled callback.",
+            [
+                f'event_loop_lag_seconds_bucket{{le="{"+Inf" if bound == float("inf") else bound}"}} {count}'
+                for bound, count in lag["buckets"].items()
+            ]
+            + [
+                f"event_loop_lag_seconds_sum {lag['sum']}",
+                f"event_loop_lag_seconds_count {lag['count']}",
+            ],
+        ),
+        _metric(
+            "event_loop_lag_last_seconds",
+            "gauge",
+            "Last measured event loop lag.",
+            [f"event_loop_lag_last_seconds {lag['last']}"],
+        ),
+        _metric(
+            "event_loop_blocked_total",
+            "counter",
+            "Number of times the event loop was blocked longer than the threshold, in debug mode.",
+            [f"event_loop_blocked_total {lag['blocked']}"],
+        ),
+        _metric(
+            "http_requests_in_flight",
+            "gauge",
+            "Number of HTTP requests in flight.",
+            [f"http_requests_in_flight {in_flight_requests()}"],
+        ),
+    ]
+    for name, value in get_pool_stats().items():
+        families.append(
+            _metric(
+                f"db_pool_{name}",
+                "gauge",
+                f"Database connection pool statistic {name}.",
+                [f"db_pool_{name} {value}"],
+            )
+        )
+    return PlainTextResponse("\n".join(families) + "\n")
+
+
+__all__: list[str] = [
+    "router",
+]
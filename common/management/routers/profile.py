@@ -0,0 +1,71 @@
+"""
+This module contains the sampling profiler endpoint.
+It samples the stacks of the threads and asyncio tasks of the worker process serving the request
+for the requested number of seconds and returns them as collapsed stacks, ready for flame graph tools, e.g.
+`curl -H "Authorization: Bearer $TOKEN" "localhost:8000/profile?seconds=10&rate=100" | flamegraph.pl > profile.svg`.
+The endpoint is disabled (404 Not Found) unless a profiler token is configured, and requires that token.
+The endpoint is accessible at `/profile` and `/profile/` (with or without a trailing slash).
+"""
+
+import os
+from fastapi import APIRouter, Header, Query, status
+from fastapi.responses import PlainTextResponse
+from common.exceptions import PROFILER_BUSY
+from common.management.authorization import verify_management_token
+from common.observability.profiler import is_profiling, profile
+
+
+router = APIRouter(
+    prefix="/profile",
+    tags=["Profile"],
+)
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+@router.get(
+    "/",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+async def get_profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    rate: int = Query(100, ge=1, le=1000),
+    authorization: str = Header(""),
+) -> PlainTextResponse:
+    """
+    Sampling profiler endpoint.
+    Returns the collapsed stacks of the worker process, one `frame;frame;frame count` line per distinct stack.
+
+    Args:
+        seconds (float): The number of seconds to sample for. Defaults to 5.
+        rate (int): The number of samples per second. Defaults to 100.
+        authorization (str): The `Bearer <token>` authorization header.
+
+    Returns:
+        PlainTextResponse: The collapsed stacks, with the worker process ID and the number of samples in headers.
+    """
+    verify_management_token(authorization)
+    if is_profiling():
+        raise PROFILER_BUSY
+
+    stacks: str
+    samples: int
+    stacks, samples = await profile(seconds, rate)
+    return PlainTextResponse(
+        stacks,
+        headers={
+            "X-Profile-Pid": str(os.getpid()),
+            "X-Profile-Samples": str(samples),
+        },
+    )
+
+
+__all__: list[str] = [
+    "router",
+]
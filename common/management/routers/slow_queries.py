@@ -0,0 +1,55 @@
+"""
+This module contains the slow query log endpoint.
+It returns the recent statements slower than the slow query log threshold, most recent first,
+with their normalized SQL, parameter shapes, duration and, for the sampled ones, their plan.
+The endpoint is disabled (404 Not Found) unless a profiler token is configured, and requires that token.
+The endpoint is accessible at `/slow-queries` and `/slow-queries/` (with or without a trailing slash).
+"""
+
+from fastapi import APIRouter, Header, status
+from common.management.authorization import verify_management_token
+from common.management.schemas import SlowQueriesSchema
+from common.observability.slow_queries import is_slow_query_log_enabled, slow_queries
+
+
+router = APIRouter(
+    prefix="/slow-queries",
+    tags=["Slow queries"],
+)
+
+
+@router.get(
+    "",
+    response_model=SlowQueriesSchema,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+@router.get(
+    "/",
+    response_model=SlowQueriesSchema,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+async def get_slow_queries(authorization: str = Header("")) -> SlowQueriesSchema:
+    """
+    Slow query log endpoint.
+    Returns the recent slow statements, or an empty list if the slow query log is disabled.
+
+    Args:
+        authorization (str): The `Bearer <token>` authorization header.
+
+    Returns:
+        SlowQueriesSchema: A schema containing the recent slow statements.
+    """
+    verify_management_token(authorization)
+    return SlowQueriesSchema.model_validate(
+        {
+            "enabled": is_slow_query_log_enabled(),
+            "queries": slow_queries(),
+        }
+    )
+
+
+__all__: list[str] = [
+    "router",
+]
@@ -0,0 +1,54 @@
+"""
+This module contains the traces endpoint.
+It returns the recent sampled request traces, most recent first, as an OTLP JSON document,
+which can be imported into OpenTelemetry compatible tools.
+The spans carry SQL statements and request paths with IDs, so the endpoint is disabled (404 Not Found)
+unless a profiler token is configured, and requires that token.
+The endpoint is accessible at `/traces` and `/traces/` (with or without a trailing slash).
+"""
+
+from typing import Any
+
+from fastapi import APIRouter, Header, Query, status
+from common.management.authorization import verify_management_token
+from common.observability.tracing import recent_traces
+
+router = APIRouter(
+    prefix="/traces",
+    tags=["Traces"],
+)
+
+
+@router.get(
+    "",
+    response_model=None,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+@router.get(
+    "/",
+    response_model=None,
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False,
+)
+async def get_traces(
+    limit: int = Query(20, ge=1, le=1000), authorization: str = Header("")
+) -> dict[str, Any]:
+    """
+    Traces endpoint.
+    Returns the recent traces, or no spans if tracing is disabled.
+
+    Args:
+        limit (int): The maximum number of traces to return. Defaults to 20.
+        authorization (str): The `Bearer <token>` authorization header.
+
+    Returns:
+        dict[str, Any]: An OTLP JSON document containing the spans of the recent traces.
+    """
+    verify_management_token(authorization)
+    return recent_traces(limit)
+
+
+__all__: list[str] = [
+    "router",
+]
@@ -1,6 +1,9 @@
 from .health import HealthSchema, HealthStatus
+from .slow_queries import SlowQueriesSchema, SlowQuerySchema
 
 __all__: list[str] = [
     "HealthSchema",
     "HealthStatus",
+    "SlowQueriesSchema",
+    "SlowQuerySchema",
 ]
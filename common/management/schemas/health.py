@@ -1,7 +1,7 @@
 """
 This module defines the schemas for the /health endpoint.
 
-It includes the HealthStatus enum (UP, PG_DOWN), and the HealthSchema class.
+It includes the HealthStatus enum (UP, PG_DOWN, DRAINING), and the HealthSchema class.
 
 The HealthSchema class represent the health status of the application.
 The HealthStatus enum is used to represent the health status of the application, and the timestamp field is used
@@ -16,6 +16,7 @@ from pydantic import BaseModel
 class HealthStatus(StrEnum):
     UP = "UP"
     PG_DOWN = "PG_DOWN"
+    DRAINING = "DRAINING"
 
 
 class HealthSchema(BaseModel):
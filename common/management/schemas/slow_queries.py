@@ -0,0 +1,48 @@
+"""
+This module defines the schemas for the /slow-queries endpoint.
+
+The SlowQuerySchema class represents a statement slower than the slow query log threshold,
+with its normalized SQL, the shapes of its parameters, its duration and its plan, if captured.
+The SlowQueriesSchema class represents the recent slow statements, most recent first.
+"""
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class SlowQuerySchema(BaseModel):
+    """
+    Slow query object.
+
+    Attributes:
+        time (datetime): The time when the statement completed.
+        query (str): The normalized SQL of the statement.
+        parameters (list[str]): The types and lengths of the parameters, e.g. `str[8]` or `null`.
+        duration_ms (float): The duration of the statement in milliseconds.
+        plan (str | None): The plan of the statement, if it was sampled for EXPLAIN.
+    """
+
+    time: datetime
+    query: str
+    parameters: list[str]
+    duration_ms: float
+    plan: str | None
+
+
+class SlowQueriesSchema(BaseModel):
+    """
+    Slow query log object.
+
+    Attributes:
+        enabled (bool): Whether the slow query log is enabled.
+        queries (list[SlowQuerySchema]): The recent slow statements, most recent first.
+    """
+
+    enabled: bool
+    queries: list[SlowQuerySchema]
+
+
+__all__: list[str] = [
+    "SlowQuerySchema",
+    "SlowQueriesSchema",
+]
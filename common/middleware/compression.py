@@ -0,0 +1,373 @@
+"""
+This module contains the HTTP response compression middleware.
+
+The `CompressionMiddleware` negotiates `zstd`, `br` or `gzip` from the `Accept-Encoding` request header
+and compresses response bodies that are at least `minimum_size` bytes long.
+
+- `gzip` is always available, `br` requires the `brotli` package and `zstd` requires either
+  Python 3.14 (`compression.zstd`) or the `zstandard` package. Unavailable codings are never offered.
+- Bodies of at least `thread_minimum_size` bytes are compressed in a worker thread,
+  so the event loop isn't blocked.
+- Streaming responses are compressed chunk by chunk.
+- Compressed bodies of responses with a strong ETag are kept in a small LRU cache keyed by (ETag, coding),
+  so a cached or unchanged response is compressed only once per worker.
+
+Since a compressed representation differs from the identity one, the coding is appended to strong ETags
+(e.g. `"abc"` becomes `"abc-gzip"`) and removed again from `If-None-Match` request headers,
+so the application keeps comparing its own entity tags.
+"""
+
+import gzip
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Protocol
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.conditional import add_etag_suffix, strip_etag_suffix
+
+EXCLUDED_CONTENT_TYPES: tuple[str, ...] = (
+    "application/gzip",
+    "application/zip",
+    "image/",
+    "audio/",
+    "video/",
+    "text/event-stream",
+)
+
+
+class _StreamCompressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class _Codec:
+    """
+    Content coding with one-shot and streaming compression.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        compress: Callable[[bytes, int], bytes],
+        compressor: Callable[[int], _StreamCompressor],
+        levels: tuple[int, int],
+    ) -> None:
+        self.name: str = name
+        self._compress: Callable[[bytes, int], bytes] = compress
+        self._compressor: Callable[[int], _StreamCompressor] = compressor
+        self._levels: tuple[int, int] = levels
+
+    def level(self, level: int) -> int:
+        return max(self._levels[0], min(level, self._levels[1]))
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        return self._compress(data, self.level(level))
+
+    def compressor(self, level: int) -> _StreamCompressor:
+        return self._compressor(self.level(level))
+
+
+class _BrotliCompressor:
+    def __init__(self, brotli: Any, level: int) -> None:
+        self._compressor: Any = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _load_codecs() -> dict[str, _Codec]:
+    """
+    Returns the available codecs, in the order of server preference.
+    Optional codecs are imported here, so they don't slow down the import of the application.
+    """
+    codecs: dict[str, _Codec] = {}
+
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+
+        codecs["zstd"] = _Codec(
+            "zstd",
+            lambda data, level: zstd.compress(data, level),
+            lambda level: zstd.ZstdCompressor(level),
+            (1, 22),
+        )
+    except ImportError:
+        try:
+            import zstandard  # type: ignore[import-not-found]
+
+            codecs["zstd"] = _Codec(
+                "zstd",
+                lambda data, level: zstandard.ZstdCompressor(level).compress(data),
+                lambda level: zstandard.ZstdCompressor(level).compressobj(),
+                (1, 22),
+            )
+        except ImportError:
+            pass
+
+    try:
+        import brotli  # type: ignore[import-not-found]
+
+        codecs["br"] = _Codec(
+            "br",
+            lambda data, level: brotli.compress(data, quality=level),
+            lambda level: _BrotliCompressor(brotli, level),
+            (0, 11),
+        )
+    except ImportError:
+        pass
+
+    codecs["gzip"] = _Codec(
+        "gzip",
+        lambda data, level: gzip.compress(data, level, mtime=0),
+        lambda level: zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS),
+        (1, 9),
+    )
+    return codecs
+
+
+def negotiate_encoding(accept_encoding: str, available: list[str]) -> str | None:
+    """
+    Selects a content coding from the `Accept-Encoding` header.
+    The coding with the highest quality value wins, ties are resolved by the order of `available`.
+
+    Args:
+        accept_encoding (str): The value of the `Accept-Encoding` header.
+        available (list[str]): The codings supported by the server, in the order of preference.
+
+    Returns:
+        str | None: The selected coding, or None if the response must not be compressed.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        quality: float = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+
+    best: str | None = None
+    best_quality: float = 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses HTTP responses.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        minimum_size (int): The minimum body size in bytes to compress.
+        level (int): The compression level, clamped to the range supported by each coding.
+        thread_minimum_size (int): The minimum body size in bytes to compress in a worker thread.
+        cache_size (int): The number of compressed bodies to keep per worker, 0 disables the cache.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        level: int = 5,
+        thread_minimum_size: int = 64 * 1024,
+        cache_size: int = 256,
+    ) -> None:
+        self.app: ASGIApp = app
+        self.minimum_size: int = minimum_size
+        self.level: int = level
+        self.thread_minimum_size: int = thread_minimum_size
+        self.cache_size: int = cache_size
+        self.codecs: dict[str, _Codec] = _load_codecs()
+        self._cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers: Headers = Headers(scope=scope)
+        coding: str | None = negotiate_encoding(
+            headers.get("Accept-Encoding", ""), list(self.codecs)
+        )
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder: _CompressionResponder = _CompressionResponder(
+            self, self.codecs[coding], send
+        )
+        if_none_match: str | None = headers.get("If-None-Match")
+        if if_none_match:
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, value)
+                for name, value in scope["headers"]
+                if name != b"if-none-match"
+            ]
+            scope["headers"].append(
+                (b"if-none-match", responder.strip_etags(if_none_match).encode())
+            )
+        await self.app(scope, receive, responder.send)
+
+    async def compress(self, codec: _Codec, body: bytes, etag: str | None) -> bytes:
+        """
+        Compresses a complete body, using the cache for responses with a strong ETag.
+        """
+        key: tuple[str, str] | None = (
+            (etag, codec.name) if etag and self.cache_size > 0 else None
+        )
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if len(body) >= self.thread_minimum_size:
+            compressed: bytes = await anyio.to_thread.run_sync(
+                codec.compress, body, self.level
+            )
+        else:
+            compressed = codec.compress(body, self.level)
+
+        if key is not None:
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compressed
+
+
+class _CompressionResponder:
+    """
+    Compresses a single response with the negotiated codec.
+    """
+
+    def __init__(
+        self, middleware: CompressionMiddleware, codec: _Codec, send: Send
+    ) -> None:
+        self._middleware: CompressionMiddleware = middleware
+        self._codec: _Codec = codec
+        self._send: Send = send
+        self._start: Message | None = None
+        self._compressor: _StreamCompressor | None = None
+        self._passthrough: bool = False
+        # Maps the ETags received in If-None-Match to the ones sent by the client
+        self._etags: dict[str, str] = {}
+
+    def strip_etags(self, if_none_match: str) -> str:
+        """
+        Removes the coding suffix from the entity tags in an `If-None-Match` header.
+        """
+        stripped, self._etags = strip_etag_suffix(if_none_match, self._codec.name)
+        return stripped
+
+    def _encode_etag(self, headers: MutableHeaders) -> None:
+        etag: str | None = headers.get("ETag")
+        if etag:
+            headers["ETag"] = add_etag_suffix(etag, self._codec.name)
+
+    async def send(self, message: Message) -> None:
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers: Headers = Headers(raw=message["headers"])
+            content_type: str = headers.get("Content-Type", "")
+            if (
+                "content-encoding" in headers
+                or message["status"] < 200
+                or message["status"] in (204, 206)
+                or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+            ):
+                self._passthrough = True
+                await self._send(message)
+            elif message["status"] == 304:
+                # Not Modified: echo the ETag the client validated, including its coding suffix
+                self._passthrough = True
+                mutable: MutableHeaders = MutableHeaders(raw=message["headers"])
+                etag: str | None = mutable.get("ETag")
+                if etag in self._etags:
+                    mutable["ETag"] = self._etags[etag]
+                await self._send(message)
+            else:
+                self._start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self._compressor is not None:
+            # Remaining chunks of a streaming response
+            data: bytes = self._compressor.compress(body)
+            if not more_body:
+                data += self._compressor.flush()
+            await self._send(
+                {"type": "http.response.body", "body": data, "more_body": more_body}
+            )
+            return
+
+        start: Message | None = self._start
+        if start is None:
+            await self._send(message)
+            return
+
+        self._start = None
+        headers = MutableHeaders(raw=start["headers"])
+        if not more_body and len(body) < self._middleware.minimum_size:
+            self._passthrough = True
+            await self._send(start)
+            await self._send(message)
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+        headers["Content-Encoding"] = self._codec.name
+        if more_body:
+            # First chunk of a streaming response
+            self._compressor = self._codec.compressor(self._middleware.level)
+            del headers["Content-Length"]
+            self._encode_etag(headers)
+            await self._send(start)
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": self._compressor.compress(body),
+                    "more_body": True,
+                }
+            )
+            return
+
+        etag = headers.get("ETag")
+        compressed: bytes = await self._middleware.compress(
+            self._codec,
+            body,
+            etag if etag and not etag.startswith("W/") else None,
+        )
+        headers["Content-Length"] = str(len(compressed))
+        self._encode_etag(headers)
+        self._passthrough = True
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+
+__all__: list[str] = [
+    "CompressionMiddleware",
+    "negotiate_encoding",
+]
@@ -0,0 +1,176 @@
+"""
+This module contains the graceful drain of the application on shutdown.
+
+The `DrainMiddleware` counts the HTTP requests in flight. Once the drain has started:
+- new requests are rejected with 503 Service Unavailable (`SERVICE_UNAVAILABLE`),
+  except the exempt paths, e.g. the health check, which reports `DRAINING` itself
+- requests already in flight are allowed to complete within a grace period
+
+The lifespan calls `drain_on_signal` at startup, so that readiness flips as soon as the server
+receives SIGTERM or SIGINT, and `drain` at shutdown, before the database connection pool is closed.
+`drain` reports how many requests were cut off, i.e. cancelled or still in flight at the end of the grace period.
+"""
+
+import asyncio
+import logging
+import signal
+import threading
+import time
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Callable
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from common.exceptions import SERVICE_UNAVAILABLE
+from common.negotiation import negotiated_response
+
+_draining: bool = False
+_in_flight: int = 0
+_cut_off: int = 0
+
+# Whether the current context already runs inside a counted request, e.g. a batch sub-request
+_in_request: ContextVar[bool] = ContextVar("in_request", default=False)
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def is_draining() -> bool:
+    """
+    Returns True once the drain has started, i.e. the application is not ready for new requests.
+    """
+    return _draining
+
+
+def in_flight_requests() -> int:
+    """
+    Returns the number of HTTP requests in flight.
+    """
+    return _in_flight
+
+
+def start_drain() -> None:
+    """
+    Starts the drain: readiness flips to not ready and new requests are rejected.
+    """
+    global _draining
+    if not _draining:
+        _draining = True
+        logger.info("Draining, %d requests in flight", _in_flight)
+
+
+def drain_on_signal(delay: float = 0.0) -> None:
+    """
+    Starts the drain as soon as the process receives SIGTERM or SIGINT, before the server stops.
+    Resets the drain state, so it is called from the lifespan startup.
+
+    Args:
+        delay (float, optional): The number of seconds between flipping readiness and passing the signal
+            on to the server, giving load balancers time to stop routing requests. Defaults to 0.0.
+    """
+    global _draining, _cut_off
+    _draining = False
+    _cut_off = 0
+
+    # Signal handlers can only be installed in the main thread, e.g. not in a test client
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous: Any = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(
+            signum: int,
+            frame: FrameType | None,
+            previous: Callable[[int, FrameType | None], Any] = previous,
+        ) -> None:
+            start_drain()
+            if delay > 0:
+                loop.call_soon_threadsafe(
+                    loop.call_later, delay, previous, signum, frame
+                )
+            else:
+                previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+
+async def drain(grace_period: float) -> int:
+    """
+    Starts the drain, if not started yet, and waits for the requests in flight to complete.
+
+    Args:
+        grace_period (float): The maximum number of seconds to wait for the requests in flight.
+
+    Returns:
+        int: The number of requests cut off, i.e. cancelled during the drain or still in flight.
+    """
+    start_drain()
+    deadline: float = time.monotonic() + grace_period
+    while _in_flight > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+    cut_off: int = _cut_off + _in_flight
+    if cut_off:
+        logger.warning("Drained, %d requests cut off", cut_off)
+    else:
+        logger.info("Drained, no requests cut off")
+    return cut_off
+
+
+class DrainMiddleware:
+    """
+    ASGI middleware that counts the requests in flight and rejects new requests while draining.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        exempt_paths (tuple[str, ...]): Path prefixes served while draining, e.g. the health check.
+    """
+
+    def __init__(
+        self, app: ASGIApp, exempt_paths: tuple[str, ...] = ("/health", "/ping")
+    ) -> None:
+        self.app: ASGIApp = app
+        self.exempt_paths: tuple[str, ...] = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _in_flight, _cut_off
+        if scope["type"] != "http" or _in_request.get():
+            await self.app(scope, receive, send)
+            return
+
+        if _draining and not scope["path"].startswith(self.exempt_paths):
+            response = negotiated_response(
+                Request(scope),
+                status_code=SERVICE_UNAVAILABLE.status_code,
+                content=SERVICE_UNAVAILABLE.content(),
+                headers={"Connection": "close"},
+            )
+            await response(scope, receive, send)
+            return
+
+        token = _in_request.set(True)
+        _in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        except asyncio.CancelledError:
+            if _draining:
+                _cut_off += 1
+            raise
+        finally:
+            _in_flight -= 1
+            _in_request.reset(token)
+
+
+__all__: list[str] = [
+    "DrainMiddleware",
+    "drain",
+    "drain_on_signal",
+    "in_flight_requests",
+    "is_draining",
+    "start_drain",
+]
@@ -0,0 +1,340 @@
+"""
+This module contains content negotiation between JSON and MessagePack.
+
+JSON stays the default format. Clients that send `Accept: application/msgpack` receive MessagePack responses,
+and clients that send `Content-Type: application/msgpack` may send MessagePack request bodies.
+MessagePack support requires the `msgpack` package, without it only JSON is negotiated.
+
+In MessagePack documents:
+- UUIDs are encoded as 16 raw bytes in the extension type `MSGPACK_UUID_EXT_TYPE`.
+- Datetimes are encoded as the standard MessagePack timestamp extension type (-1), naive datetimes are assumed UTC.
+
+The `NegotiatedRoute` route class applies the negotiation to every route of an `APIRouter`.
+When MessagePack is negotiated, the value returned by the endpoint is validated against the response model
+and encoded as MessagePack directly, without being rendered as JSON first.
+For traced requests it also records the request validation, endpoint and response serialization spans.
+The `negotiated_response` function renders error bodies in the negotiated format.
+"""
+
+import json
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Coroutine
+from uuid import UUID
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+
+from common.conditional import add_etag_suffix, strip_etag_suffix
+from common.observability.tracing import Span, current_span, record_span, span
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+JSON_MEDIA_TYPE: str = "application/json"
+MSGPACK_MEDIA_TYPE: str = "application/msgpack"
+MSGPACK_MEDIA_TYPES: tuple[str, ...] = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+MSGPACK_UUID_EXT_TYPE: int = 1
+MSGPACK_ETAG_SUFFIX: str = "msgpack"
+
+# Whether the current request negotiated a MessagePack response, set by `NegotiatedRoute`
+_msgpack_negotiated: ContextVar[bool] = ContextVar("msgpack_negotiated", default=False)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return msgpack.ExtType(MSGPACK_UUID_EXT_TYPE, value.bytes)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == MSGPACK_UUID_EXT_TYPE:
+        return UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    """
+    Encodes the content as MessagePack, with compact UUIDs and datetimes.
+    """
+    return msgpack.packb(content, default=_msgpack_default)
+
+
+def decode_msgpack(data: bytes) -> Any:
+    """
+    Decodes a MessagePack document, restoring UUIDs and datetimes.
+    """
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, timestamp=3)
+
+
+def negotiate_media_type(accept: str | None) -> str | None:
+    """
+    Selects the response media type from the `Accept` header.
+    The media type with the highest quality value wins, JSON wins ties.
+
+    Args:
+        accept (str | None): The value of the `Accept` header.
+
+    Returns:
+        str | None: `JSON_MEDIA_TYPE`, `MSGPACK_MEDIA_TYPE`, or None if neither is acceptable.
+    """
+    if not accept:
+        return None
+
+    best: str | None = None
+    best_quality: float = 0.0
+    for item in accept.lower().split(","):
+        media_type, *params = item.split(";")
+        media_type = media_type.strip()
+        if media_type == JSON_MEDIA_TYPE:
+            candidate: str = JSON_MEDIA_TYPE
+        elif media_type in MSGPACK_MEDIA_TYPES and msgpack is not None:
+            candidate = MSGPACK_MEDIA_TYPE
+        else:
+            continue
+
+        quality: float = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality or (
+            quality == best_quality and candidate == JSON_MEDIA_TYPE
+        ):
+            best, best_quality = candidate, quality
+    return best
+
+
+class MsgPackResponse(Response):
+    """
+    Response rendered as MessagePack.
+    """
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return encode_msgpack(content)
+
+
+def negotiated_response(
+    request: Request,
+    status_code: int,
+    content: Any,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    Creates a response in the format negotiated from the request `Accept` header, JSON by default.
+
+    Args:
+        request (Request): The incoming request object.
+        status_code (int): The HTTP status code of the response.
+        content (Any): The JSON-compatible content of the response.
+        headers (dict[str, str] | None, optional): Additional response headers.
+
+    Returns:
+        Response: A `MsgPackResponse` if MessagePack was negotiated, otherwise a `JSONResponse`.
+    """
+    if negotiate_media_type(request.headers.get("Accept")) == MSGPACK_MEDIA_TYPE:
+        return MsgPackResponse(content, status_code=status_code, headers=headers)
+    return JSONResponse(content, status_code=status_code, headers=headers)
+
+
+class _MsgPackRequest(Request):
+    """
+    Request with a MessagePack body, presented to FastAPI as a JSON request.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = decode_msgpack(await self.body())
+            except Exception as e:
+                # FastAPI reports JSON decode errors as 422 validation errors
+                raise json.JSONDecodeError(f"Invalid MessagePack body: {e}", "", 0)
+        return self._json
+
+
+def _as_json_request(request: Request) -> Request:
+    scope: dict[str, Any] = dict(request.scope)
+    scope["headers"] = [
+        (name, JSON_MEDIA_TYPE.encode() if name == b"content-type" else value)
+        for name, value in request.scope["headers"]
+    ]
+    return _MsgPackRequest(scope, request.receive)
+
+
+def _traced_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wraps an endpoint function, so that traced requests get an `endpoint` span for it.
+    """
+
+    @wraps(call)
+    async def endpoint(*args: Any, **kwargs: Any) -> Any:
+        if current_span() is None:
+            return await call(*args, **kwargs)
+        with span("endpoint", {"code.function.name": call.__qualname__}):
+            return await call(*args, **kwargs)
+
+    endpoint.__traced__ = True  # type: ignore[attr-defined]
+    return endpoint
+
+
+def _traced_handler(
+    handler: Callable[[Request], Coroutine[Any, Any, Response]],
+) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+    """
+    Wraps a FastAPI route handler, so that traced requests get spans for the request validation,
+    i.e. the time before the endpoint span, and the response serialization, i.e. the time after it.
+    """
+
+    async def traced_handler(request: Request) -> Response:
+        parent: Span | None = current_span()
+        if parent is None:
+            return await handler(request)
+
+        started: int = time.time_ns()
+        response: Response = await handler(request)
+        ended: int = time.time_ns()
+        for child in reversed(parent.trace):
+            if child.name == "endpoint" and child.parent_span_id == parent.span_id:
+                record_span("request.validation", started, child.start_ns)
+                record_span("response.serialization", child.end_ns, ended)
+                break
+        return response
+
+    return traced_handler
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route class that negotiates JSON or MessagePack for request and response bodies.
+
+    JSON responses are produced by FastAPI as usual. For MessagePack the value returned by the endpoint
+    is validated against the route's response model and dumped in Python mode, so UUIDs and datetimes
+    are encoded with their native types in a single MessagePack encoding, and the ETag gets
+    the `-msgpack` suffix as it identifies a different representation.
+
+    Example:
+        router = APIRouter(prefix="/api/customers", route_class=NegotiatedRoute)
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if not hasattr(endpoint, "__traced__"):
+            endpoint = _traced_endpoint(endpoint)
+        self._msgpack_adapter: TypeAdapter | None = None
+        super().__init__(path, self._msgpack_endpoint(endpoint), **kwargs)
+        if self.response_model:
+            self._msgpack_adapter = TypeAdapter(self.response_model)
+
+    def _msgpack_endpoint(self, call: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps an endpoint function, so that its return value is rendered as a `MsgPackResponse`
+        if MessagePack was negotiated, with the status code and headers FastAPI would set.
+        """
+
+        @wraps(call)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            content: Any = await call(*args, **kwargs)
+            if not _msgpack_negotiated.get() or isinstance(content, Response):
+                return content
+
+            with span("response.msgpack"):
+                if self._msgpack_adapter is not None:
+                    try:
+                        content = self._msgpack_adapter.dump_python(
+                            self._msgpack_adapter.validate_python(content)
+                        )
+                    except ValidationError as e:
+                        raise ResponseValidationError(e.errors(), body=content) from e
+                response: Response = MsgPackResponse(
+                    content, status_code=self.status_code or 200
+                )
+            # The response parameter of the endpoint, if it declares one, carries its headers and status code
+            for value in kwargs.values():
+                if isinstance(value, Response):
+                    response.headers.raw.extend(value.headers.raw)
+                    if value.status_code:
+                        response.status_code = value.status_code
+            return response
+
+        endpoint.__traced__ = True  # type: ignore[attr-defined]
+        return endpoint
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler: Callable[[Request], Coroutine[Any, Any, Response]] = _traced_handler(
+            super().get_route_handler()
+        )
+
+        async def negotiated_handler(request: Request) -> Response:
+            content_type: str = request.headers.get("Content-Type", "")
+            if content_type.split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES:
+                request = _as_json_request(request)
+
+            if (
+                negotiate_media_type(request.headers.get("Accept"))
+                != MSGPACK_MEDIA_TYPE
+            ):
+                return await handler(request)
+
+            etags: dict[str, str] = {}
+            if_none_match: str | None = request.headers.get("If-None-Match")
+            if if_none_match:
+                scope: dict[str, Any] = dict(request.scope)
+                stripped, etags = strip_etag_suffix(if_none_match, MSGPACK_ETAG_SUFFIX)
+                scope["headers"] = [
+                    (name, value)
+                    for name, value in request.scope["headers"]
+                    if name != b"if-none-match"
+                ] + [(b"if-none-match", stripped.encode())]
+                request = type(request)(scope, request.receive)
+
+            token = _msgpack_negotiated.set(True)
+            try:
+                response: Response = await handler(request)
+            finally:
+                _msgpack_negotiated.reset(token)
+            etag: str | None = response.headers.get("ETag")
+            if etag:
+                response.headers["ETag"] = etags.get(
+                    etag, add_etag_suffix(etag, MSGPACK_ETAG_SUFFIX)
+                )
+            if not response.headers.get("Content-Type", "").startswith(JSON_MEDIA_TYPE):
+                return response
+
+            # A JSON response built by the endpoint itself
+            with span("response.msgpack"):
+                response.body = encode_msgpack(json.loads(response.body))
+            response.headers["Content-Type"] = MSGPACK_MEDIA_TYPE
+            response.headers["Content-Length"] = str(len(response.body))
+            return response
+
+        return negotiated_handler
+
+
+__all__: list[str] = [
+    "JSON_MEDIA_TYPE",
+    "MSGPACK_MEDIA_TYPE",
+    "MsgPackResponse",
+    "NegotiatedRoute",
+    "decode_msgpack",
+    "encode_msgpack",
+    "negotiate_media_type",
+    "negotiated_response",
+]
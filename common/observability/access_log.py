@@ -0,0 +1,171 @@
+"""
+This module contains the structured access log.
+
+The `AccessLogMiddleware` logs one record per HTTP request to the `access` logger, with the method, path,
+route template, status, latency, the time spent in the database and the number of database calls.
+If a database call failed, the underlying psycopg error is recorded too, even when the CRUD layer
+turned it into an `AppException`. Unhandled exceptions are logged with their traceback.
+
+Under high load, successful fast requests can be sampled with `sample_rate`:
+errors (status >= 400) and requests slower than `slow_threshold` are always logged.
+Each record carries the sample rate, so consumers can weight the sampled records.
+
+Records of traced requests carry the trace ID, so they can be matched with the trace.
+
+The database layer reports its time with `add_db_time` and its errors with `record_db_error`.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.observability.logs import describe_exception
+from common.observability.tracing import Span, current_span
+
+logger: logging.Logger = logging.getLogger("access")
+
+
+class _RequestLog:
+    """
+    Database time, calls and error of the current request.
+    """
+
+    __slots__ = ("db_time", "db_calls", "db_error")
+
+    def __init__(self) -> None:
+        self.db_time: float = 0.0
+        self.db_calls: int = 0
+        self.db_error: BaseException | None = None
+
+
+_request_log: ContextVar[_RequestLog | None] = ContextVar("request_log", default=None)
+
+
+def add_db_time(seconds: float) -> None:
+    """
+    Adds the duration of a database call to the current request, if any.
+    """
+    request_log: _RequestLog | None = _request_log.get()
+    if request_log is not None:
+        request_log.db_time += seconds
+        request_log.db_calls += 1
+
+
+def record_db_error(exc: BaseException) -> None:
+    """
+    Records the error of a database call in the current request, if any.
+    """
+    request_log: _RequestLog | None = _request_log.get()
+    if request_log is not None:
+        request_log.db_error = exc
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware that writes a structured access log record for every HTTP request.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+        sample_rate (float): The fraction of successful requests to log, from 0.0 to 1.0.
+        slow_threshold (float): The latency in seconds above which requests are always logged.
+    """
+
+    def __init__(
+        self, app: ASGIApp, sample_rate: float = 1.0, slow_threshold: float = 1.0
+    ) -> None:
+        self.app: ASGIApp = app
+        self.sample_rate: float = sample_rate
+        self.slow_threshold: float = slow_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        status_code: int = 500
+        error: BaseException | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        parent: _RequestLog | None = _request_log.get()
+        request_log: _RequestLog = _RequestLog()
+        token = _request_log.set(request_log)
+        started: float = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            latency: float = time.perf_counter() - started
+            _request_log.reset(token)
+            # A batch sub-request counts towards the database time of the batch
+            if parent is not None:
+                parent.db_time += request_log.db_time
+                parent.db_calls += request_log.db_calls
+            self._log(scope, status_code, latency, request_log, error)
+
+    def _log(
+        self,
+        scope: Scope,
+        status_code: int,
+        latency: float,
+        request_log: _RequestLog,
+        error: BaseException | None,
+    ) -> None:
+        if (
+            status_code < 400
+            and error is None
+            and latency < self.slow_threshold
+            and self.sample_rate < 1.0
+            and random.random() >= self.sample_rate
+        ):
+            return
+
+        route: Any = scope.get("route")
+        fields: dict[str, Any] = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status_code,
+            "latency_ms": round(latency * 1000, 3),
+            "db_time_ms": round(request_log.db_time * 1000, 3),
+            "db_calls": request_log.db_calls,
+            "client": scope["client"][0] if scope.get("client") else None,
+            "sample_rate": (
+                self.sample_rate
+                if status_code < 400 and latency < self.slow_threshold
+                else 1.0
+            ),
+        }
+        trace: Span | None = current_span()
+        if trace is not None:
+            fields["trace_id"] = trace.trace_id
+        if request_log.db_error is not None:
+            fields["db_error"] = describe_exception(request_log.db_error)
+
+        level: int = logging.ERROR if status_code >= 500 else logging.INFO
+        logger.log(
+            level,
+            "%s %s %d",
+            scope["method"],
+            scope["path"],
+            status_code,
+            exc_info=error,
+            extra={"fields": fields},
+        )
+
+
+__all__: list[str] = [
+    "AccessLogMiddleware",
+    "add_db_time",
+    "record_db_error",
+]
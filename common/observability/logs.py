@@ -0,0 +1,218 @@
+"""
+This module contains the structured, non-blocking logging pipeline.
+
+`setup_logging` routes the records of the application loggers through a bounded queue to a background thread,
+which formats them as one JSON object per line and writes them in batches.
+Logging a record on the event loop only puts it on the queue; if the queue is full, the record is dropped
+and counted instead of blocking the request. `shutdown_logging` flushes the queue and stops the thread.
+
+Extra fields are passed in the `fields` attribute of a record, e.g.
+`logger.info("request", extra={"fields": {"status": 200}})`.
+Exceptions are logged with their type, message, traceback and chain of causes,
+and psycopg errors also with their SQLSTATE.
+"""
+
+import json
+import logging
+import queue
+import sys
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Any, TextIO
+
+from psycopg import Error as PsycopgError
+
+__writer: "_BatchWriter | None" = None
+__handler: "_DroppingQueueHandler | None" = None
+
+
+def describe_exception(exc: BaseException, depth: int = 0) -> dict[str, Any]:
+    """
+    Describes an exception and its chain of causes as a JSON-compatible dictionary.
+
+    Args:
+        exc (BaseException): The exception to describe.
+        depth (int, optional): The position of the exception in the chain. Defaults to 0.
+
+    Returns:
+        dict[str, Any]: The type, message, SQLSTATE for psycopg errors and the cause, if any.
+    """
+    description: dict[str, Any] = {
+        "type": type(exc).__name__,
+        "message": str(exc),
+    }
+    if isinstance(exc, PsycopgError) and exc.sqlstate:
+        description["sqlstate"] = exc.sqlstate
+    cause: BaseException | None = exc.__cause__
+    if cause is None and not exc.__suppress_context__:
+        cause = exc.__context__
+    if cause is not None and depth < 5:
+        description["cause"] = describe_exception(cause, depth + 1)
+    return description
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a log record as a single line JSON object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields: dict[str, Any] | None = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and record.exc_info[1] is not None:
+            entry["exception"] = describe_exception(record.exc_info[1])
+            entry["exception"]["traceback"] = "".join(
+                traceback.format_exception(*record.exc_info)
+            )
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler which never blocks: records that do not fit in the queue are dropped and counted.
+    Records are formatted by the writer thread, not by the caller.
+    """
+
+    def __init__(self, records: queue.Queue) -> None:
+        super().__init__(records)
+        self.dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BatchWriter(threading.Thread):
+    """
+    Background thread writing the queued records in batches.
+    """
+
+    def __init__(
+        self,
+        records: queue.Queue,
+        stream: TextIO,
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        super().__init__(name="log-writer", daemon=True)
+        self.records: queue.Queue = records
+        self.stream: TextIO = stream
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.formatter: JsonFormatter = JsonFormatter()
+
+    def run(self) -> None:
+        stopped: bool = False
+        while not stopped:
+            batch: list[logging.LogRecord] = []
+            try:
+                record: logging.LogRecord | None = self.records.get(
+                    timeout=self.flush_interval
+                )
+                while record is not None:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                    record = self.records.get_nowait()
+                stopped = record is None
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[logging.LogRecord]) -> None:
+        lines: list[str] = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(
+                    json.dumps(
+                        {"level": "ERROR", "message": "Unable to format log record"}
+                    )
+                )
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        self.records.put(None)
+        self.join()
+
+
+def setup_logging(
+    level: int | str = logging.INFO,
+    queue_size: int = 10000,
+    batch_size: int = 100,
+    flush_interval: float = 0.5,
+    stream: TextIO | None = None,
+) -> None:
+    """
+    Routes the records of the root logger through a bounded queue to a background JSON writer.
+
+    Args:
+        level (int | str, optional): The level of the root logger. Defaults to logging.INFO.
+        queue_size (int, optional): The maximum number of queued records, further records are dropped.
+            Defaults to 10000.
+        batch_size (int, optional): The maximum number of records written at once. Defaults to 100.
+        flush_interval (float, optional): The maximum number of seconds a record waits
+            for a batch to fill. Defaults to 0.5.
+        stream (TextIO | None, optional): The stream to write to. Defaults to sys.stdout.
+
+    Raises:
+        Exception: If logging is already set up.
+    """
+    global __writer, __handler
+    if __writer is not None:
+        raise Exception("Logging is already set up")
+
+    records: queue.Queue = queue.Queue(maxsize=queue_size)
+    __writer = _BatchWriter(records, stream or sys.stdout, batch_size, flush_interval)
+    __writer.start()
+    __handler = _DroppingQueueHandler(records)
+
+    root: logging.Logger = logging.getLogger()
+    root.addHandler(__handler)
+    root.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """
+    Writes the queued records, stops the background writer and reports the dropped records, if any.
+    """
+    global __writer, __handler
+    if __writer is None or __handler is None:
+        return
+
+    if __handler.dropped:
+        logging.getLogger(__name__).warning(
+            "%d log records dropped, the log queue was full", __handler.dropped
+        )
+    logging.getLogger().removeHandler(__handler)
+    __writer.stop()
+    __writer = None
+    __handler = None
+
+
+__all__: list[str] = [
+    "JsonFormatter",
+    "describe_exception",
+    "setup_logging",
+    "shutdown_logging",
+]
@@ -0,0 +1,181 @@
+"""
+This module contains the event loop lag monitor.
+
+Synchronous work on the event loop, e.g. CPU heavy validation or serialization, stalls every request of the worker.
+The monitor task sleeps for a fixed interval and measures how late it wakes up: the lag is the time
+the loop was busy running other callbacks. The lag is kept as a histogram, served by the `/metrics` endpoint.
+
+In debug mode a watchdog thread also checks that the monitor task keeps waking up. If the loop is blocked
+for longer than the threshold, it captures the stack of the event loop thread, i.e. the callback
+that blocks it, and logs it as a warning, so the blocking work can be found and moved off the loop.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+# Upper bounds of the lag histogram buckets, in seconds
+LAG_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+_task: asyncio.Task | None = None
+_watchdog: "_Watchdog | None" = None
+_heartbeat: float = 0.0
+_last_lag: float = 0.0
+_lag_sum: float = 0.0
+_lag_counts: list[int] = [0] * (len(LAG_BUCKETS) + 1)
+_blocked: int = 0
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _record_lag(lag: float) -> None:
+    global _last_lag, _lag_sum
+    _last_lag = lag
+    _lag_sum += lag
+    for index, bound in enumerate(LAG_BUCKETS):
+        if lag <= bound:
+            _lag_counts[index] += 1
+            return
+    _lag_counts[-1] += 1
+
+
+async def _monitor(interval: float) -> None:
+    global _heartbeat
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    while True:
+        expected: float = loop.time() + interval
+        await asyncio.sleep(interval)
+        _record_lag(max(0.0, loop.time() - expected))
+        _heartbeat = time.monotonic()
+
+
+class _Watchdog(threading.Thread):
+    """
+    Thread that logs the stack of the event loop thread when the monitor task stops waking up.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float, threshold: float) -> None:
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop_thread_id: int = loop_thread_id
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.stopped: threading.Event = threading.Event()
+
+    def run(self) -> None:
+        global _blocked
+        reported: float = 0.0
+        while not self.stopped.wait(min(self.threshold, self.interval) / 2):
+            heartbeat: float = _heartbeat
+            blocked: float = time.monotonic() - heartbeat - self.interval
+            # Report each block once, on the heartbeat it delays
+            if blocked < self.threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            _blocked += 1
+            frame: Any = sys._current_frames().get(self.loop_thread_id)
+            logger.warning(
+                "Event loop blocked for more than %.0f ms",
+                blocked * 1000,
+                extra={
+                    "fields": {
+                        "blocked_ms": round(blocked * 1000, 3),
+                        "stack": (
+                            "".join(traceback.format_stack(frame)) if frame else None
+                        ),
+                    }
+                },
+            )
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def start_loop_monitor(
+    interval: float = 0.1, block_threshold: float | None = None
+) -> None:
+    """
+    Starts measuring the lag of the running event loop.
+
+    Args:
+        interval (float, optional): The number of seconds between measurements. Defaults to 0.1.
+        block_threshold (float | None, optional): The number of seconds the loop may be blocked before
+            the stack of the blocking callback is logged, e.g. in debug mode. Defaults to None, i.e. disabled.
+
+    Raises:
+        Exception: If the monitor is already running.
+    """
+    global _task, _watchdog, _heartbeat
+    if _task is not None:
+        raise Exception("Event loop monitor is already running")
+
+    _heartbeat = time.monotonic()
+    _task = asyncio.get_running_loop().create_task(
+        _monitor(interval), name="loop-monitor"
+    )
+    if block_threshold is not None:
+        _watchdog = _Watchdog(threading.get_ident(), interval, block_threshold)
+        _watchdog.start()
+
+
+async def stop_loop_monitor() -> None:
+    """
+    Stops the monitor task and the watchdog thread, if running.
+    """
+    global _task, _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def loop_lag() -> dict[str, Any]:
+    """
+    Returns the lag measurements of the event loop.
+
+    Returns:
+        dict[str, Any]: The last lag, the cumulative counts of the histogram buckets by upper bound,
+            the sum and count of the lags in seconds, and the number of blocks reported by the watchdog.
+    """
+    cumulative: list[int] = []
+    total: int = 0
+    for count in _lag_counts:
+        total += count
+        cumulative.append(total)
+    return {
+        "last": _last_lag,
+        "buckets": dict(zip(LAG_BUCKETS + (float("inf"),), cumulative)),
+        "sum": _lag_sum,
+        "count": total,
+        "blocked": _blocked,
+    }
+
+
+__all__: list[str] = [
+    "LAG_BUCKETS",
+    "loop_lag",
+    "start_loop_monitor",
+    "stop_loop_monitor",
+]
@@ -0,0 +1,195 @@
+"""
+This module contains the on-demand sampling profiler.
+
+Instead of tracing every call like `cProfile`, a background thread wakes up at the sampling rate and reads
+the current stack of every thread (`sys._current_frames`) and of every pending asyncio task of the event loop.
+The profiled code is not instrumented, so the overhead is bounded by the sampling rate and is safe under load.
+
+The samples are aggregated as collapsed stacks, one `frame;frame;frame count` line per distinct stack,
+the input format of flame graph tools, e.g. `flamegraph.pl` or speedscope:
+- `thread:<name>;...` stacks show where the threads, including the event loop thread, spend CPU time
+- `task;...` stacks show where the suspended asyncio tasks are waiting, e.g. on a database call
+
+Only one profile runs at a time per worker process.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+_token: str = ""
+_running: bool = False
+
+
+def init_profiler(token: str) -> None:
+    """
+    Enables the profiler endpoint.
+
+    Args:
+        token (str): The token required to run a profile. An empty token disables the endpoint.
+    """
+    global _token
+    _token = token
+
+
+def profiler_token() -> str:
+    """
+    Returns the token required to run a profile, or an empty string if the profiler is disabled.
+    """
+    return _token
+
+
+def is_profiling() -> bool:
+    """
+    Returns True while a profile is running.
+    """
+    return _running
+
+
+def _frame_label(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def _collapse(frames: list[FrameType], root: str) -> str:
+    """
+    Returns the collapsed stack of the frames, given innermost first, from the root down.
+    """
+    return ";".join([root] + [_frame_label(frame) for frame in reversed(frames)])
+
+
+def _thread_stack(frame: FrameType | None) -> list[FrameType]:
+    frames: list[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return frames
+
+
+def _task_stack(task: asyncio.Task) -> list[FrameType]:
+    """
+    Returns the frames of the chain of coroutines awaited by the task, innermost first.
+    `Task.get_stack` only returns the outermost frame of a suspended task.
+    """
+    frames: list[FrameType] = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(frames) < 256:
+        frame: FrameType | None = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+    return frames[::-1]
+
+
+def _sample(
+    stacks: Counter[str],
+    loop: asyncio.AbstractEventLoop,
+    exclude: set[int],
+    exclude_task: asyncio.Task | None,
+) -> None:
+    """
+    Adds one sample of every thread and asyncio task to the stacks.
+    """
+    names: dict[int, str] = {
+        thread.ident: thread.name
+        for thread in threading.enumerate()
+        if thread.ident is not None
+    }
+    for ident, frame in sys._current_frames().items():
+        if ident not in exclude:
+            stacks[
+                _collapse(_thread_stack(frame), f"thread:{names.get(ident, ident)}")
+            ] += 1
+
+    try:
+        tasks: set[asyncio.Task] = asyncio.all_tasks(loop)
+    except RuntimeError:
+        # The task set changed while it was copied, skip the tasks of this sample
+        return
+    for task in tasks:
+        if task is exclude_task or task.done():
+            continue
+        frames: list[FrameType] = _task_stack(task)
+        if frames:
+            stacks[_collapse(frames, "task")] += 1
+
+
+def _sampler(
+    duration: float,
+    rate: int,
+    loop: asyncio.AbstractEventLoop,
+    exclude_task: asyncio.Task | None,
+) -> tuple[Counter[str], int]:
+    """
+    Samples the stacks at the rate for the duration, in the calling thread.
+    """
+    stacks: Counter[str] = Counter()
+    exclude: set[int] = {threading.get_ident()}
+    interval: float = 1.0 / rate
+    samples: int = 0
+    deadline: float = time.monotonic() + duration
+    next_sample: float = time.monotonic()
+    while next_sample < deadline:
+        _sample(stacks, loop, exclude, exclude_task)
+        samples += 1
+        next_sample += interval
+        delay: float = next_sample - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # The sampler fell behind, e.g. the GIL was busy, skip the missed samples
+            next_sample = time.monotonic()
+    return stacks, samples
+
+
+async def profile(duration: float, rate: int) -> tuple[str, int]:
+    """
+    Samples the stacks of the threads and asyncio tasks of this worker process.
+
+    Args:
+        duration (float): The number of seconds to sample for.
+        rate (int): The number of samples per second.
+
+    Returns:
+        tuple[str, int]: The collapsed stacks, one `frame;frame;frame count` line per distinct stack,
+            and the number of samples taken.
+
+    Raises:
+        Exception: If a profile is already running.
+    """
+    global _running
+    if _running:
+        raise Exception("A profile is already running")
+
+    _running = True
+    try:
+        stacks: Counter[str]
+        samples: int
+        stacks, samples = await asyncio.to_thread(
+            _sampler,
+            duration,
+            rate,
+            asyncio.get_running_loop(),
+            asyncio.current_task(),
+        )
+    finally:
+        _running = False
+
+    lines: list[str] = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+    return "\n".join(lines) + ("\n" if lines else ""), samples
+
+
+__all__: list[str] = [
+    "init_profiler",
+    "is_profiling",
+    "profile",
+    "profiler_token",
+]
@@ -0,0 +1,309 @@
+"""
+This module contains the slow query log.
+
+Statements executed through `get_cursor` are timed by `SlowQueryCursor`. Statements slower than the threshold
+are recorded with their normalized SQL, the shapes of their parameters (types and lengths, never values)
+and their duration. The most recent entries are kept in memory for the `/slow-queries` management endpoint
+and every entry is written as a JSON line to a rotating local file by a background thread.
+
+For a sampled fraction of the slow statements, the plan is captured with `EXPLAIN (ANALYZE, BUFFERS)`
+on a connection of the pool, in a read-only transaction, so that a statement which writes is never executed again:
+it fails with `read_only_sql_transaction` and is remembered, so that it is not sampled anymore.
+As the services call PL/pgSQL functions, whose statements `EXPLAIN` doesn't show, `auto_explain` is used instead
+if the server allows it: its settings are local to the read-only transaction, which is committed rather than
+rolled back so that the prepared statements of the pool connection are kept, and the plans of the nested
+statements are captured from its notices.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Any, AsyncContextManager, Callable
+from uuid import UUID
+
+from psycopg import AsyncConnection, AsyncCursor, Error as PsycopgError, sql
+from psycopg.errors import ReadOnlySqlTransaction
+
+_threshold: float | None = None
+_explain_rate: float = 0.0
+_connection: Callable[[float], AsyncContextManager[AsyncConnection]] | None = None
+# Whether auto_explain can be used, None until the first capture tries it
+_auto_explain: bool | None = None
+# The normalized statements which write, never sampled again
+_writes: set[str] = set()
+_entries: deque[dict[str, Any]] = deque(maxlen=100)
+_listener: QueueListener | None = None
+_explaining: bool = False
+_tasks: set[asyncio.Task] = set()
+
+# The number of seconds a capture waits for a pool connection before giving up
+_POOL_TIMEOUT: float = 1.0
+
+_AUTO_EXPLAIN_SETTINGS: tuple[tuple[str, str], ...] = (
+    ("auto_explain.log_min_duration", "0"),
+    ("auto_explain.log_analyze", "on"),
+    ("auto_explain.log_buffers", "on"),
+    ("auto_explain.log_nested_statements", "on"),
+    ("auto_explain.log_level", "notice"),
+)
+
+_NORMALIZE: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%s|\$\d+"), "?"),
+    (re.compile(r"\s+"), " "),
+]
+
+logger: logging.Logger = logging.getLogger("slow_queries")
+
+
+def normalize_query(query: Any) -> str:
+    """
+    Returns the query with literals and placeholders replaced by `?` and whitespace collapsed.
+    """
+    text: str = query.as_string() if isinstance(query, sql.Composable) else str(query)
+    for pattern, replacement in _NORMALIZE:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def parameter_shape(value: Any) -> str:
+    """
+    Describes a query parameter by its type and length, without its value.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, UUID):
+        return "uuid"
+    return type(value).__name__
+
+
+def init_slow_query_log(
+    threshold: float,
+    explain_rate: float,
+    connection: Callable[[float], AsyncContextManager[AsyncConnection]],
+    path: str,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    size: int = 100,
+) -> None:
+    """
+    Enables the slow query log.
+
+    Args:
+        threshold (float): The duration in seconds above which statements are recorded.
+        explain_rate (float): The fraction of the recorded statements to capture the plan of, from 0.0 to 1.0.
+        connection (Callable[[float], AsyncContextManager[AsyncConnection]]): Obtains a pool connection
+            for the EXPLAIN captures, waiting at most the given number of seconds, e.g. `pool_connection`.
+        path (str): The path of the log file.
+        max_bytes (int, optional): The size of the log file at which it is rotated. Defaults to 10 MiB.
+        backup_count (int, optional): The number of rotated log files to keep. Defaults to 5.
+        size (int, optional): The number of recent entries kept in memory. Defaults to 100.
+
+    Raises:
+        Exception: If the slow query log is already enabled.
+    """
+    global _threshold, _explain_rate, _connection, _entries, _listener
+    if _threshold is not None:
+        raise Exception("Slow query log is already enabled")
+
+    records: SimpleQueue = SimpleQueue()
+    file_handler: RotatingFileHandler = RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(records, file_handler)
+    _listener.start()
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    _threshold = threshold
+    _explain_rate = explain_rate
+    _connection = connection
+    _entries = deque(maxlen=size)
+
+
+async def close_slow_query_log() -> None:
+    """
+    Waits for the pending EXPLAIN captures, then disables the slow query log and flushes its file.
+    """
+    global _threshold, _listener
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    _threshold = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def is_slow_query_log_enabled() -> bool:
+    """
+    Returns True if the slow query log is enabled.
+    """
+    return _threshold is not None
+
+
+def slow_queries() -> list[dict[str, Any]]:
+    """
+    Returns the recent slow query log entries, most recent first.
+    """
+    return list(reversed(_entries))
+
+
+def _record(query: Any, params: Any, duration: float) -> None:
+    """
+    Records a slow statement and schedules the capture of its plan, if sampled.
+    """
+    global _explaining
+    values: list[Any] = (
+        list(params.values()) if isinstance(params, dict) else list(params or [])
+    )
+    entry: dict[str, Any] = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "query": normalize_query(query),
+        "parameters": [parameter_shape(value) for value in values],
+        "duration_ms": round(duration * 1000, 3),
+        "plan": None,
+    }
+    _entries.append(entry)
+
+    # One capture at a time, so a burst of slow statements doesn't add to the load
+    if (
+        not _explaining
+        and entry["query"] not in _writes
+        and random.random() < _explain_rate
+    ):
+        _explaining = True
+        task: asyncio.Task = asyncio.get_running_loop().create_task(
+            _explain(entry, query, params)
+        )
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    else:
+        logger.info(json.dumps(entry))
+
+
+async def _explain(entry: dict[str, Any], query: Any, params: Any) -> None:
+    """
+    Captures the plan of a slow statement on a pool connection, in a read-only transaction.
+    """
+    global _explaining
+    notices: list[str] = []
+
+    def notice(diagnostic: Any) -> None:
+        notices.append(diagnostic.message_primary or "")
+
+    try:
+        if _connection is None:
+            raise Exception("Slow query log is not enabled")
+        async with _connection(_POOL_TIMEOUT) as connection:
+            connection.add_notice_handler(notice)
+            nested: bool = False
+            try:
+                async with connection.transaction():
+                    await connection.execute("SET TRANSACTION READ ONLY")
+                    nested = await _enable_auto_explain(connection)
+                    async with connection.cursor() as cursor:
+                        if nested:
+                            await cursor.execute(query, params)
+                        else:
+                            await cursor.execute(
+                                sql.SQL("EXPLAIN (ANALYZE, BUFFERS) ") + _as_sql(query),
+                                params,
+                            )
+                            rows: list[tuple[Any, ...]] = await cursor.fetchall()
+                            entry["plan"] = "\n".join(row[0] for row in rows)
+            except ReadOnlySqlTransaction:
+                raise
+            except PsycopgError:
+                # e.g. not found, the plans of the nested statements are still reported
+                if not nested:
+                    raise
+            finally:
+                connection.remove_notice_handler(notice)
+            if nested:
+                entry["plan"] = "\n\n".join(notices)
+    except ReadOnlySqlTransaction:
+        _writes.add(entry["query"])
+        entry["plan"] = "Not captured: the statement writes"
+    except Exception as e:
+        entry["plan"] = f"EXPLAIN failed: {e}"
+    finally:
+        _explaining = False
+        logger.info(json.dumps(entry))
+
+
+async def _enable_auto_explain(connection: AsyncConnection) -> bool:
+    """
+    Makes `auto_explain` report the plans of all statements of the current transaction, including the nested ones,
+    as notices. The settings are local to the transaction. Returns False if the server doesn't allow it.
+    """
+    global _auto_explain
+    if _auto_explain is False:
+        return False
+
+    try:
+        # A savepoint, so that the transaction can go on without auto_explain
+        async with connection.transaction():
+            # Loading the library only registers its settings, it stays inert on the connection afterwards
+            await connection.execute("LOAD 'auto_explain'")
+            for setting, value in _AUTO_EXPLAIN_SETTINGS:
+                await connection.execute(
+                    "select set_config(%s, %s, true)", [setting, value]
+                )
+    except PsycopgError:
+        _auto_explain = False
+        return False
+    _auto_explain = True
+    return True
+
+
+def _as_sql(query: Any) -> sql.Composable:
+    if isinstance(query, sql.Composable):
+        return query
+    return sql.SQL(query.decode() if isinstance(query, bytes) else query)
+
+
+class SlowQueryCursor(AsyncCursor):
+    """
+    Cursor that records the statements slower than the slow query log threshold.
+    """
+
+    async def execute(self, query: Any, params: Any = None, **kwargs: Any) -> Any:
+        if _threshold is None:
+            return await super().execute(query, params, **kwargs)
+
+        started: float = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            duration: float = time.perf_counter() - started
+            if duration >= _threshold:
+                _record(query, params, duration)
+
+
+__all__: list[str] = [
+    "SlowQueryCursor",
+    "close_slow_query_log",
+    "init_slow_query_log",
+    "is_slow_query_log_enabled",
+    "normalize_query",
+    "parameter_shape",
+    "slow_queries",
+]
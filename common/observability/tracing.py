@@ -0,0 +1,416 @@
+"""
+This module contains the lightweight request tracing.
+
+A trace is a tree of spans, each with a name, start and end time, attributes and status.
+The current span is kept in a context variable, so `span` opens a child of whatever span is active,
+across the router, CRUD and database layers, without passing it around.
+
+Traces are sampled at the head: `TracingMiddleware` decides once per request, with probability `sample_rate`
+or if the W3C `traceparent` request header has the sampled flag, whether the request is traced.
+Since any caller can set that flag, the remotely sampled requests are limited to `remote_rate_limit` per second
+and worker (token bucket); over the limit, they are sampled like any other request.
+For requests that are not traced, `span` only reads the context variable, so the overhead stays negligible.
+
+Finished traces are kept in an in-memory ring buffer, served by the `/traces` management endpoint,
+and optionally written to a local file, one OTLP JSON (OpenTelemetry protocol) document per line,
+by a background thread.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Iterator
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.observability.slow_queries import SlowQueryCursor, normalize_query
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL: int = 1
+SPAN_KIND_SERVER: int = 2
+SPAN_KIND_CLIENT: int = 3
+STATUS_CODE_OK: int = 1
+STATUS_CODE_ERROR: int = 2
+
+_service_name: str = "unknown_service"
+_sample_rate: float = 0.0
+_remote_rate_limit: float = 0.0
+_remote_tokens: float = 0.0
+_remote_refilled_at: float = 0.0
+_traces: deque[list["Span"]] = deque(maxlen=100)
+_listener: QueueListener | None = None
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+logger: logging.Logger = logging.getLogger("traces")
+
+
+class Span:
+    """
+    A timed operation of a trace.
+    """
+
+    __slots__ = (
+        "trace",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status_code",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: "Span | None" = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: dict[str, Any] | None = None,
+        trace_id: str | None = None,
+        parent_span_id: str | None = None,
+        start_ns: int | None = None,
+    ) -> None:
+        # All spans of a trace share one list, which is exported when the root span ends
+        self.trace: list[Span] = parent.trace if parent is not None else []
+        self.trace_id: str = (
+            parent.trace_id if parent is not None else trace_id or os.urandom(16).hex()
+        )
+        self.span_id: str = os.urandom(8).hex()
+        self.parent_span_id: str | None = (
+            parent.span_id if parent is not None else parent_span_id
+        )
+        self.name: str = name
+        self.kind: int = kind
+        self.start_ns: int = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: int = 0
+        self.attributes: dict[str, Any] = attributes or {}
+        self.status_code: int = 0
+        self.status_message: str = ""
+        self.trace.append(self)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status_code = STATUS_CODE_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self, end_ns: int | None = None) -> None:
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        # The root span ends last, the trace is complete
+        if self.trace[0] is self:
+            _export(self.trace)
+
+
+def current_span() -> Span | None:
+    """
+    Returns the active span, or None if the current request is not traced.
+    """
+    return _current_span.get()
+
+
+@contextlib.contextmanager
+def span(
+    name: str, attributes: dict[str, Any] | None = None, kind: int = SPAN_KIND_INTERNAL
+) -> Iterator[Span | None]:
+    """
+    Opens a child span of the active span, if the current request is traced.
+
+    Args:
+        name (str): The name of the span.
+        attributes (dict[str, Any] | None, optional): The attributes of the span.
+        kind (int, optional): The OTLP span kind. Defaults to SPAN_KIND_INTERNAL.
+
+    Yields:
+        Span | None: The span, or None if the current request is not traced.
+    """
+    parent: Span | None = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child: Span = Span(name, parent, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def record_span(
+    name: str, start_ns: int, end_ns: int, attributes: dict[str, Any] | None = None
+) -> None:
+    """
+    Records a child span of the active span, if any, for an operation that has already completed.
+    """
+    parent: Span | None = _current_span.get()
+    if parent is not None:
+        Span(name, parent, attributes=attributes, start_ns=start_ns).end(end_ns)
+
+
+def init_tracing(
+    service_name: str,
+    sample_rate: float,
+    buffer_size: int = 100,
+    path: str | None = None,
+    remote_rate_limit: float = 10.0,
+) -> None:
+    """
+    Enables tracing.
+
+    Args:
+        service_name (str): The service name reported with the traces.
+        sample_rate (float): The fraction of requests to trace, from 0.0 to 1.0.
+        buffer_size (int, optional): The number of recent traces kept in memory. Defaults to 100.
+        path (str | None, optional): The file to write the traces to, if any.
+        remote_rate_limit (float, optional): The maximum number of requests per second traced because their
+            `traceparent` header has the sampled flag; 0 ignores the flag. Defaults to 10.
+    """
+    global _service_name, _sample_rate, _traces, _listener
+    global _remote_rate_limit, _remote_tokens, _remote_refilled_at
+    _service_name = service_name
+    _sample_rate = sample_rate
+    _remote_rate_limit = remote_rate_limit
+    _remote_tokens = remote_rate_limit
+    _remote_refilled_at = time.monotonic()
+    _traces = deque(maxlen=buffer_size)
+
+    if path and _listener is None:
+        records: SimpleQueue = SimpleQueue()
+        file_handler: logging.FileHandler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        _listener = QueueListener(records, file_handler)
+        _listener.start()
+        logger.addHandler(QueueHandler(records))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def close_tracing() -> None:
+    """
+    Disables tracing and flushes the trace file.
+    """
+    global _sample_rate, _remote_rate_limit, _listener
+    _sample_rate = 0.0
+    _remote_rate_limit = 0.0
+    if _listener is not None:
+        _listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _export(trace: list[Span]) -> None:
+    _traces.append(trace)
+    if _listener is not None:
+        logger.info(json.dumps(to_otlp([trace])))
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: list[list[Span]]) -> dict[str, Any]:
+    """
+    Converts traces to an OTLP JSON `ExportTraceServiceRequest` document.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": _service_name},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_span_id or "",
+                                "name": span.name,
+                                "kind": span.kind,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                ],
+                                "status": {
+                                    "code": span.status_code,
+                                    "message": span.status_message,
+                                },
+                            }
+                            for trace in traces
+                            for span in trace
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def recent_traces(limit: int | None = None) -> dict[str, Any]:
+    """
+    Returns the recent traces, most recent first, as an OTLP JSON document.
+    """
+    traces: list[list[Span]] = list(reversed(_traces))
+    return to_otlp(traces[:limit] if limit is not None else traces)
+
+
+def _parse_traceparent(traceparent: str | None) -> tuple[str, str] | None:
+    """
+    Returns the trace ID and parent span ID of a W3C `traceparent` header with the sampled flag.
+    """
+    if not traceparent:
+        return None
+    parts: list[str] = traceparent.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        if not int(parts[3], 16) & 1:
+            return None
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def _take_remote_sample() -> bool:
+    """
+    Returns whether a remotely sampled request may be traced, within the remote rate limit.
+    """
+    global _remote_tokens, _remote_refilled_at
+    if _remote_rate_limit <= 0.0:
+        return False
+    now: float = time.monotonic()
+    _remote_tokens = min(
+        _remote_rate_limit,
+        _remote_tokens + (now - _remote_refilled_at) * _remote_rate_limit,
+    )
+    _remote_refilled_at = now
+    if _remote_tokens < 1.0:
+        return False
+    _remote_tokens -= 1.0
+    return True
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that starts a trace for a sampled fraction of the HTTP requests.
+    Requests dispatched within a traced request, e.g. batch sub-requests, become child spans.
+
+    Args:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent: Span | None = _current_span.get()
+        remote: tuple[str, str] | None = None
+        if parent is None:
+            remote = _parse_traceparent(Headers(scope=scope).get("traceparent"))
+            if (remote is None or not _take_remote_sample()) and (
+                _sample_rate <= 0.0 or random.random() >= _sample_rate
+            ):
+                await self.app(scope, receive, send)
+                return
+
+        root: Span = Span(
+            f"{scope['method']} {scope['path']}",
+            parent,
+            SPAN_KIND_SERVER if parent is None else SPAN_KIND_INTERNAL,
+            {
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+            },
+            trace_id=remote[0] if remote else None,
+            parent_span_id=remote[1] if remote else None,
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status_code = STATUS_CODE_ERROR
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route: Any = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.set_attribute("http.route", route.path)
+            root.end()
+
+
+class TracedCursor(SlowQueryCursor):
+    """
+    Cursor that opens a span for every statement of a traced request.
+    """
+
+    async def execute(self, query: Any, params: Any = None, **kwargs: Any) -> Any:
+        if _current_span.get() is None:
+            return await super().execute(query, params, **kwargs)
+
+        with span(
+            "db.execute",
+            {"db.system": "postgresql", "db.statement": normalize_query(query)},
+            SPAN_KIND_CLIENT,
+        ):
+            return await super().execute(query, params, **kwargs)
+
+
+__all__: list[str] = [
+    "Span",
+    "TracedCursor",
+    "TracingMiddleware",
+    "close_tracing",
+    "current_span",
+    "init_tracing",
+    "recent_traces",
+    "record_span",
+    "span",
+    "to_otlp",
+]
@@ -0,0 +1,112 @@
+"""
+This module contains the worker and connection pool auto-sizing used by the service launchers.
+
+The `available_cpus` function returns the number of CPUs the process may use, honouring the
+CPU affinity mask and the cgroup (v2 or v1) CPU quota of the container.
+The `auto_size` function derives the number of workers from it and divides a total
+PostgreSQL connection budget across the workers, so scaling workers never exceeds `max_connections`.
+The connections a worker opens outside its pool, e.g. the dedicated connections of the exports,
+are reserved in its share of the budget.
+"""
+
+import logging
+import math
+import os
+
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """
+    Returns the cgroup CPU quota in CPUs, or None if the process is not limited.
+    """
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+            if quota != "max":
+                return int(quota) / int(period)
+            return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # cgroup v1: quota is -1 if not limited
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+            quota_us: int = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+            period_us: int = int(file.read())
+        if quota_us > 0 and period_us > 0:
+            return quota_us / period_us
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs available to the process, at least 1.
+    """
+    try:
+        cpus: int = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS and Windows
+        cpus = os.cpu_count() or 1
+
+    quota: float | None = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def auto_size(
+    connection_budget: int, pool_min_size: int, reserved_per_worker: int = 0
+) -> tuple[int, int, int]:
+    """
+    Derives the number of workers and the connection pool size of each worker.
+
+    One worker is started per available CPU, but never more workers than the budget can give
+    one pool connection plus their reserved connections. Every worker gets an equal share of the budget,
+    minus its reserved connections, as its pool `max_size`.
+
+    Args:
+        connection_budget (int): The total number of PostgreSQL connections all workers may open.
+        pool_min_size (int): The requested pool `min_size`, capped at the computed `max_size`.
+        reserved_per_worker (int, optional): The number of connections each worker may open outside its pool,
+            e.g. the maximum number of running exports. Defaults to 0.
+
+    Returns:
+        tuple[int, int, int]: The number of workers, the pool `min_size` and the pool `max_size`.
+
+    Raises:
+        Exception: If the connection budget is less than 1 pool connection plus the reserved connections.
+    """
+    if connection_budget < 1 + reserved_per_worker:
+        raise Exception(
+            f"Connection budget must be at least {1 + reserved_per_worker}"
+        )
+
+    cpus: int = available_cpus()
+    workers: int = min(cpus, connection_budget // (1 + reserved_per_worker))
+    max_size: int = connection_budget // workers - reserved_per_worker
+    min_size: int = max(0, min(pool_min_size, max_size))
+
+    logger.info(
+        "Auto-sizing: %d CPUs available, %d workers, pool min_size=%d max_size=%d, "
+        "%d reserved per worker (%d of %d connections)",
+        cpus,
+        workers,
+        min_size,
+        max_size,
+        reserved_per_worker,
+        workers * (max_size + reserved_per_worker),
+        connection_budget,
+    )
+    return workers, min_size, max_size
+
+
+__all__: list[str] = [
+    "available_cpus",
+    "auto_size",
+]
@@ -3,16 +3,19 @@ This module contains validation functions for the application.
 
 The `require_json_accept` function is a decorator that can be applied to any
 function that requires Accept application/json header set in the request.
+Accept application/msgpack is allowed as well, see `common.negotiation`.
 """
 
 from functools import wraps
 from fastapi import Request
 from common.exceptions import MUST_ACCEPT_JSON
+from common.negotiation import negotiate_media_type
+from common.observability.tracing import span
 
 
 def require_json_accept(func):
     """
-    Decorator function that checks if the client accepts JSON response.
+    Decorator function that checks if the client accepts JSON (or MessagePack) response.
 
     Args:
         func (callable): The function to be decorated.
@@ -21,17 +24,18 @@ def require_json_accept(func):
         callable: The decorated function.
 
     Raises:
-        MUST_ACCEPT_JSON: If the client doesn't accept JSON response.
+        MUST_ACCEPT_JSON: If the client accepts neither JSON nor MessagePack response.
     """
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
         request: Request | None = kwargs.get("request")
         if request:
-            accept_header: str | None = request.headers.get("Accept")
-            if not (accept_header and "application/json" in accept_header):
-                # If the client doesn't accept JSON, raise an exception
-                raise MUST_ACCEPT_JSON
+            with span("require_json_accept"):
+                accept_header: str | None = request.headers.get("Accept")
+                if negotiate_media_type(accept_header) is None:
+                    # If the client accepts neither JSON nor MessagePack, raise an exception
+                    raise MUST_ACCEPT_JSON
 
         return await func(*args, **kwargs)
 
@@ -1,11 +1,24 @@
-from .customers import (
+from .customers import warm_up_connection as db_warm_up_connection
+from .invalidation import start_cache_invalidation, stop_cache_invalidation
+from .repository import (
     get_customer_by_id as db_get_customer_by_id,
+    get_customer_version as db_get_customer_version,
     get_customers_by as db_get_customers_by,
+    get_customer_changes as db_get_customer_changes,
+    export_customers as db_export_customers,
     create_customer as db_create_customer,
+    init_repository,
 )
 
 __all__: list[str] = [
     "db_get_customer_by_id",
+    "db_get_customer_version",
     "db_get_customers_by",
+    "db_get_customer_changes",
+    "db_export_customers",
     "db_create_customer",
+    "db_warm_up_connection",
+    "init_repository",
+    "start_cache_invalidation",
+    "stop_cache_invalidation",
 ]
@@ -1,30 +1,74 @@
 """
 This module contains functions to interact with the database.
-It includes functions to create a new customer, retrieve a customer by ID, and retrieve customers by name or email.
+It includes functions to create a new customer, retrieve a customer or only its version by ID,
+retrieve customers by name or email, retrieve the customers changed after a cursor (the change feed),
+and export all the customers as CSV or NDJSON.
 The functions handle exceptions and raise appropriate exceptions based on the error cases.
+Customers fetched by ID are kept in the shared memory cache, if it is enabled, and evicted when they change
+(see `customers.crud.invalidation`). The version checks of conditional requests always read the database.
+
+The statements are executed with `prepare=True`, so every pool connection plans them once.
+`warm_up_connection` executes the read statements on a new connection before it serves requests.
+The export runs `COPY ... TO STDOUT` on a dedicated connection instead, see `export_customers`.
 """
 
-from typing import Any
-from pydantic import UUID4
+import json
+from typing import Any, AsyncIterator
+from uuid import UUID
+from psycopg import AsyncConnection
 from psycopg.errors import AssertFailure, NoDataFound
-from common.database.postgresql import get_cursor
+from common.ids import ID
+from common.cache.shared_memory import cache_get, cache_set, is_cache_enabled
+from common.database.postgresql import (
+    dedicated_connection,
+    get_cursor,
+    in_shared_transaction,
+    warm_up_statement,
+)
+from common.pagination import encode_cursor
 from customers.exceptions import (
     CREATE_CUSTOMER_ALREADY_EXIST,
     CREATE_CUSTOMER_NOT_CREATED,
     CREATE_CUSTOMER_NOT_FETCHED,
+    EXPORT_CUSTOMERS_NOT_FETCHED,
     GET_CUSTOMER_BAD_REQUEST,
+    GET_CUSTOMER_CHANGES_NOT_FETCHED,
     GET_CUSTOMER_NOT_FETCHED,
     GET_CUSTOMER_NOT_FOUND_404,
     GET_CUSTOMER_NOT_FOUND_500,
 )
 from customers.schemas import (
     CreateCustomerSchema,
+    GetCustomerChangesSchema,
     GetCustomerSchema,
     GetCustomersSchema,
 )
 
+_CREATE_CUSTOMER_QUERY: str = (
+    "select c, get_customer_version((c->>'id')::uuid) from create_customer(%s) c"
+)
+_GET_CUSTOMER_BY_ID_QUERY: str = (
+    "select get_customer_by_id(%s), get_customer_version(%s)"
+)
+_GET_CUSTOMER_VERSION_QUERY: str = "select get_customer_version(%s)"
+_GET_CUSTOMERS_BY_QUERY: str = "select get_customer_by(%s, %s)"
+_GET_CUSTOMER_CHANGES_QUERY: str = (
+    "select get_customer_changes(%s::bigint, %s::uuid, %s::integer, make_interval(secs => %s))"
+)
+# Export format -> COPY statement. The NDJSON lines are written in CSV format with quote and delimiter
+# characters which never occur in JSON, so that they are not escaped as in the text format
+_EXPORT_QUERIES: dict[str, str] = {
+    "csv": "copy (select id, name, email from export_customers()) to stdout (format csv, header)",
+    "ndjson": (
+        "copy (select json_object('id' value id, 'name' value name, 'email' value email)"
+        " from export_customers()) to stdout (format csv, quote e'\\x01', delimiter e'\\x02')"
+    ),
+}
+
 
-async def create_customer(customer_data: CreateCustomerSchema) -> GetCustomerSchema:
+async def create_customer(
+    customer_data: CreateCustomerSchema,
+) -> tuple[GetCustomerSchema, int]:
     """
     Creates a new customer in the database.
 
@@ -32,7 +76,7 @@ async def create_customer(customer_data: CreateCustomerSchema) -> GetCustomerSch
         customer_data (CreateCustomerSchema): The customer data to be created.
 
     Returns:
-        GetCustomerSchema: The created customer data.
+        tuple[GetCustomerSchema, int]: The created customer data and its version.
 
     Raises:
         CREATE_CUSTOMER_ALREADY_EXIST: If the customer already exists.
@@ -42,33 +86,36 @@ async def create_customer(customer_data: CreateCustomerSchema) -> GetCustomerSch
     try:
         async with get_cursor() as cursor:
             await cursor.execute(
-                "select create_customer(%s)",
+                _CREATE_CUSTOMER_QUERY,
                 [
                     customer_data.model_dump_json(),
                 ],
+                prepare=True,
             )
             record: tuple[Any, ...] | None = await cursor.fetchone()
             if not record:
                 raise CREATE_CUSTOMER_NOT_FETCHED
             customer: GetCustomerSchema = record[0]
+            version: int = record[1]
 
-    except AssertFailure:
-        raise CREATE_CUSTOMER_ALREADY_EXIST
+    except AssertFailure as e:
+        raise CREATE_CUSTOMER_ALREADY_EXIST from e
     except Exception as e:
-        raise CREATE_CUSTOMER_NOT_CREATED
+        raise CREATE_CUSTOMER_NOT_CREATED from e
 
-    return customer
+    _cache_customer(customer, version)
+    return customer, version
 
 
-async def get_customer_by_id(customer_id: UUID4) -> GetCustomerSchema:
+async def get_customer_by_id(customer_id: ID) -> tuple[GetCustomerSchema, int]:
     """
     Retrieves a customer from the database by their ID.
 
     Args:
-        customer_id (UUID4): The ID of the customer to retrieve.
+        customer_id (ID): The ID of the customer to retrieve.
 
     Returns:
-        GetCustomerSchema: The retrieved customer data.
+        tuple[GetCustomerSchema, int]: The retrieved customer data and its version.
 
     Raises:
         GET_CUSTOMER_BAD_REQUEST: If the customer ID is invalid.
@@ -76,27 +123,78 @@ async def get_customer_by_id(customer_id: UUID4) -> GetCustomerSchema:
         GET_CUSTOMER_NOT_FOUND_404: If the customer was not found.
         GET_CUSTOMER_NOT_FOUND_500: If an error occurred while fetching the customer.
     """
+    cached: bytes | None = cache_get(customer_id.bytes)
+    if cached is not None:
+        entry: dict[str, Any] = json.loads(cached)
+        return entry["customer"], entry["version"]
+
     try:
         async with get_cursor() as cursor:
             await cursor.execute(
-                "select get_customer_by_id(%s)",
+                _GET_CUSTOMER_BY_ID_QUERY,
                 [
                     customer_id,
+                    customer_id,
                 ],
+                prepare=True,
             )
             record: tuple[Any, ...] | None = await cursor.fetchone()
             if not record:
                 raise GET_CUSTOMER_NOT_FETCHED
             customer: GetCustomerSchema = record[0]
+            version: int = record[1]
 
-    except AssertFailure:
-        raise GET_CUSTOMER_BAD_REQUEST
-    except NoDataFound:
-        raise GET_CUSTOMER_NOT_FOUND_404
+    except AssertFailure as e:
+        raise GET_CUSTOMER_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise GET_CUSTOMER_NOT_FOUND_404 from e
     except Exception as e:
-        raise GET_CUSTOMER_NOT_FOUND_500
+        raise GET_CUSTOMER_NOT_FOUND_500 from e
 
-    return customer
+    _cache_customer(customer, version)
+    return customer, version
+
+
+async def get_customer_version(customer_id: ID) -> int:
+    """
+    Retrieves only the version of a customer, i.e. the time of its last modification in microseconds.
+    The version is always read from the database, never from the shared memory cache, so that a `304 Not Modified`
+    response is never sent for a customer changed since it was cached.
+
+    Args:
+        customer_id (ID): The ID of the customer.
+
+    Returns:
+        int: The version of the customer.
+
+    Raises:
+        GET_CUSTOMER_BAD_REQUEST: If the customer ID is invalid.
+        GET_CUSTOMER_NOT_FETCHED: If the version could not be fetched.
+        GET_CUSTOMER_NOT_FOUND_404: If the customer was not found.
+        GET_CUSTOMER_NOT_FOUND_500: If an error occurred while fetching the version.
+    """
+    try:
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _GET_CUSTOMER_VERSION_QUERY,
+                [
+                    customer_id,
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise GET_CUSTOMER_NOT_FETCHED
+            version: int = record[0]
+
+    except AssertFailure as e:
+        raise GET_CUSTOMER_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise GET_CUSTOMER_NOT_FOUND_404 from e
+    except Exception as e:
+        raise GET_CUSTOMER_NOT_FOUND_500 from e
+
+    return version
 
 
 async def get_customers_by(
@@ -122,29 +220,180 @@ async def get_customers_by(
     try:
         async with get_cursor() as cursor:
             await cursor.execute(
-                "select get_customer_by(%s, %s)",
+                _GET_CUSTOMERS_BY_QUERY,
                 [
                     name,
                     email,
                 ],
+                prepare=True,
             )
             record: tuple[Any, ...] | None = await cursor.fetchone()
             if not record:
                 raise GET_CUSTOMER_NOT_FETCHED
             customers: GetCustomersSchema = record[0]
 
-    except AssertFailure:
-        raise GET_CUSTOMER_BAD_REQUEST
-    except NoDataFound:
-        raise GET_CUSTOMER_NOT_FOUND_404
+    except AssertFailure as e:
+        raise GET_CUSTOMER_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise GET_CUSTOMER_NOT_FOUND_404 from e
     except Exception as e:
-        raise GET_CUSTOMER_NOT_FOUND_500
+        raise GET_CUSTOMER_NOT_FOUND_500 from e
 
     return customers
 
 
+async def get_customer_changes(
+    after: tuple[int, UUID] | None,
+    limit: int,
+    safety_lag: float,
+) -> GetCustomerChangesSchema:
+    """
+    Retrieves the customers created or updated after a keyset position, in the order of their last modification.
+
+    Args:
+        after (tuple[int, UUID] | None): The version and ID of the last customer already read, None to start.
+        limit (int): The maximum number of customers.
+        safety_lag (float): The customers changed within this number of seconds are left for the next call,
+            so that changes committed late by concurrent transactions are not skipped.
+
+    Returns:
+        GetCustomerChangesSchema: The changed customers, the cursor to resume from, and if more are available.
+
+    Raises:
+        GET_CUSTOMER_CHANGES_NOT_FETCHED: If the changes could not be fetched.
+    """
+    try:
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _GET_CUSTOMER_CHANGES_QUERY,
+                [
+                    after[0] if after else None,
+                    after[1] if after else None,
+                    limit + 1,
+                    safety_lag,
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise GET_CUSTOMER_CHANGES_NOT_FETCHED
+            customers: list[dict[str, Any]] = record[0]["customers"]
+
+    except Exception as e:
+        raise GET_CUSTOMER_CHANGES_NOT_FETCHED from e
+
+    has_more: bool = len(customers) > limit
+    customers = customers[:limit]
+    versions: list[int] = [customer.pop("version") for customer in customers]
+    if customers:
+        after = (versions[-1], UUID(customers[-1]["id"]))
+    return {
+        "customers": customers,
+        "next_cursor": encode_cursor(*(after or (0, UUID(int=0)))),
+        "has_more": has_more,
+    }
+
+
+async def export_customers(export_format: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Exports all the customers with `COPY ... TO STDOUT` on a dedicated connection, so that the export
+    does not hold a pool connection for its whole duration. The rows are read from the connection
+    only as fast as the returned iterator is consumed, so at most one chunk is buffered whatever
+    the number of customers, and a slow client slows the database down rather than filling the memory.
+
+    The connection is opened and the `COPY` started before returning, so that errors are raised here
+    rather than in the middle of the response; the connection is closed when the iterator is exhausted
+    or closed, including when it is closed without being iterated.
+
+    Args:
+        export_format (str): The format of the export, `csv` (with a header) or `ndjson`.
+        chunk_size (int): The minimum number of bytes of the chunks, except the last one.
+
+    Returns:
+        AsyncIterator[bytes]: The chunks of the export.
+
+    Raises:
+        EXPORT_CUSTOMERS_NOT_FETCHED: If the export could not be started.
+    """
+    chunks: AsyncIterator[bytes] = _copy_chunks(
+        _EXPORT_QUERIES[export_format], chunk_size
+    )
+    try:
+        # Runs the generator up to its first yield, once the COPY is started
+        await anext(chunks)
+    except Exception as e:
+        await chunks.aclose()
+        raise EXPORT_CUSTOMERS_NOT_FETCHED from e
+
+    return chunks
+
+
+async def _copy_chunks(query: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Runs a `COPY ... TO STDOUT` statement on a dedicated connection and yields its output in chunks.
+    PostgreSQL sends a message per row, which are joined into chunks of at least `chunk_size` bytes.
+    An empty chunk is yielded first, as soon as the statement is started.
+    """
+    async with dedicated_connection() as connection:
+        async with connection.cursor() as cursor:
+            async with cursor.copy(query) as copy:
+                yield b""
+                buffer: bytearray = bytearray()
+                async for data in copy:
+                    buffer += data
+                    if len(buffer) >= chunk_size:
+                        yield bytes(buffer)
+                        buffer.clear()
+                if buffer:
+                    yield bytes(buffer)
+
+
+def _cache_customer(customer: GetCustomerSchema, version: int) -> None:
+    """
+    Stores the serialized customer and its version in the shared memory cache, keyed by the customer ID bytes.
+    Customers read or created in a shared transaction are not cached, as the transaction may be rolled back.
+    """
+    if is_cache_enabled() and not in_shared_transaction():
+        validated: GetCustomerSchema = GetCustomerSchema.model_validate(customer)
+        entry: dict[str, Any] = {
+            "customer": validated.model_dump(mode="json"),
+            "version": version,
+        }
+        cache_set(validated.id.bytes, json.dumps(entry).encode())
+
+
+async def warm_up_connection(connection: AsyncConnection) -> None:
+    """
+    Executes and prepares the read statements of this module on a new pool connection, so nothing is written
+    nor locked. The lookups fail on a missing customer, so they are warmed up with a customer of the database
+    and skipped while there is none. `create_customer` is prepared by its first execution.
+
+    Args:
+        connection (AsyncConnection): The connection to warm up, in autocommit mode.
+    """
+    async with connection.cursor() as cursor:
+        await warm_up_statement(
+            cursor, _GET_CUSTOMER_CHANGES_QUERY, [None, None, 1, 0.0]
+        )
+        await cursor.execute("select id, email from customers limit 1")
+        sample: tuple[UUID, str] | None = await cursor.fetchone()
+        if sample is None:
+            return
+        customer_id, email = sample
+        await warm_up_statement(
+            cursor, _GET_CUSTOMER_BY_ID_QUERY, [customer_id, customer_id]
+        )
+        await warm_up_statement(cursor, _GET_CUSTOMER_VERSION_QUERY, [customer_id])
+        # psycopg prepares one statement per query text, whatever the parameters
+        await warm_up_statement(cursor, _GET_CUSTOMERS_BY_QUERY, [None, email])
+
+
 __all__: list[str] = [
     "create_customer",
     "get_customer_by_id",
+    "get_customer_version",
     "get_customers_by",
+    "get_customer_changes",
+    "export_customers",
+    "warm_up_connection",
 ]
@@ -0,0 +1,85 @@
+"""
+This module contains the invalidation of the customers kept in the shared memory cache.
+
+Customers may be updated or deleted around the service, e.g. directly in SQL. The `TRG_CUSTOMERS_CHANGED` trigger
+(see `db_scripts/functions.sql`) notifies the `customers_changed` channel with the ID of every changed customer,
+and a background task of each worker listens on that channel, on a dedicated connection, and evicts the customer
+from the cache, so the next read fetches it from the database. The notifications are delivered on commit.
+
+If the connection is lost, the task reconnects after a delay; the customers changed meanwhile are only evicted
+by their time to live.
+"""
+
+import asyncio
+import logging
+from uuid import UUID
+from common.cache.shared_memory import cache_delete
+from common.database.postgresql import dedicated_connection
+
+
+CHANNEL: str = "customers_changed"
+
+_task: asyncio.Task | None = None
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def _listen(retry_interval: float) -> None:
+    while True:
+        try:
+            async with dedicated_connection() as connection:
+                await connection.execute(f"LISTEN {CHANNEL}")
+                async for notify in connection.notifies():
+                    try:
+                        cache_delete(UUID(notify.payload).bytes)
+                    except ValueError:
+                        logger.warning(
+                            "Invalid customer ID notified on %s: %r",
+                            CHANNEL,
+                            notify.payload,
+                        )
+        except Exception as e:
+            logger.warning("Customer cache invalidation failed: %s", e)
+        await asyncio.sleep(retry_interval)
+
+
+def start_cache_invalidation(retry_interval: float = 5.0) -> None:
+    """
+    Starts evicting the changed customers from the shared memory cache.
+
+    Args:
+        retry_interval (float, optional): The number of seconds to wait before reconnecting
+            after the connection is lost. Defaults to 5.
+
+    Raises:
+        Exception: If the invalidation is already running.
+    """
+    global _task
+    if _task is not None:
+        raise Exception("Customer cache invalidation is already running")
+
+    _task = asyncio.get_running_loop().create_task(
+        _listen(retry_interval),
+        name="customer-cache-invalidation",
+    )
+
+
+async def stop_cache_invalidation() -> None:
+    """
+    Stops the invalidation task, if running.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__: list[str] = [
+    "CHANNEL",
+    "start_cache_invalidation",
+    "stop_cache_invalidation",
+]
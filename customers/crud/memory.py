@@ -0,0 +1,234 @@
+"""
+This module contains the in-memory customers repository.
+
+It keeps the customers of the worker process in dictionaries indexed by ID, name and email, and reproduces
+the semantics and errors of the database functions (see `db_scripts/functions.sql`):
+- creating a customer with the name and email of an existing one fails with 409 Conflict
+- retrieving a missing customer fails with 404 Not Found
+- searching without a name or email fails with 400 Bad Request, and finding no customer with 404 Not Found
+- the email `ANY` (case-insensitive) matches any email, and an empty email matches customers without one
+- the change feed lists the customers in the order of their version and ID, after the safety lag
+- the export writes the same CSV (with a header) and NDJSON rows as `COPY`, in chunks
+
+The customers are not shared between workers and are lost on restart.
+"""
+
+import csv
+import io
+import json
+import time
+from typing import Any, AsyncIterator
+from uuid import UUID
+from common.ids import ID, new_id
+from common.pagination import encode_cursor
+from customers.exceptions import (
+    CREATE_CUSTOMER_ALREADY_EXIST,
+    GET_CUSTOMER_BAD_REQUEST,
+    GET_CUSTOMER_NOT_FOUND_404,
+)
+from customers.schemas import (
+    CreateCustomerSchema,
+    GetCustomerChangesSchema,
+    GetCustomerSchema,
+    GetCustomersSchema,
+)
+
+# Customer ID -> (customer, version)
+__customers: dict[UUID, tuple[dict[str, Any], int]] = {}
+# Name -> IDs, email (None if the customer has none) -> IDs, in creation order
+__by_name: dict[str, list[UUID]] = {}
+__by_email: dict[str | None, list[UUID]] = {}
+
+
+async def create_customer(
+    customer_data: CreateCustomerSchema,
+) -> tuple[GetCustomerSchema, int]:
+    """
+    Creates a new customer in memory.
+
+    Args:
+        customer_data (CreateCustomerSchema): The customer data to be created.
+
+    Returns:
+        tuple[GetCustomerSchema, int]: The created customer data and its version.
+
+    Raises:
+        CREATE_CUSTOMER_ALREADY_EXIST: If a customer with the same name and email already exists.
+    """
+    email: str | None = customer_data.email or None
+    for existing_id in __by_name.get(customer_data.name, []):
+        if __customers[existing_id][0]["email"] == email:
+            raise CREATE_CUSTOMER_ALREADY_EXIST
+
+    customer_id: UUID = new_id()
+    customer: dict[str, Any] = {
+        "id": str(customer_id),
+        "name": customer_data.name,
+        "email": email,
+    }
+    version: int = time.time_ns() // 1000
+    __customers[customer_id] = (customer, version)
+    __by_name.setdefault(customer_data.name, []).append(customer_id)
+    __by_email.setdefault(email, []).append(customer_id)
+    return dict(customer), version
+
+
+async def get_customer_by_id(customer_id: ID) -> tuple[GetCustomerSchema, int]:
+    """
+    Retrieves a customer from memory by their ID.
+
+    Args:
+        customer_id (ID): The ID of the customer to retrieve.
+
+    Returns:
+        tuple[GetCustomerSchema, int]: The retrieved customer data and its version.
+
+    Raises:
+        GET_CUSTOMER_NOT_FOUND_404: If the customer was not found.
+    """
+    entry: tuple[dict[str, Any], int] | None = __customers.get(customer_id)
+    if entry is None:
+        raise GET_CUSTOMER_NOT_FOUND_404
+    return dict(entry[0]), entry[1]
+
+
+async def get_customer_version(customer_id: ID) -> int:
+    """
+    Retrieves only the version of a customer, i.e. the time of its creation in microseconds.
+
+    Args:
+        customer_id (ID): The ID of the customer.
+
+    Returns:
+        int: The version of the customer.
+
+    Raises:
+        GET_CUSTOMER_NOT_FOUND_404: If the customer was not found.
+    """
+    entry: tuple[dict[str, Any], int] | None = __customers.get(customer_id)
+    if entry is None:
+        raise GET_CUSTOMER_NOT_FOUND_404
+    return entry[1]
+
+
+async def get_customers_by(
+    name: str | None,
+    email: str | None,
+) -> GetCustomersSchema:
+    """
+    Retrieves customers from memory by their name or email.
+
+    Args:
+        name (str | None): The name of the customer to retrieve.
+        email (str | None): The email of the customer to retrieve, `ANY` for any email,
+            or an empty string for customers without one.
+
+    Returns:
+        GetCustomersSchema: The retrieved customers data.
+
+    Raises:
+        GET_CUSTOMER_BAD_REQUEST: If neither the customer name nor email is given.
+        GET_CUSTOMER_NOT_FOUND_404: If no customer was found.
+    """
+    any_email: bool = email is None or email.upper() == "ANY"
+    if not name and (any_email or email == ""):
+        raise GET_CUSTOMER_BAD_REQUEST
+
+    candidates: list[UUID]
+    if name:
+        candidates = __by_name.get(name, [])
+    else:
+        candidates = __by_email.get(email or None, [])
+
+    customers: list[dict[str, Any]] = [
+        dict(__customers[customer_id][0])
+        for customer_id in candidates
+        if any_email or __customers[customer_id][0]["email"] == (email or None)
+    ]
+    if not customers:
+        raise GET_CUSTOMER_NOT_FOUND_404
+    return {"customers": customers}
+
+
+async def get_customer_changes(
+    after: tuple[int, UUID] | None,
+    limit: int,
+    safety_lag: float,
+) -> GetCustomerChangesSchema:
+    """
+    Retrieves the customers created after a keyset position from memory, in the order of their version.
+    The customers are sorted on every call, which is fine for the sizes this repository is meant for.
+
+    Args:
+        after (tuple[int, UUID] | None): The version and ID of the last customer already read, None to start.
+        limit (int): The maximum number of customers.
+        safety_lag (float): The customers changed within this number of seconds are left for the next call.
+
+    Returns:
+        GetCustomerChangesSchema: The changed customers, the cursor to resume from, and if more are available.
+    """
+    horizon: int = time.time_ns() // 1000 - int(safety_lag * 1000000)
+    position: tuple[int, UUID] = after or (0, UUID(int=0))
+    changed: list[tuple[int, UUID]] = sorted(
+        (version, customer_id)
+        for customer_id, (_, version) in __customers.items()
+        if (version, customer_id) > position and version <= horizon
+    )
+    page: list[tuple[int, UUID]] = changed[:limit]
+    if page:
+        position = page[-1]
+    return {
+        "customers": [dict(__customers[customer_id][0]) for _, customer_id in page],
+        "next_cursor": encode_cursor(*position),
+        "has_more": len(changed) > limit,
+    }
+
+
+async def export_customers(export_format: str, chunk_size: int) -> AsyncIterator[bytes]:
+    """
+    Exports the customers from memory, in chunks of at least `chunk_size` bytes except the last one.
+    The customers existing when the export starts are exported.
+
+    Args:
+        export_format (str): The format of the export, `csv` (with a header) or `ndjson`.
+        chunk_size (int): The minimum number of bytes of the chunks, except the last one.
+
+    Returns:
+        AsyncIterator[bytes]: The chunks of the export.
+    """
+    return _export_chunks(
+        [customer for customer, _ in __customers.values()], export_format, chunk_size
+    )
+
+
+async def _export_chunks(
+    customers: list[dict[str, Any]], export_format: str, chunk_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Writes the customers as CSV or NDJSON and yields the output in chunks of at least `chunk_size` bytes.
+    """
+    buffer: io.StringIO = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if export_format == "csv":
+        writer.writerow(("id", "name", "email"))
+    for customer in customers:
+        if export_format == "csv":
+            writer.writerow((customer["id"], customer["name"], customer["email"]))
+        else:
+            buffer.write(json.dumps(customer, default=str) + "\n")
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+__all__: list[str] = [
+    "create_customer",
+    "get_customer_by_id",
+    "get_customer_version",
+    "get_customers_by",
+    "get_customer_changes",
+    "export_customers",
+]
@@ -0,0 +1,196 @@
+"""
+This module contains the customers repository, i.e. the storage backend behind `customers.crud`.
+
+The backend is selected at startup with `init_repository`:
+- `postgresql` (default): the database functions, see `customers.crud.customers`
+- `memory`: indexed dictionaries in the worker process, see `customers.crud.memory`, with the same semantics
+  and errors, so the HTTP stack can be exercised, profiled and load tested without a database
+
+The functions of this module delegate to the selected backend.
+The number of exports running at the same time in the worker is limited, as each one holds
+a dedicated database connection for its whole duration: see `export_max_running`, which the auto-sizing
+reserves in the connection budget.
+"""
+
+from types import ModuleType
+from typing import AsyncIterator, Awaitable, Callable, Protocol
+from uuid import UUID
+from common.ids import ID
+from customers.crud import customers as postgresql_repository
+from customers.crud import memory as memory_repository
+from customers.exceptions import EXPORT_CUSTOMERS_UNAVAILABLE
+from customers.schemas import (
+    CreateCustomerSchema,
+    GetCustomerChangesSchema,
+    GetCustomerSchema,
+    GetCustomersSchema,
+)
+
+
+class CustomerRepository(Protocol):
+    """
+    Interface of a customers repository, implemented by the modules of the backends.
+    """
+
+    async def create_customer(
+        self, customer_data: CreateCustomerSchema
+    ) -> tuple[GetCustomerSchema, int]: ...
+
+    async def get_customer_by_id(
+        self, customer_id: ID
+    ) -> tuple[GetCustomerSchema, int]: ...
+
+    async def get_customer_version(self, customer_id: ID) -> int: ...
+
+    async def get_customers_by(
+        self, name: str | None, email: str | None
+    ) -> GetCustomersSchema: ...
+
+    async def get_customer_changes(
+        self, after: tuple[int, UUID] | None, limit: int, safety_lag: float
+    ) -> GetCustomerChangesSchema: ...
+
+    async def export_customers(
+        self, export_format: str, chunk_size: int
+    ) -> AsyncIterator[bytes]: ...
+
+
+REPOSITORY_BACKENDS: dict[str, ModuleType] = {
+    "postgresql": postgresql_repository,
+    "memory": memory_repository,
+}
+
+__repository: CustomerRepository = postgresql_repository  # type: ignore[assignment]
+__changes_safety_lag: float = 2.0
+__export_chunk_size: int = 64 * 1024
+__export_max_running: int = 2
+# The number of running exports, including the ones opening their connection
+__exports_running: int = 0
+
+
+def init_repository(
+    backend: str,
+    changes_safety_lag: float = 2.0,
+    export_chunk_size: int = 64 * 1024,
+    export_max_running: int = 2,
+) -> None:
+    """
+    Selects the backend of the customers repository.
+
+    Args:
+        backend (str): The name of the backend, `postgresql` or `memory`.
+        changes_safety_lag (float, optional): The number of seconds the change feed stays behind the latest
+            changes, longer than the write transactions of the customers. Defaults to 2.0.
+        export_chunk_size (int, optional): The minimum number of bytes of the chunks of the exports,
+            i.e. the data buffered per export. Defaults to 64 KiB.
+        export_max_running (int, optional): The maximum number of exports running at the same time
+            in the worker. Defaults to 2.
+
+    Raises:
+        Exception: If the backend is unknown.
+    """
+    global __repository, __changes_safety_lag, __export_chunk_size, __export_max_running
+    if backend not in REPOSITORY_BACKENDS:
+        raise Exception(
+            f"Unknown repository backend {backend!r}, expected one of {', '.join(REPOSITORY_BACKENDS)}"
+        )
+    __repository = REPOSITORY_BACKENDS[backend]  # type: ignore[assignment]
+    __changes_safety_lag = changes_safety_lag
+    __export_chunk_size = export_chunk_size
+    __export_max_running = export_max_running
+
+
+async def create_customer(
+    customer_data: CreateCustomerSchema,
+) -> tuple[GetCustomerSchema, int]:
+    return await __repository.create_customer(customer_data)
+
+
+async def get_customer_by_id(customer_id: ID) -> tuple[GetCustomerSchema, int]:
+    return await __repository.get_customer_by_id(customer_id)
+
+
+async def get_customer_version(customer_id: ID) -> int:
+    return await __repository.get_customer_version(customer_id)
+
+
+async def get_customers_by(
+    name: str | None,
+    email: str | None,
+) -> GetCustomersSchema:
+    return await __repository.get_customers_by(name, email)
+
+
+async def get_customer_changes(
+    after: tuple[int, UUID] | None,
+    limit: int,
+) -> GetCustomerChangesSchema:
+    return await __repository.get_customer_changes(after, limit, __changes_safety_lag)
+
+
+async def export_customers(
+    export_format: str,
+) -> tuple[AsyncIterator[bytes], Callable[[], Awaitable[None]]]:
+    """
+    Starts an export of all the customers, see the `export_customers` function of the backends.
+    The export counts as running until it is closed, either when its chunks are exhausted or closed,
+    or by the returned close function. The close function is meant to run after the response,
+    e.g. as a background task, so that an export which is never iterated, because the client
+    disconnected first, still frees its slot and its connection. Closing more than once has no effect.
+
+    Returns:
+        tuple[AsyncIterator[bytes], Callable[[], Awaitable[None]]]: The chunks of the export and its close function.
+
+    Raises:
+        EXPORT_CUSTOMERS_UNAVAILABLE: If the maximum number of exports are already running.
+    """
+    global __exports_running
+    if __exports_running >= __export_max_running:
+        raise EXPORT_CUSTOMERS_UNAVAILABLE
+
+    __exports_running += 1
+    try:
+        chunks: AsyncIterator[bytes] = await __repository.export_customers(
+            export_format, __export_chunk_size
+        )
+    except BaseException:
+        __exports_running -= 1
+        raise
+
+    running: bool = True
+
+    async def close() -> None:
+        global __exports_running
+        nonlocal running
+        if running:
+            running = False
+            __exports_running -= 1
+            await chunks.aclose()
+
+    return _export(chunks, close), close
+
+
+async def _export(
+    chunks: AsyncIterator[bytes], close: Callable[[], Awaitable[None]]
+) -> AsyncIterator[bytes]:
+    """
+    Yields the chunks of an export, then closes it.
+    """
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await close()
+
+
+__all__: list[str] = [
+    "CustomerRepository",
+    "REPOSITORY_BACKENDS",
+    "create_customer",
+    "get_customer_by_id",
+    "get_customer_version",
+    "get_customers_by",
+    "get_customer_changes",
+    "export_customers",
+    "init_repository",
+]
@@ -76,6 +76,46 @@ GET_CUSTOMER_BAD_REQUEST: AppException = AppException(
     "bad_request",
 )
 
+GET_CUSTOMER_CHANGES_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "get_customer_changes",
+    ],
+    "Customer changes not fetched",
+    "not_fetched",
+)
+
+GET_CUSTOMER_CHANGES_BAD_REQUEST: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "query",
+        "since",
+    ],
+    "The cursor is invalid",
+    "bad_request",
+)
+
+EXPORT_CUSTOMERS_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "export_customers",
+    ],
+    "Customers not exported",
+    "not_fetched",
+)
+
+EXPORT_CUSTOMERS_UNAVAILABLE: AppException = AppException(
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+    [
+        "db",
+        "export_customers",
+    ],
+    "Too many customer exports in progress",
+    "unavailable",
+)
+
 __all__: list[str] = [
     "CREATE_CUSTOMER_NOT_FETCHED",
     "CREATE_CUSTOMER_NOT_CREATED",
@@ -84,4 +124,8 @@ __all__: list[str] = [
     "GET_CUSTOMER_NOT_FOUND_404",
     "GET_CUSTOMER_NOT_FOUND_500",
     "GET_CUSTOMER_BAD_REQUEST",
+    "GET_CUSTOMER_CHANGES_NOT_FETCHED",
+    "GET_CUSTOMER_CHANGES_BAD_REQUEST",
+    "EXPORT_CUSTOMERS_NOT_FETCHED",
+    "EXPORT_CUSTOMERS_UNAVAILABLE",
 ]
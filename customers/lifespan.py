@@ -0,0 +1,52 @@
+"""
+This module contains the startup and shutdown of the customers service, run by the lifespan of `common.app`
+once the database pool is open: the shared memory cache, the ID generation, the repository backend
+and the invalidation of the cached customers.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from common.cache.shared_memory import init_cache, close_cache
+from common.ids import init_ids
+from customers.config import Settings
+from customers.crud import (
+    init_repository,
+    start_cache_invalidation,
+    stop_cache_invalidation,
+)
+
+
+@asynccontextmanager
+async def customers_lifespan(settings: Settings) -> AsyncIterator[None]:
+    """
+    Starts and stops the customers service.
+
+    Args:
+        settings (Settings): The settings of the service.
+    """
+    if settings.cache_enabled:
+        init_cache(
+            settings.cache_path,
+            settings.cache_slots,
+            settings.cache_slot_size,
+            settings.cache_ttl,
+        )
+    init_ids(settings.id_version)
+    init_repository(
+        settings.repository_backend,
+        settings.changes_safety_lag,
+        settings.export_chunk_size,
+        settings.export_max_running,
+    )
+    # The in-memory repository serves the customers without a database
+    if settings.cache_enabled and settings.repository_backend != "memory":
+        start_cache_invalidation()
+    yield
+    await stop_cache_invalidation()
+    close_cache()
+
+
+__all__: list[str] = [
+    "customers_lifespan",
+]
@@ -1,28 +1,49 @@
 """
 This module contains the routes for the customers resource.
 It includes routes for creating a new customer, retrieving a customer by id,
-and retrieving customers by name and/or email.
+retrieving customers by name and/or email, reading the change feed of the customers,
+and exporting all the customers as a CSV or NDJSON stream.
 The routes return the appropriate response data using schemas for the request data and response data.
+Single customer responses carry a strong ETag, and `If-None-Match` requests for unchanged customers
+are answered with 304 Not Modified using a version-only lookup.
 """
 
-from pydantic import UUID4
-from fastapi import APIRouter, Request, status
+from typing import AsyncIterator, Awaitable, Callable, Literal
+from uuid import UUID
+from fastapi import APIRouter, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from common.conditional import etag_matches, make_etag
+from common.ids import ID
+from common.pagination import decode_cursor
+from common.negotiation import NegotiatedRoute
 from common.validations import require_json_accept
+from customers.exceptions import GET_CUSTOMER_CHANGES_BAD_REQUEST
 from customers.schemas import (
+    GetCustomerChangesSchema,
     GetCustomerSchema,
     GetCustomersSchema,
     CreateCustomerSchema,
 )
 from customers.crud import (
     db_get_customer_by_id,
+    db_get_customer_changes,
+    db_export_customers,
+    db_get_customer_version,
     db_get_customers_by,
     db_create_customer,
 )
 
+# Export format -> media type
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
 
 router = APIRouter(
     prefix="/api/customers",
     tags=["customers"],
+    route_class=NegotiatedRoute,
 )
 
 
@@ -33,40 +54,134 @@ router = APIRouter(
 )
 @require_json_accept
 async def create_customer(
-    request: Request, customer_data: CreateCustomerSchema
+    request: Request, response: Response, customer_data: CreateCustomerSchema
 ) -> GetCustomerSchema:
     """
     Create a new customer.
 
     Args:
         request (Request): The incoming request object.
+        response (Response): The outgoing response object, used to set the ETag header.
         customer_data (CreateCustomerSchema): The customer data to create.
 
     Returns:
         GetCustomerSchema: The created customer data.
     """
-    customer: GetCustomerSchema = await db_create_customer(customer_data)
+    customer, version = await db_create_customer(customer_data)
+    response.headers["ETag"] = make_etag(customer["id"], version)
     return customer
 
 
+# Declared before /{customer_id}, which would otherwise match the path
+@router.get(
+    "/changes",
+    response_model=GetCustomerChangesSchema,
+    status_code=status.HTTP_200_OK,
+)
+@require_json_accept
+async def get_customer_changes(
+    request: Request,
+    since: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+) -> GetCustomerChangesSchema:
+    """
+    Get the customers created or updated since a cursor, in the order of their last modification.
+    Start without `since`, then pass the `next_cursor` of the previous response: every call costs
+    an index seek and the changes it returns, whatever the number of customers. Read again while
+    `has_more` is true; the latest changes are returned after a short safety lag.
+
+    Args:
+        request (Request): The incoming request object.
+        since (str | None, optional): The cursor returned by the previous call. Defaults to None, i.e. from the start.
+        limit (int, optional): The maximum number of customers. Defaults to 100.
+
+    Returns:
+        GetCustomerChangesSchema: The changed customers, the cursor to resume from, and if more are available.
+    """
+    after: tuple[int, UUID] | None = None
+    if since:
+        try:
+            after = decode_cursor(since)
+        except ValueError as e:
+            raise GET_CUSTOMER_CHANGES_BAD_REQUEST from e
+
+    changes: GetCustomerChangesSchema = await db_get_customer_changes(after, limit)
+    return changes
+
+
+# Declared before /{customer_id}, which would otherwise match the path
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}
+        }
+    },
+)
+async def export_customers(
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Export all the customers, streamed as they are read from the database: one JSON object per line
+    (`ndjson`), or CSV with a header (`csv`). The memory used does not depend on the number of customers,
+    and the export runs on a connection of its own, so it does not hold up the other requests.
+
+    Args:
+        request (Request): The incoming request object.
+        export_format (Literal["ndjson", "csv"], optional): The format of the export. Defaults to `ndjson`.
+
+    Returns:
+        StreamingResponse: The streamed export.
+    """
+    chunks: AsyncIterator[bytes]
+    close: Callable[[], Awaitable[None]]
+    chunks, close = await db_export_customers(export_format)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="customers.{export_format}"'
+        },
+        # Frees the export even if the response body is never iterated
+        background=BackgroundTask(close),
+    )
+
+
 @router.get(
     "/{customer_id}",
     response_model=GetCustomerSchema,
     status_code=status.HTTP_200_OK,
 )
 @require_json_accept
-async def get_customer_by_id(request: Request, customer_id: UUID4) -> GetCustomerSchema:
+async def get_customer_by_id(
+    request: Request, response: Response, customer_id: ID
+) -> GetCustomerSchema | Response:
     """
     Get a customer by their ID.
+    If the `If-None-Match` header matches the current ETag, only the version is fetched
+    and a 304 Not Modified response without a body is returned.
 
     Args:
         request (Request): The incoming request object.
-        customer_id (UUID4): The ID of the customer to retrieve.
+        response (Response): The outgoing response object, used to set the ETag header.
+        customer_id (ID): The ID of the customer to retrieve.
 
     Returns:
-        GetCustomerSchema: The customer data.
+        GetCustomerSchema | Response: The customer data, or a 304 Not Modified response.
     """
-    customer: GetCustomerSchema = await db_get_customer_by_id(customer_id)
+    if_none_match: str | None = request.headers.get("If-None-Match")
+    if if_none_match:
+        etag: str = make_etag(customer_id, await db_get_customer_version(customer_id))
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+    customer, version = await db_get_customer_by_id(customer_id)
+    response.headers["ETag"] = make_etag(customer_id, version)
     return customer
 
 
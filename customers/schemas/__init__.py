@@ -2,10 +2,12 @@ from .customers import (
     CreateCustomerSchema,
     GetCustomerSchema,
     GetCustomersSchema,
+    GetCustomerChangesSchema,
 )
 
 __all__: list[str] = [
     "CreateCustomerSchema",
     "GetCustomerSchema",
     "GetCustomersSchema",
+    "GetCustomerChangesSchema",
 ]
@@ -4,12 +4,17 @@ This module defines the schemas for the /api/customers endpoint.
 The CreateCustomerSchema class represents a customer to be created with fields for name and email.
 The GetCustomerSchema class represents a customer to be returned with fields for id, name, and email.
 The GetCustomersSchema class represents a list of customers to be returned.
+The GetCustomerChangesSchema class represents a page of the change feed of the customers to be returned.
 
 Each class includes field validation and documentation examples for each field.
 """
 
 import re
-from pydantic import BaseModel, ConfigDict, EmailStr, UUID4, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from common.ids import ID
+
+# Special chars allowed in names besides alphanumerics, compiled once at import
+_NAME_ALLOWED_SPECIAL_CHARS: re.Pattern[str] = re.compile(r"[ \\/\.'&,_\-+@]")
 
 
 class CreateCustomerSchema(BaseModel):
@@ -30,7 +35,7 @@ class CreateCustomerSchema(BaseModel):
         name: str = v.strip()
         if not name:
             raise ValueError("Field 'name' cannot be empty")
-        if not re.sub(r"[ \\/\.'&,_\-+@]", "", name).isalnum():
+        if not _NAME_ALLOWED_SPECIAL_CHARS.sub("", name).isalnum():
             raise ValueError("Field 'name' must contain only allowed chars")
         if len(name) > 256:
             raise ValueError("Field 'name' must not be greater than 256 characters")
@@ -56,7 +61,7 @@ class GetCustomerSchema(CreateCustomerSchema):
     Get Customer response object
     """
 
-    id: UUID4
+    id: ID
 
     model_config: ConfigDict = {
         "json_schema_extra": {
@@ -95,8 +100,37 @@ class GetCustomersSchema(BaseModel):
     }
 
 
+class GetCustomerChangesSchema(BaseModel):
+    """
+    Get Customer Changes response object
+    """
+
+    customers: list[GetCustomerSchema]
+    next_cursor: str
+    has_more: bool
+
+    model_config: ConfigDict = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "customers": [
+                        {
+                            "id": "00000000-0000-0000-0000-000000000000",
+                            "name": "John Doe",
+                            "email": "john@example.com",
+                        }
+                    ],
+                    "next_cursor": "AAYJ2Q7sm0gAAAAAAAAAAAAAAAAAAAAA",
+                    "has_more": False,
+                }
+            ]
+        },
+    }
+
+
 __all__: list[str] = [
     "CreateCustomerSchema",
     "GetCustomerSchema",
     "GetCustomersSchema",
+    "GetCustomerChangesSchema",
 ]
@@ -112,6 +112,39 @@ REVOKE ALL ON FUNCTION ecommerce.get_customer_by_id(uuid) FROM robotfw;
 GRANT EXECUTE ON FUNCTION ecommerce.get_customer_by_id(uuid) TO postgres WITH GRANT OPTION;
 GRANT EXECUTE ON FUNCTION ecommerce.get_customer_by_id(uuid) TO api;
 
+/*--------- FUNCTION: ecommerce.get_customer_version ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.get_customer_version(uuid);
+CREATE OR REPLACE FUNCTION ecommerce.get_customer_version(
+	customer_id uuid)
+    RETURNS bigint
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	customer_version bigint;
+BEGIN
+	IF customer_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "id"';
+	END IF;
+
+	SELECT (EXTRACT(EPOCH FROM COALESCE(c.updated_at, c.created_at)) * 1000000)::bigint
+	  INTO STRICT customer_version
+	  FROM ecommerce.customers c
+	 WHERE c.id = customer_id;
+
+	RETURN customer_version;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.get_customer_version(uuid) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.get_customer_version(uuid) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.get_customer_version(uuid) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_version(uuid) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_version(uuid) TO api;
+
 /*--------- FUNCTION: ecommerce.create_customer ------------*/
 -- DROP FUNCTION IF EXISTS ecommerce.create_customer(jsonb);
 CREATE OR REPLACE FUNCTION ecommerce.create_customer(
@@ -167,3 +200,589 @@ REVOKE ALL ON FUNCTION ecommerce.create_customer(jsonb) FROM robotfw;
 
 GRANT EXECUTE ON FUNCTION ecommerce.create_customer(jsonb) TO postgres WITH GRANT OPTION;
 GRANT EXECUTE ON FUNCTION ecommerce.create_customer(jsonb) TO api;
+
+/*--------- FUNCTION: ecommerce.get_customer_changes ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.get_customer_changes(bigint, uuid, integer, interval);
+CREATE OR REPLACE FUNCTION ecommerce.get_customer_changes(
+	after_version bigint,
+	after_id uuid,
+	max_customers integer,
+	safety_lag interval)
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	after_changed_at timestamp with time zone = '-infinity';
+	customers json;
+BEGIN
+	IF max_customers IS NULL OR max_customers < 1 THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "limit"';
+	END IF;
+	-- The version is the time of the last modification in microseconds, see get_customer_version
+	IF after_version IS NOT NULL THEN
+		after_changed_at = 'epoch'::timestamp with time zone + after_version * INTERVAL '1 microsecond';
+	END IF;
+
+	-- Keyset pagination on IDX_CUSTOMERS_CHANGES. The customers changed within the safety lag are left
+	-- for the next call: a transaction that started earlier may still commit a change with an earlier time
+	SELECT json_arrayagg(json_object('id' VALUE ch.id,
+									  'name' VALUE ch.name,
+									  'email' VALUE ch.email,
+									  'version' VALUE (EXTRACT(EPOCH FROM ch.changed_at) * 1000000)::bigint)
+						 ORDER BY ch.changed_at, ch.id)
+	  INTO customers
+	  FROM (SELECT c.id, c.name, c.email, COALESCE(c.updated_at, c.created_at) AS changed_at
+			  FROM ecommerce.customers c
+			 WHERE (COALESCE(c.updated_at, c.created_at), c.id)
+				   > (after_changed_at, COALESCE(after_id, '00000000-0000-0000-0000-000000000000'))
+			   AND COALESCE(c.updated_at, c.created_at) <= statement_timestamp() - safety_lag
+			 ORDER BY COALESCE(c.updated_at, c.created_at), c.id
+			 LIMIT max_customers) ch;
+
+	RETURN json_object('customers': COALESCE(customers, '[]'::json));
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.get_customer_changes(bigint, uuid, integer, interval) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.get_customer_changes(bigint, uuid, integer, interval) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.get_customer_changes(bigint, uuid, integer, interval) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_changes(bigint, uuid, integer, interval) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_changes(bigint, uuid, integer, interval) TO api;
+
+/*--------- FUNCTION: ecommerce.export_customers ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.export_customers();
+-- All the customers as rows, read by COPY (SELECT ... FROM ecommerce.export_customers()) TO STDOUT.
+-- A STABLE SQL function is inlined into the query, so the rows are streamed as the table is scanned
+-- instead of being collected into one document (see get_customer_by) or a tuplestore
+CREATE OR REPLACE FUNCTION ecommerce.export_customers()
+    RETURNS TABLE(id uuid, name character varying, email character varying)
+    LANGUAGE 'sql'
+    COST 100
+    STABLE PARALLEL SAFE
+AS $BODY$
+	SELECT c.id, c.name, c.email
+	  FROM ecommerce.customers c;
+$BODY$;
+
+ALTER FUNCTION ecommerce.export_customers() OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.export_customers() FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.export_customers() FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.export_customers() TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.export_customers() TO api;
+
+/*--------- FUNCTION: ecommerce.uuid_v7_created_at ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.uuid_v7_created_at(uuid);
+-- The time in a version 7 UUID, NULL for other versions; it bounds the creation time of a row
+-- by its ID, so lookups by ID scan only the partitions of that time (see partitioning.sql)
+CREATE OR REPLACE FUNCTION ecommerce.uuid_v7_created_at(
+	id uuid)
+    RETURNS timestamp with time zone
+    LANGUAGE 'sql'
+    COST 100
+    IMMUTABLE PARALLEL SAFE
+AS $BODY$
+	SELECT CASE
+			 WHEN get_byte(uuid_send(id), 6) >> 4 = 7
+			 THEN to_timestamp(('x' || substr(encode(uuid_send(id), 'hex'), 1, 12))::bit(48)::bigint / 1000.0)
+		   END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.uuid_v7_created_at(uuid) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.uuid_v7_created_at(uuid) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_v7_created_at(uuid) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_v7_created_at(uuid) TO api;
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_v7_created_at(uuid) TO robotfw;
+
+/*--------- FUNCTION: ecommerce.get_order_by_id ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.get_order_by_id(uuid);
+CREATE OR REPLACE FUNCTION ecommerce.get_order_by_id(
+	order_id uuid)
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	order_json json;
+	id_created_at timestamp with time zone;
+	created_after timestamp with time zone = '-infinity';
+	created_before timestamp with time zone = 'infinity';
+BEGIN
+	IF order_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "id"';
+	END IF;
+
+	-- Orders with a version 7 ID were created around the time of the ID
+	id_created_at = ecommerce.uuid_v7_created_at(order_id);
+	IF id_created_at IS NOT NULL THEN
+		created_after = id_created_at - INTERVAL '1 day';
+		created_before = id_created_at + INTERVAL '1 day';
+	END IF;
+
+	-- Order items are created with their order, the bound on their creation time prunes the other partitions;
+	-- the status is the ID, the services map it to its name, and the version is the one of update_order_status
+	SELECT json_object('id' VALUE o.id,
+						'created_at' VALUE o.created_at,
+						'status' VALUE o.status,
+						'version' VALUE o.version,
+						'items' VALUE (SELECT json_arrayagg(
+												json_object('id' VALUE oi.id,
+															'item_id' VALUE oi.item_id,
+															'name' VALUE i.name,
+															'price' VALUE oi.unit_price,
+															'quantity' VALUE oi.quantity)
+												ORDER BY oi.created_at, oi.id)
+										 FROM ecommerce.order_items oi
+										 JOIN ecommerce.items i
+										   ON i.id = oi.item_id
+										WHERE oi.order_id = o.id
+										  AND oi.created_at >= o.created_at))
+	  INTO STRICT order_json
+	  FROM ecommerce.orders o
+	 WHERE o.id = get_order_by_id.order_id
+	   AND o.created_at BETWEEN created_after AND created_before;
+
+	RETURN order_json;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.get_order_by_id(uuid) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.get_order_by_id(uuid) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.get_order_by_id(uuid) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.get_order_by_id(uuid) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.get_order_by_id(uuid) TO api;
+
+/*--------- FUNCTION: ecommerce.get_customer_orders ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.get_customer_orders(uuid, timestamp with time zone, integer);
+CREATE OR REPLACE FUNCTION ecommerce.get_customer_orders(
+	customer_id uuid,
+	created_since timestamp with time zone DEFAULT NULL::timestamp with time zone,
+	max_orders integer DEFAULT NULL::integer)
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	orders json;
+BEGIN
+	IF customer_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "customer_id"';
+	END IF;
+
+	-- The most recent orders first; created_since prunes the partitions of older orders.
+	-- The status is the ID, the services map it to its name
+	SELECT json_arrayagg(co.order_json ORDER BY co.created_at DESC, co.id)
+	  INTO orders
+	  FROM (SELECT o.id,
+				   o.created_at,
+				   json_object('id' VALUE o.id,
+							   'created_at' VALUE o.created_at,
+							   'status' VALUE o.status,
+							   'items' VALUE (SELECT json_arrayagg(
+													   json_object('id' VALUE oi.id,
+																   'item_id' VALUE oi.item_id,
+																   'name' VALUE i.name,
+																   'price' VALUE oi.unit_price,
+																   'quantity' VALUE oi.quantity)
+													   ORDER BY oi.created_at, oi.id)
+												FROM ecommerce.order_items oi
+												JOIN ecommerce.items i
+												  ON i.id = oi.item_id
+											   WHERE oi.order_id = o.id
+												 AND oi.created_at >= o.created_at)) AS order_json
+			  FROM ecommerce.orders o
+			 WHERE o.customer_id = get_customer_orders.customer_id
+			   AND o.created_at >= COALESCE(created_since, '-infinity')
+			 ORDER BY o.created_at DESC, o.id
+			 LIMIT max_orders) co;
+
+	RETURN json_object('orders': COALESCE(orders, '[]'::json));
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.get_customer_orders(uuid, timestamp with time zone, integer) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.get_customer_orders(uuid, timestamp with time zone, integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.get_customer_orders(uuid, timestamp with time zone, integer) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_orders(uuid, timestamp with time zone, integer) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_orders(uuid, timestamp with time zone, integer) TO api;
+
+/*--------- FUNCTION: ecommerce.create_order ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.create_order(jsonb);
+CREATE OR REPLACE FUNCTION ecommerce.create_order(
+	order_json jsonb)
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	order_customer_id uuid;
+	new_order_id uuid;
+	new_order_created_at timestamp with time zone;
+	new_order_total numeric;
+BEGIN
+	order_customer_id = (order_json->>'customer_id')::uuid;
+	IF order_customer_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "customer_id"';
+	END IF;
+	IF jsonb_array_length(COALESCE(order_json->'items', '[]'::jsonb)) = 0 THEN
+		RAISE assert_failure USING MESSAGE = 'Order cannot be empty';
+	END IF;
+
+	PERFORM 1
+	   FROM ecommerce.customers c
+	  WHERE c.id = order_customer_id;
+	IF NOT FOUND THEN
+		RAISE no_data_found USING MESSAGE = 'customer not found';
+	END IF;
+
+	-- The services pass the ID of the New status, which they have loaded at startup
+	INSERT INTO ecommerce.orders (customer_id, status)
+		 VALUES (order_customer_id,
+				 COALESCE((order_json->>'status')::uuid,
+						  (SELECT s.id FROM ecommerce.order_statuses s WHERE s.status = 'New')))
+	  RETURNING orders.id, orders.created_at
+		   INTO STRICT new_order_id, new_order_created_at;
+
+	-- The items share the creation time of their order, which the partitioned tables rely on,
+	-- and keep the price of the item at that time, which the order is valued at;
+	-- an unknown item fails with foreign_key_violation
+	WITH new_order_items AS (
+		INSERT INTO ecommerce.order_items (order_id, item_id, quantity, unit_price, created_at)
+			 SELECT new_order_id, oi.item_id, oi.quantity, COALESCE(i.price, 0), new_order_created_at
+			   FROM jsonb_to_recordset(order_json->'items') oi
+					  (
+						item_id uuid,
+						quantity integer
+					  )
+			   LEFT JOIN ecommerce.items i
+				 ON i.id = oi.item_id
+		  RETURNING order_items.unit_price, order_items.quantity
+	)
+	SELECT COALESCE(sum(oi.unit_price * oi.quantity), 0)
+	  INTO new_order_total
+	  FROM new_order_items oi;
+
+	-- In the same transaction as the order, see rebuild_customer_order_summaries for the definition
+	INSERT INTO ecommerce.customer_order_summaries AS cs (customer_id, order_count, lifetime_value, last_order_at)
+		 VALUES (order_customer_id, 1, new_order_total, new_order_created_at)
+	ON CONFLICT (customer_id) DO UPDATE
+			SET order_count = cs.order_count + 1,
+				lifetime_value = cs.lifetime_value + EXCLUDED.lifetime_value,
+				last_order_at = GREATEST(cs.last_order_at, EXCLUDED.last_order_at),
+				updated_at = CURRENT_TIMESTAMP;
+
+	RETURN ecommerce.get_order_by_id(new_order_id);
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.create_order(jsonb) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.create_order(jsonb) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.create_order(jsonb) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.create_order(jsonb) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.create_order(jsonb) TO api;
+
+/*--------- FUNCTION: ecommerce.update_order_status ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.update_order_status(uuid, uuid, integer, uuid[]);
+CREATE OR REPLACE FUNCTION ecommerce.update_order_status(
+	order_id uuid,
+	new_status uuid,
+	expected_version integer,
+	from_statuses uuid[])
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	id_created_at timestamp with time zone;
+	created_after timestamp with time zone = '-infinity';
+	created_before timestamp with time zone = 'infinity';
+	current_version integer;
+BEGIN
+	IF order_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "id"';
+	END IF;
+	IF new_status IS NULL OR expected_version IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Fields required: "status", "version"';
+	END IF;
+
+	id_created_at = ecommerce.uuid_v7_created_at(order_id);
+	IF id_created_at IS NOT NULL THEN
+		created_after = id_created_at - INTERVAL '1 day';
+		created_before = id_created_at + INTERVAL '1 day';
+	END IF;
+
+	-- Optimistic concurrency: the update only applies to the version the client has read, in a single statement,
+	-- so no lock is held between reading and updating the order and a concurrent update is never overwritten
+	UPDATE ecommerce.orders o
+	   SET status = new_status,
+		   version = o.version + 1,
+		   updated_at = clock_timestamp(),
+		   updated_by = CURRENT_USER
+	 WHERE o.id = update_order_status.order_id
+	   AND o.created_at BETWEEN created_after AND created_before
+	   AND o.version = expected_version
+	   AND o.status = ANY (from_statuses);
+
+	IF NOT FOUND THEN
+		SELECT o.version
+		  INTO STRICT current_version
+		  FROM ecommerce.orders o
+		 WHERE o.id = update_order_status.order_id
+		   AND o.created_at BETWEEN created_after AND created_before;
+
+		IF current_version <> expected_version THEN
+			RAISE serialization_failure USING MESSAGE = 'order version mismatch';
+		END IF;
+		RAISE check_violation USING MESSAGE = 'order status transition not allowed';
+	END IF;
+
+	RETURN ecommerce.get_order_by_id(order_id);
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.update_order_status(uuid, uuid, integer, uuid[]) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.update_order_status(uuid, uuid, integer, uuid[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.update_order_status(uuid, uuid, integer, uuid[]) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.update_order_status(uuid, uuid, integer, uuid[]) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.update_order_status(uuid, uuid, integer, uuid[]) TO api;
+
+/*--------- FUNCTION: ecommerce.get_customer_order_summary ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.get_customer_order_summary(uuid);
+CREATE OR REPLACE FUNCTION ecommerce.get_customer_order_summary(
+	customer_id uuid)
+    RETURNS json
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	summary_json json;
+BEGIN
+	IF customer_id IS NULL THEN
+		RAISE assert_failure USING MESSAGE = 'Field required: "customer_id"';
+	END IF;
+
+	-- A customer without orders has no summary yet
+	SELECT json_object('customer_id' VALUE c.id,
+						'order_count' VALUE COALESCE(cs.order_count, 0),
+						'lifetime_value' VALUE COALESCE(cs.lifetime_value, 0),
+						'last_order_at' VALUE cs.last_order_at)
+	  INTO STRICT summary_json
+	  FROM ecommerce.customers c
+	  LEFT JOIN ecommerce.customer_order_summaries cs
+		ON cs.customer_id = c.id
+	 WHERE c.id = get_customer_order_summary.customer_id;
+
+	RETURN summary_json;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.get_customer_order_summary(uuid) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.get_customer_order_summary(uuid) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.get_customer_order_summary(uuid) FROM robotfw;
+
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_order_summary(uuid) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.get_customer_order_summary(uuid) TO api;
+
+/*--------- FUNCTION: ecommerce.rebuild_customer_order_summaries ------------*/
+-- The version without arguments rebuilt all the summaries at once, under a table lock
+DROP FUNCTION IF EXISTS ecommerce.rebuild_customer_order_summaries();
+-- DROP FUNCTION IF EXISTS ecommerce.rebuild_customer_order_summaries(uuid, integer);
+CREATE OR REPLACE FUNCTION ecommerce.rebuild_customer_order_summaries(
+	after_customer_id uuid DEFAULT NULL::uuid,
+	batch_size integer DEFAULT 1000,
+	OUT last_customer_id uuid,
+	OUT rebuilt integer)
+    RETURNS record
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+AS $BODY$
+DECLARE
+	voided uuid = (SELECT s.id FROM ecommerce.order_statuses s WHERE s.status = 'Voided');
+	batch uuid[];
+	deleted integer;
+BEGIN
+	IF batch_size IS NULL OR batch_size < 1 THEN
+		RAISE assert_failure USING MESSAGE = 'Field must be positive: "batch_size"';
+	END IF;
+
+	-- The next batch of customers, in ID order. Locking them makes the orders created meanwhile for these customers
+	-- wait (their foreign key check shares the lock), only until the transaction of the batch ends
+	SELECT array_agg(b.id ORDER BY b.id)
+	  INTO batch
+	  FROM (SELECT c.id
+			  FROM ecommerce.customers c
+			 WHERE c.id > COALESCE(after_customer_id, '00000000-0000-0000-0000-000000000000'::uuid)
+			 ORDER BY c.id
+			 LIMIT batch_size
+			   FOR UPDATE) b;
+	IF batch IS NULL THEN
+		rebuilt = 0;
+		RETURN;
+	END IF;
+	last_customer_id = batch[array_upper(batch, 1)];
+
+	-- Locking their summaries makes the status changes of their orders wait too, so the summaries computed below
+	-- from the orders committed by now are not overwritten by, nor overwrite, a concurrent change
+	PERFORM 1
+	   FROM ecommerce.customer_order_summaries cs
+	  WHERE cs.customer_id = ANY (batch)
+		FOR UPDATE;
+
+	DELETE FROM ecommerce.customer_order_summaries cs
+	 WHERE cs.customer_id = ANY (batch)
+	   AND NOT EXISTS (SELECT 1 FROM ecommerce.orders o WHERE o.customer_id = cs.customer_id);
+	GET DIAGNOSTICS deleted = ROW_COUNT;
+
+	-- The value of an order is the sum of its items at the prices they were ordered at, the voided orders
+	-- are not counted; only the summaries which differ are written
+	INSERT INTO ecommerce.customer_order_summaries AS cs (customer_id, order_count, lifetime_value, last_order_at)
+		 SELECT o.customer_id,
+				count(*) FILTER (WHERE o.status IS DISTINCT FROM voided),
+				COALESCE(sum(t.total) FILTER (WHERE o.status IS DISTINCT FROM voided), 0),
+				max(o.created_at)
+		   FROM ecommerce.orders o
+		   LEFT JOIN LATERAL (SELECT sum(oi.unit_price * oi.quantity) AS total
+								FROM ecommerce.order_items oi
+							   WHERE oi.order_id = o.id
+								 AND oi.created_at >= o.created_at) t
+			 ON true
+		  WHERE o.customer_id = ANY (batch)
+		  GROUP BY o.customer_id
+	ON CONFLICT (customer_id) DO UPDATE
+			SET order_count = EXCLUDED.order_count,
+				lifetime_value = EXCLUDED.lifetime_value,
+				last_order_at = EXCLUDED.last_order_at,
+				updated_at = CURRENT_TIMESTAMP
+		  WHERE (cs.order_count, cs.lifetime_value, cs.last_order_at)
+				IS DISTINCT FROM (EXCLUDED.order_count, EXCLUDED.lifetime_value, EXCLUDED.last_order_at);
+
+	GET DIAGNOSTICS rebuilt = ROW_COUNT;
+	rebuilt = rebuilt + deleted;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.rebuild_customer_order_summaries(uuid, integer) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.rebuild_customer_order_summaries(uuid, integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION ecommerce.rebuild_customer_order_summaries(uuid, integer) FROM api;
+
+GRANT EXECUTE ON FUNCTION ecommerce.rebuild_customer_order_summaries(uuid, integer) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.rebuild_customer_order_summaries(uuid, integer) TO robotfw;
+
+/*--------- FUNCTION: ecommerce.update_customer_order_summary ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.update_customer_order_summary();
+CREATE OR REPLACE FUNCTION ecommerce.update_customer_order_summary()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE NOT LEAKPROOF
+AS $BODY$
+DECLARE
+	voided uuid = (SELECT s.id FROM ecommerce.order_statuses s WHERE s.status = 'Voided');
+	sign integer;
+	order_total numeric;
+BEGIN
+	-- Only voiding an order, or restoring a voided one, changes the summary
+	IF NEW.status = voided AND OLD.status IS DISTINCT FROM voided THEN
+		sign = -1;
+	ELSIF OLD.status = voided AND NEW.status IS DISTINCT FROM voided THEN
+		sign = 1;
+	ELSE
+		RETURN NULL;
+	END IF;
+
+	SELECT COALESCE(sum(oi.unit_price * oi.quantity), 0)
+	  INTO order_total
+	  FROM ecommerce.order_items oi
+	 WHERE oi.order_id = NEW.id
+	   AND oi.created_at >= NEW.created_at;
+
+	UPDATE ecommerce.customer_order_summaries cs
+	   SET order_count = cs.order_count + sign,
+		   lifetime_value = cs.lifetime_value + sign * order_total,
+		   updated_at = CURRENT_TIMESTAMP
+	 WHERE cs.customer_id = NEW.customer_id;
+
+	RETURN NULL;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.update_customer_order_summary() OWNER TO postgres;
+
+-- Keeps the customer order summary in sync with every status change, in the same transaction
+CREATE OR REPLACE TRIGGER "TRG_ORDERS_SUMMARY"
+    AFTER UPDATE OF status
+    ON ecommerce.orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION ecommerce.update_customer_order_summary();
+
+/*--------- FUNCTION: ecommerce.set_updated_at ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.set_updated_at();
+CREATE OR REPLACE FUNCTION ecommerce.set_updated_at()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE NOT LEAKPROOF
+AS $BODY$
+BEGIN
+	NEW.updated_at = clock_timestamp();
+	NEW.updated_by = CURRENT_USER;
+	RETURN NEW;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.set_updated_at() OWNER TO postgres;
+
+-- Keeps the customer version (see get_customer_version) in sync with every update
+CREATE OR REPLACE TRIGGER "TRG_CUSTOMERS_UPDATED_AT"
+    BEFORE UPDATE
+    ON ecommerce.customers
+    FOR EACH ROW
+    EXECUTE FUNCTION ecommerce.set_updated_at();
+
+/*--------- FUNCTION: ecommerce.notify_customer_changed ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.notify_customer_changed();
+CREATE OR REPLACE FUNCTION ecommerce.notify_customer_changed()
+    RETURNS trigger
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE NOT LEAKPROOF
+AS $BODY$
+BEGIN
+	-- Delivered on commit to the services listening on the channel, which evict the customer from their cache
+	PERFORM pg_notify('customers_changed', OLD.id::text);
+	RETURN NULL;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.notify_customer_changed() OWNER TO postgres;
+
+-- Invalidates the cached customers (see customers.crud.invalidation) on every update or delete
+CREATE OR REPLACE TRIGGER "TRG_CUSTOMERS_CHANGED"
+    AFTER UPDATE OR DELETE
+    ON ecommerce.customers
+    FOR EACH ROW
+    EXECUTE FUNCTION ecommerce.notify_customer_changed();
@@ -0,0 +1,210 @@
+/*
+It's assumed that "postgres" is a superuser and db.sql, tables.sql, functions.sql scrpts have been ran
+
+Optional migration: ecommerce.orders and ecommerce.order_items are range partitioned by created_at, one partition
+per month (orders_pYYYYMM and order_items_pYYYYMM), so the recent orders stay in small partitions and indexes
+whatever the history. The partitions of an order and its items cover the same month: an order item has
+the creation time of its order, which the (order_id, created_at) foreign key enforces.
+
+- ecommerce.create_order_partitions creates the partitions up to a number of months ahead,
+  it is run by the orders service (PARTITION_MAINTENANCE_INTERVAL) or `python -m tools.partitions create`
+- ecommerce.archive_order_partitions detaches the partitions older than a retention and moves them to
+  the ecommerce_archive schema, from where `python -m tools.partitions archive --export-dir` exports them
+  to compressed files and drops them
+
+The migration runs in a transaction and copies the existing rows, which locks both tables meanwhile.
+*/
+
+BEGIN;
+
+CREATE SCHEMA IF NOT EXISTS ecommerce_archive AUTHORIZATION pg_database_owner;
+
+GRANT USAGE ON SCHEMA ecommerce_archive TO robotfw;
+
+/*--------- FUNCTION: ecommerce.create_order_partitions ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.create_order_partitions(integer, timestamp with time zone);
+CREATE OR REPLACE FUNCTION ecommerce.create_order_partitions(
+	months_ahead integer DEFAULT 3,
+	created_since timestamp with time zone DEFAULT now())
+    RETURNS integer
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+    SECURITY DEFINER
+    SET search_path = pg_catalog, pg_temp
+    SET TimeZone = 'UTC'
+AS $BODY$
+DECLARE
+	month_start timestamp with time zone = date_trunc('month', created_since);
+	last_month timestamp with time zone = date_trunc('month', now()) + make_interval(months => months_ahead);
+	suffix text;
+	created integer = 0;
+BEGIN
+	-- The workers of the orders service run this concurrently
+	PERFORM pg_advisory_xact_lock(hashtext('ecommerce.create_order_partitions'));
+
+	WHILE month_start <= last_month LOOP
+		suffix = to_char(month_start, 'YYYYMM');
+		IF to_regclass('ecommerce.orders_p' || suffix) IS NULL THEN
+			EXECUTE format('CREATE TABLE ecommerce.%I PARTITION OF ecommerce.orders FOR VALUES FROM (%L) TO (%L)',
+						   'orders_p' || suffix, month_start, month_start + INTERVAL '1 month');
+			created = created + 1;
+		END IF;
+		IF to_regclass('ecommerce.order_items_p' || suffix) IS NULL THEN
+			EXECUTE format('CREATE TABLE ecommerce.%I PARTITION OF ecommerce.order_items FOR VALUES FROM (%L) TO (%L)',
+						   'order_items_p' || suffix, month_start, month_start + INTERVAL '1 month');
+			created = created + 1;
+		END IF;
+		month_start = month_start + INTERVAL '1 month';
+	END LOOP;
+
+	RETURN created;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.create_order_partitions(integer, timestamp with time zone) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.create_order_partitions(integer, timestamp with time zone) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION ecommerce.create_order_partitions(integer, timestamp with time zone) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.create_order_partitions(integer, timestamp with time zone) TO api;
+GRANT EXECUTE ON FUNCTION ecommerce.create_order_partitions(integer, timestamp with time zone) TO robotfw;
+
+/*--------- FUNCTION: ecommerce.archive_order_partitions ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.archive_order_partitions(integer);
+CREATE OR REPLACE FUNCTION ecommerce.archive_order_partitions(
+	retention_months integer)
+    RETURNS SETOF text
+    LANGUAGE 'plpgsql'
+    COST 100
+    VOLATILE PARALLEL UNSAFE
+    SECURITY DEFINER
+    SET search_path = pg_catalog, pg_temp
+    SET TimeZone = 'UTC'
+AS $BODY$
+DECLARE
+	cutoff text;
+	partition_name text;
+	fk_name text;
+BEGIN
+	IF retention_months IS NULL OR retention_months < 1 THEN
+		RAISE assert_failure USING MESSAGE = 'retention_months must be at least 1';
+	END IF;
+
+	PERFORM pg_advisory_xact_lock(hashtext('ecommerce.create_order_partitions'));
+	cutoff = to_char(date_trunc('month', now()) - make_interval(months => retention_months), 'YYYYMM');
+
+	-- The order items first, as they reference the orders; the archived tables are standalone snapshots
+	FOR partition_name IN
+		SELECT c.relname
+		  FROM pg_inherits h
+		  JOIN pg_class c
+			ON c.oid = h.inhrelid
+		 WHERE h.inhparent IN ('ecommerce.order_items'::regclass, 'ecommerce.orders'::regclass)
+		   AND c.relname ~ '^(orders|order_items)_p[0-9]{6}$'
+		   AND right(c.relname, 6) < cutoff
+		 ORDER BY c.relname LIKE 'orders%', c.relname
+	LOOP
+		EXECUTE format('ALTER TABLE %I.%I DETACH PARTITION ecommerce.%I',
+					   'ecommerce', CASE WHEN partition_name LIKE 'orders%' THEN 'orders' ELSE 'order_items' END,
+					   partition_name);
+		FOR fk_name IN
+			SELECT conname
+			  FROM pg_constraint
+			 WHERE conrelid = ('ecommerce.' || quote_ident(partition_name))::regclass
+			   AND contype = 'f'
+		LOOP
+			EXECUTE format('ALTER TABLE ecommerce.%I DROP CONSTRAINT %I', partition_name, fk_name);
+		END LOOP;
+		EXECUTE format('ALTER TABLE ecommerce.%I SET SCHEMA ecommerce_archive', partition_name);
+		EXECUTE format('GRANT SELECT ON TABLE ecommerce_archive.%I TO robotfw', partition_name);
+		RETURN NEXT 'ecommerce_archive.' || partition_name;
+	END LOOP;
+END;
+$BODY$;
+
+ALTER FUNCTION ecommerce.archive_order_partitions(integer) OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.archive_order_partitions(integer) FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION ecommerce.archive_order_partitions(integer) TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.archive_order_partitions(integer) TO api;
+GRANT EXECUTE ON FUNCTION ecommerce.archive_order_partitions(integer) TO robotfw;
+
+/*--------- Partitioned tables ------------*/
+ALTER TABLE ecommerce.order_items RENAME TO order_items_unpartitioned;
+ALTER TABLE ecommerce.order_items_unpartitioned RENAME CONSTRAINT "PK_ORDER_ITEM_ID" TO "PK_ORDER_ITEM_ID_UNPARTITIONED";
+ALTER TABLE ecommerce.orders RENAME TO orders_unpartitioned;
+ALTER TABLE ecommerce.orders_unpartitioned RENAME CONSTRAINT "PK_ORDER_ID" TO "PK_ORDER_ID_UNPARTITIONED";
+
+-- The defaults, e.g. of the IDs (see uuid7.sql), are kept
+CREATE TABLE ecommerce.orders (
+    LIKE ecommerce.orders_unpartitioned INCLUDING DEFAULTS,
+    CONSTRAINT "PK_ORDER_ID" PRIMARY KEY (id, created_at),
+    CONSTRAINT "FK_ORDERS_CUSTOMER" FOREIGN KEY (customer_id) REFERENCES ecommerce.customers (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE,
+    CONSTRAINT "FK_ORDERS_STATUS" FOREIGN KEY (status) REFERENCES ecommerce.order_statuses (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE NO ACTION
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS "IDX_ORDERS_CUSTOMER"
+    ON ecommerce.orders USING btree
+    (customer_id ASC NULLS LAST, created_at DESC NULLS FIRST);
+
+-- The triggers are not copied by LIKE
+CREATE OR REPLACE TRIGGER "TRG_ORDERS_SUMMARY"
+    AFTER UPDATE OF status
+    ON ecommerce.orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION ecommerce.update_customer_order_summary();
+
+CREATE TABLE ecommerce.order_items (
+    LIKE ecommerce.order_items_unpartitioned INCLUDING DEFAULTS,
+    CONSTRAINT "PK_ORDER_ITEM_ID" PRIMARY KEY (id, created_at),
+    CONSTRAINT "FK_ORDER_ITEM_ITEM" FOREIGN KEY (item_id) REFERENCES ecommerce.items (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE NO ACTION,
+    CONSTRAINT "FK_ORDER_ITEM_ORDER" FOREIGN KEY (order_id, created_at) REFERENCES ecommerce.orders (id, created_at) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS "IDX_ORDER_ITEMS_ORDER"
+    ON ecommerce.order_items USING btree
+    (order_id ASC NULLS LAST, created_at ASC NULLS LAST);
+
+-- Rows outside of the created partitions, which should stay empty
+CREATE TABLE ecommerce.orders_default PARTITION OF ecommerce.orders DEFAULT;
+CREATE TABLE ecommerce.order_items_default PARTITION OF ecommerce.order_items DEFAULT;
+
+ALTER TABLE IF EXISTS ecommerce.orders OWNER to postgres;
+ALTER TABLE IF EXISTS ecommerce.order_items OWNER to postgres;
+
+REVOKE ALL ON TABLE ecommerce.orders FROM api;
+REVOKE ALL ON TABLE ecommerce.orders FROM robotfw;
+GRANT ALL ON TABLE ecommerce.orders TO postgres WITH GRANT OPTION;
+GRANT UPDATE, SELECT, DELETE, INSERT ON TABLE ecommerce.orders TO api;
+GRANT UPDATE, SELECT, DELETE, INSERT ON TABLE ecommerce.orders TO robotfw;
+
+REVOKE ALL ON TABLE ecommerce.order_items FROM api;
+REVOKE ALL ON TABLE ecommerce.order_items FROM robotfw;
+GRANT ALL ON TABLE ecommerce.order_items TO postgres WITH GRANT OPTION;
+GRANT UPDATE, SELECT, DELETE, INSERT ON TABLE ecommerce.order_items TO api;
+GRANT UPDATE, SELECT, DELETE, INSERT ON TABLE ecommerce.order_items TO robotfw;
+
+SELECT ecommerce.create_order_partitions(
+		 3, COALESCE((SELECT min(created_at) FROM ecommerce.orders_unpartitioned), now()));
+
+INSERT INTO ecommerce.orders
+	 SELECT *
+	   FROM ecommerce.orders_unpartitioned;
+
+-- The order items take the creation time of their order
+INSERT INTO ecommerce.order_items (id, order_id, item_id, quantity, unit_price, created_at, created_by, updated_at, updated_by)
+	 SELECT oi.id, oi.order_id, oi.item_id, oi.quantity, oi.unit_price, o.created_at, oi.created_by, oi.updated_at, oi.updated_by
+	   FROM ecommerce.order_items_unpartitioned oi
+	   JOIN ecommerce.orders_unpartitioned o
+		 ON o.id = oi.order_id;
+
+DROP TABLE ecommerce.order_items_unpartitioned;
+DROP TABLE ecommerce.orders_unpartitioned;
+
+ANALYZE ecommerce.orders;
+ANALYZE ecommerce.order_items;
+
+COMMIT;
@@ -111,6 +111,12 @@ CREATE INDEX IF NOT EXISTS "IDX_CUSTOMERS"
     WITH (deduplicate_items=False)
     TABLESPACE pg_default;
 
+-- The change feed (see get_customer_changes) reads the customers in the order of their last modification
+CREATE INDEX IF NOT EXISTS "IDX_CUSTOMERS_CHANGES"
+    ON ecommerce.customers USING btree
+    (COALESCE(updated_at, created_at) ASC NULLS LAST, id ASC NULLS LAST)
+    TABLESPACE pg_default;
+
 ALTER TABLE IF EXISTS ecommerce.customers OWNER to postgres;
 
 REVOKE ALL ON TABLE ecommerce.customers FROM api;
@@ -133,6 +139,7 @@ CREATE TABLE IF NOT EXISTS ecommerce.orders (
     id uuid NOT NULL DEFAULT gen_random_uuid (),
     customer_id uuid NOT NULL,
     status uuid NOT NULL,
+    version integer NOT NULL DEFAULT 1,
     created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_by varchar(256) NOT NULL DEFAULT CURRENT_USER,
     updated_at timestamp with time zone,
@@ -142,6 +149,9 @@ CREATE TABLE IF NOT EXISTS ecommerce.orders (
     CONSTRAINT "FK_ORDERS_STATUS" FOREIGN KEY (status) REFERENCES ecommerce.order_statuses (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE NO ACTION
 ) TABLESPACE pg_default;
 
+-- The version of the row for conditional updates (see update_order_status), for tables created without it
+ALTER TABLE IF EXISTS ecommerce.orders ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1;
+
 ALTER TABLE IF EXISTS ecommerce.orders OWNER to postgres;
 
 REVOKE ALL ON TABLE ecommerce.orders FROM api;
@@ -165,6 +175,7 @@ CREATE TABLE IF NOT EXISTS ecommerce.order_items (
     order_id uuid NOT NULL,
     item_id uuid NOT NULL,
     quantity integer NOT NULL DEFAULT 0,
+    unit_price numeric(18, 2) NOT NULL,
     created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
     created_by varchar(256) NOT NULL DEFAULT CURRENT_USER,
     updated_at timestamp with time zone,
@@ -174,6 +185,18 @@ CREATE TABLE IF NOT EXISTS ecommerce.order_items (
     CONSTRAINT "FK_ORDER_ITEM_ORDER" FOREIGN KEY (order_id) REFERENCES ecommerce.orders (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE
 ) TABLESPACE pg_default;
 
+-- The price of the item when the order was created (see create_order), for tables created without it;
+-- the existing order items take the current price of their item
+ALTER TABLE IF EXISTS ecommerce.order_items ADD COLUMN IF NOT EXISTS unit_price numeric(18, 2);
+
+UPDATE ecommerce.order_items oi
+   SET unit_price = i.price
+  FROM ecommerce.items i
+ WHERE i.id = oi.item_id
+   AND oi.unit_price IS NULL;
+
+ALTER TABLE IF EXISTS ecommerce.order_items ALTER COLUMN unit_price SET NOT NULL;
+
 ALTER TABLE IF EXISTS ecommerce.order_items OWNER to postgres;
 
 REVOKE ALL ON TABLE ecommerce.order_items FROM api;
@@ -189,3 +212,32 @@ SELECT, DELETE, INSERT ON TABLE ecommerce.order_items TO api;
 GRANT
 UPDATE,
 SELECT, DELETE, INSERT ON TABLE ecommerce.order_items TO robotfw;
+
+/*--------- Table: ecommerce.customer_order_summaries ------------*/
+-- DROP TABLE IF EXISTS ecommerce.customer_order_summaries;
+-- Maintained by create_order and the TRG_ORDERS_SUMMARY trigger, recomputed by rebuild_customer_order_summaries
+CREATE TABLE IF NOT EXISTS ecommerce.customer_order_summaries (
+    customer_id uuid NOT NULL,
+    order_count integer NOT NULL DEFAULT 0,
+    lifetime_value numeric(18, 2) NOT NULL DEFAULT 0,
+    last_order_at timestamp with time zone,
+    updated_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "PK_CUSTOMER_ORDER_SUMMARY_ID" PRIMARY KEY (customer_id),
+    CONSTRAINT "FK_CUSTOMER_ORDER_SUMMARY_CUSTOMER" FOREIGN KEY (customer_id) REFERENCES ecommerce.customers (id) MATCH SIMPLE ON UPDATE NO ACTION ON DELETE CASCADE
+) TABLESPACE pg_default;
+
+ALTER TABLE IF EXISTS ecommerce.customer_order_summaries OWNER to postgres;
+
+REVOKE ALL ON TABLE ecommerce.customer_order_summaries FROM api;
+
+REVOKE ALL ON TABLE ecommerce.customer_order_summaries FROM robotfw;
+
+GRANT ALL ON TABLE ecommerce.customer_order_summaries TO postgres WITH GRANT OPTION;
+
+GRANT
+UPDATE,
+SELECT, INSERT ON TABLE ecommerce.customer_order_summaries TO api;
+
+GRANT
+UPDATE,
+SELECT, DELETE, INSERT ON TABLE ecommerce.customer_order_summaries TO robotfw;
@@ -0,0 +1,50 @@
+/*
+It's assumed that "postgres" is a superuser and db.sql, tables.sql scrpts have been ran
+
+Optional migration: the IDs of new rows are time-ordered version 7 UUIDs instead of random version 4 UUIDs,
+so inserts are appended to the right-most pages of the primary key indexes. Existing IDs are kept,
+the API accepts both versions (see common/ids.py).
+
+To revert, set the defaults back to gen_random_uuid ():
+ALTER TABLE IF EXISTS ecommerce.customers ALTER COLUMN id SET DEFAULT gen_random_uuid ();
+*/
+
+/*--------- FUNCTION: ecommerce.uuid_generate_v7 ------------*/
+-- DROP FUNCTION IF EXISTS ecommerce.uuid_generate_v7();
+CREATE OR REPLACE FUNCTION ecommerce.uuid_generate_v7(
+	)
+    RETURNS uuid
+    LANGUAGE 'sql'
+    COST 100
+    VOLATILE PARALLEL SAFE
+
+AS $BODY$
+	-- The first 48 bits of a random UUID are replaced by the Unix time in milliseconds,
+	-- and its version bits are changed from 4 (0100) to 7 (0111)
+	SELECT encode(
+			 set_bit(
+			   set_bit(
+				 overlay(uuid_send(gen_random_uuid())
+						 PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+						 FROM 1 FOR 6),
+				 52, 1),
+			   53, 1),
+			 'hex')::uuid;
+$BODY$;
+
+ALTER FUNCTION ecommerce.uuid_generate_v7() OWNER TO postgres;
+
+REVOKE ALL ON FUNCTION ecommerce.uuid_generate_v7() FROM PUBLIC;
+
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_generate_v7() TO postgres WITH GRANT OPTION;
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_generate_v7() TO api;
+GRANT EXECUTE ON FUNCTION ecommerce.uuid_generate_v7() TO robotfw;
+
+/*--------- Defaults of the ID columns ------------*/
+ALTER TABLE IF EXISTS ecommerce.items ALTER COLUMN id SET DEFAULT ecommerce.uuid_generate_v7 ();
+
+ALTER TABLE IF EXISTS ecommerce.customers ALTER COLUMN id SET DEFAULT ecommerce.uuid_generate_v7 ();
+
+ALTER TABLE IF EXISTS ecommerce.orders ALTER COLUMN id SET DEFAULT ecommerce.uuid_generate_v7 ();
+
+ALTER TABLE IF EXISTS ecommerce.order_items ALTER COLUMN id SET DEFAULT ecommerce.uuid_generate_v7 ();
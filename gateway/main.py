@@ -0,0 +1,52 @@
+"""
+Gateway API application module
+
+Mounts the customers and orders routers in one application with a single lifespan,
+so both APIs share one PostgreSQL connection pool per worker.
+Small deployments can run `gateway.main` instead of `customers.main` and `orders.main`,
+halving the number of database connections and the memory footprint.
+"""
+
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator
+
+from gateway.config import settings
+from common.app import create_app, run_app
+from customers.crud import db_warm_up_connection
+from customers.lifespan import customers_lifespan
+from customers.routers import customers_router
+from orders.crud import db_warm_up_connection as db_warm_up_orders_connection
+from orders.lifespan import orders_lifespan
+from orders.routers import orders_router, summaries_router
+
+
+@asynccontextmanager
+async def gateway_lifespan() -> AsyncIterator[None]:
+    """
+    Starts and stops the customers and orders services.
+    """
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(customers_lifespan(settings))
+        # The in-memory repository serves the customers without a database, the orders are then unavailable
+        if settings.repository_backend != "memory":
+            await stack.enter_async_context(orders_lifespan(settings))
+        yield
+
+
+app = create_app(
+    settings,
+    [customers_router, orders_router, summaries_router],
+    [db_warm_up_connection, db_warm_up_orders_connection],
+    gateway_lifespan,
+    database=settings.repository_backend != "memory",
+)
+
+
+if __name__ == "__main__":
+    run_app(
+        "gateway.main:app",
+        settings,
+        # Every running customer export holds a dedicated connection outside the pool
+        # and the cache invalidation listens on one
+        settings.export_max_running + (1 if settings.cache_enabled else 0),
+    )
@@ -1,11 +1,22 @@
-# from .orders import (
-#     get_order_by_id as db_get_order_by_id,
-#     get_orders_by as db_get_orders_by,
-#     create_order as db_create_order,
-# )
+from .orders import (
+    get_order_by_id as db_get_order_by_id,
+    get_orders_by as db_get_orders_by,
+    get_customer_summary as db_get_customer_summary,
+    update_order_status as db_update_order_status,
+    create_order as db_create_order,
+    warm_up_connection as db_warm_up_connection,
+)
+from .statuses import init_order_statuses
+from .partitions import start_partition_maintenance, stop_partition_maintenance
 
-# __all__: list[str] = [
-#     "db_get_order_by_id",
-#     "db_get_orders_by",
-#     "db_create_order",
-# ]
+__all__: list[str] = [
+    "db_get_order_by_id",
+    "db_get_orders_by",
+    "db_get_customer_summary",
+    "db_update_order_status",
+    "db_create_order",
+    "db_warm_up_connection",
+    "init_order_statuses",
+    "start_partition_maintenance",
+    "stop_partition_maintenance",
+]
@@ -0,0 +1,354 @@
+"""
+This module contains functions to interact with the database.
+It includes functions to create a new order, retrieve an order by ID, update the status of an order,
+retrieve the orders of a customer, and retrieve the summary of the orders of a customer.
+The functions handle exceptions and raise appropriate exceptions based on the error cases.
+
+The database functions bound the creation time of the orders they look up, so that on partitioned tables
+(see `db_scripts/partitioning.sql`) only the partitions of that time are scanned: an order with a version 7 ID
+was created around the time of its ID, and the `since` parameter bounds the orders of a customer.
+
+The summary of the orders of a customer is a single row, which `create_order` and the status changes of the orders
+maintain in the same transaction (see `ecommerce.customer_order_summaries`).
+
+The database functions take and return the IDs of the statuses, which are mapped to and from their names
+with the in-process map of `orders.crud.statuses`. Single orders come with their version, the row version
+that `update_order_status` checks, so concurrent updates of an order are detected instead of overwritten.
+"""
+
+import json
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+from psycopg import AsyncConnection
+from psycopg.errors import (
+    AssertFailure,
+    CheckViolation,
+    ForeignKeyViolation,
+    NoDataFound,
+    SerializationFailure,
+)
+from common.database.postgresql import get_cursor, warm_up_statement
+from common.exceptions import AppException
+from common.ids import ID
+from orders.exceptions import (
+    CREATE_ORDER_BAD_REQUEST,
+    CREATE_ORDER_CUSTOMER_NOT_FOUND,
+    CREATE_ORDER_ITEM_NOT_FOUND,
+    CREATE_ORDER_NOT_CREATED,
+    CREATE_ORDER_NOT_FETCHED,
+    GET_ORDER_BAD_REQUEST,
+    GET_ORDER_NOT_FETCHED,
+    GET_ORDER_NOT_FOUND_404,
+    GET_ORDER_NOT_FOUND_500,
+    GET_SUMMARY_BAD_REQUEST,
+    GET_SUMMARY_CUSTOMER_NOT_FOUND,
+    GET_SUMMARY_NOT_FETCHED,
+    GET_SUMMARY_NOT_FOUND_500,
+    UPDATE_ORDER_STATUS_BAD_REQUEST,
+    UPDATE_ORDER_STATUS_CONFLICT,
+    UPDATE_ORDER_STATUS_NOT_FETCHED,
+    UPDATE_ORDER_STATUS_NOT_FOUND,
+    UPDATE_ORDER_STATUS_NOT_UPDATED,
+    UPDATE_ORDER_STATUS_PRECONDITION_FAILED,
+)
+from orders.schemas import (
+    CreateOrderSchema,
+    GetCustomerOrdersSchema,
+    GetCustomerOrderSummarySchema,
+    GetOrderSchema,
+)
+from orders.crud.statuses import (
+    ensure_order_statuses,
+    status_id,
+    status_name,
+    statuses_to,
+)
+
+_CREATE_ORDER_QUERY: str = "select create_order(%s)"
+_GET_ORDER_BY_ID_QUERY: str = "select get_order_by_id(%s)"
+_GET_CUSTOMER_ORDERS_QUERY: str = (
+    "select get_customer_orders(%s, %s::timestamptz, %s::integer)"
+)
+_GET_CUSTOMER_ORDER_SUMMARY_QUERY: str = "select get_customer_order_summary(%s)"
+_UPDATE_ORDER_STATUS_QUERY: str = (
+    "select update_order_status(%s, %s, %s::integer, %s::uuid[])"
+)
+
+
+def _order_and_version(order: dict[str, Any]) -> tuple[GetOrderSchema, int]:
+    version: int = order.pop("version")
+    order["status"] = status_name(order["status"])
+    return order, version
+
+
+async def create_order(order_data: CreateOrderSchema) -> tuple[GetOrderSchema, int]:
+    """
+    Creates a new order in the database, with the status `New`.
+
+    Args:
+        order_data (CreateOrderSchema): The order data to be created.
+
+    Returns:
+        tuple[GetOrderSchema, int]: The created order data and its version.
+
+    Raises:
+        CREATE_ORDER_BAD_REQUEST: If the order data is invalid.
+        CREATE_ORDER_CUSTOMER_NOT_FOUND: If the customer was not found.
+        CREATE_ORDER_ITEM_NOT_FOUND: If an item was not found.
+        CREATE_ORDER_NOT_CREATED: If the order could not be created.
+        CREATE_ORDER_NOT_FETCHED: If the order could not be fetched.
+    """
+    try:
+        await ensure_order_statuses()
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _CREATE_ORDER_QUERY,
+                [
+                    json.dumps(
+                        order_data.model_dump(mode="json")
+                        | {"status": str(status_id("New"))}
+                    ),
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise CREATE_ORDER_NOT_FETCHED
+            order, version = _order_and_version(record[0])
+
+    except AssertFailure as e:
+        raise CREATE_ORDER_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise CREATE_ORDER_CUSTOMER_NOT_FOUND from e
+    except ForeignKeyViolation as e:
+        raise CREATE_ORDER_ITEM_NOT_FOUND from e
+    except Exception as e:
+        raise CREATE_ORDER_NOT_CREATED from e
+
+    return order, version
+
+
+async def get_order_by_id(order_id: ID) -> tuple[GetOrderSchema, int]:
+    """
+    Retrieves an order from the database by its ID.
+
+    Args:
+        order_id (ID): The ID of the order to retrieve.
+
+    Returns:
+        tuple[GetOrderSchema, int]: The retrieved order data and its version.
+
+    Raises:
+        GET_ORDER_BAD_REQUEST: If the order ID is invalid.
+        GET_ORDER_NOT_FETCHED: If the order could not be fetched.
+        GET_ORDER_NOT_FOUND_404: If the order was not found.
+        GET_ORDER_NOT_FOUND_500: If an error occurred while fetching the order.
+    """
+    try:
+        await ensure_order_statuses()
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _GET_ORDER_BY_ID_QUERY,
+                [
+                    order_id,
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise GET_ORDER_NOT_FETCHED
+            order, version = _order_and_version(record[0])
+
+    except AssertFailure as e:
+        raise GET_ORDER_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise GET_ORDER_NOT_FOUND_404 from e
+    except Exception as e:
+        raise GET_ORDER_NOT_FOUND_500 from e
+
+    return order, version
+
+
+async def update_order_status(
+    order_id: ID, status: str, version: int
+) -> tuple[GetOrderSchema, int]:
+    """
+    Updates the status of an order, if the order is still at the version the client has read
+    and the transition from its current status is allowed.
+
+    Args:
+        order_id (ID): The ID of the order to update.
+        status (str): The name of the new status.
+        version (int): The version of the order the update is based on.
+
+    Returns:
+        tuple[GetOrderSchema, int]: The updated order data and its new version.
+
+    Raises:
+        UPDATE_ORDER_STATUS_BAD_REQUEST: If the status is unknown.
+        UPDATE_ORDER_STATUS_NOT_FOUND: If the order was not found.
+        UPDATE_ORDER_STATUS_PRECONDITION_FAILED: If the order has been updated since the version.
+        UPDATE_ORDER_STATUS_CONFLICT: If the order cannot move from its current status to the status.
+        UPDATE_ORDER_STATUS_NOT_FETCHED: If the order could not be fetched.
+        UPDATE_ORDER_STATUS_NOT_UPDATED: If the order could not be updated.
+    """
+    try:
+        await ensure_order_statuses()
+        new_status: UUID | None = status_id(status)
+        if new_status is None:
+            raise UPDATE_ORDER_STATUS_BAD_REQUEST
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _UPDATE_ORDER_STATUS_QUERY,
+                [
+                    order_id,
+                    new_status,
+                    version,
+                    statuses_to(status),
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise UPDATE_ORDER_STATUS_NOT_FETCHED
+            order, new_version = _order_and_version(record[0])
+
+    except AssertFailure as e:
+        raise UPDATE_ORDER_STATUS_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise UPDATE_ORDER_STATUS_NOT_FOUND from e
+    except SerializationFailure as e:
+        raise UPDATE_ORDER_STATUS_PRECONDITION_FAILED from e
+    except CheckViolation as e:
+        raise UPDATE_ORDER_STATUS_CONFLICT from e
+    except AppException:
+        raise
+    except Exception as e:
+        raise UPDATE_ORDER_STATUS_NOT_UPDATED from e
+
+    return order, new_version
+
+
+async def get_orders_by(
+    customer_id: ID,
+    since: datetime | None = None,
+    limit: int | None = None,
+) -> GetCustomerOrdersSchema:
+    """
+    Retrieves the orders of a customer from the database, the most recent first.
+
+    Args:
+        customer_id (ID): The ID of the customer.
+        since (datetime | None, optional): The earliest creation time of the orders. Defaults to None.
+        limit (int | None, optional): The maximum number of orders. Defaults to None, i.e. all.
+
+    Returns:
+        GetCustomerOrdersSchema: The retrieved orders data, empty if the customer has none.
+
+    Raises:
+        GET_ORDER_BAD_REQUEST: If the customer ID is invalid.
+        GET_ORDER_NOT_FETCHED: If the orders could not be fetched.
+        GET_ORDER_NOT_FOUND_500: If an error occurred while fetching the orders.
+    """
+    try:
+        await ensure_order_statuses()
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _GET_CUSTOMER_ORDERS_QUERY,
+                [
+                    customer_id,
+                    since,
+                    limit,
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise GET_ORDER_NOT_FETCHED
+            orders: GetCustomerOrdersSchema = record[0]
+            for order in orders["orders"]:
+                order["status"] = status_name(order["status"])
+
+    except AssertFailure as e:
+        raise GET_ORDER_BAD_REQUEST from e
+    except Exception as e:
+        raise GET_ORDER_NOT_FOUND_500 from e
+
+    return orders
+
+
+async def get_customer_summary(customer_id: ID) -> GetCustomerOrderSummarySchema:
+    """
+    Retrieves the summary of the orders of a customer from the database.
+
+    Args:
+        customer_id (ID): The ID of the customer.
+
+    Returns:
+        GetCustomerOrderSummarySchema: The summary data, with no orders if the customer has none.
+
+    Raises:
+        GET_SUMMARY_BAD_REQUEST: If the customer ID is invalid.
+        GET_SUMMARY_CUSTOMER_NOT_FOUND: If the customer was not found.
+        GET_SUMMARY_NOT_FETCHED: If the summary could not be fetched.
+        GET_SUMMARY_NOT_FOUND_500: If an error occurred while fetching the summary.
+    """
+    try:
+        async with get_cursor() as cursor:
+            await cursor.execute(
+                _GET_CUSTOMER_ORDER_SUMMARY_QUERY,
+                [
+                    customer_id,
+                ],
+                prepare=True,
+            )
+            record: tuple[Any, ...] | None = await cursor.fetchone()
+            if not record:
+                raise GET_SUMMARY_NOT_FETCHED
+            summary: GetCustomerOrderSummarySchema = record[0]
+
+    except AssertFailure as e:
+        raise GET_SUMMARY_BAD_REQUEST from e
+    except NoDataFound as e:
+        raise GET_SUMMARY_CUSTOMER_NOT_FOUND from e
+    except Exception as e:
+        raise GET_SUMMARY_NOT_FOUND_500 from e
+
+    return summary
+
+
+async def warm_up_connection(connection: AsyncConnection) -> None:
+    """
+    Executes and prepares the read statements of this module on a new pool connection, so nothing is written
+    nor locked. The lookups fail on a missing order or customer, so they are warmed up with an order and
+    a customer of the database and skipped while there is none. `create_order` and `update_order_status`
+    are prepared by their first execution.
+
+    Args:
+        connection (AsyncConnection): The connection to warm up, in autocommit mode.
+    """
+    nil: UUID = UUID(int=0)
+    async with connection.cursor() as cursor:
+        # The orders of a missing customer are an empty list
+        await warm_up_statement(cursor, _GET_CUSTOMER_ORDERS_QUERY, [nil, None, None])
+        await cursor.execute("select id from customers limit 1")
+        customer: tuple[UUID] | None = await cursor.fetchone()
+        if customer is not None:
+            await warm_up_statement(
+                cursor, _GET_CUSTOMER_ORDER_SUMMARY_QUERY, [customer[0]]
+            )
+        await cursor.execute("select id from orders limit 1")
+        order: tuple[UUID] | None = await cursor.fetchone()
+        if order is not None:
+            await warm_up_statement(cursor, _GET_ORDER_BY_ID_QUERY, [order[0]])
+
+
+__all__: list[str] = [
+    "create_order",
+    "get_order_by_id",
+    "update_order_status",
+    "get_orders_by",
+    "get_customer_summary",
+    "warm_up_connection",
+]
@@ -0,0 +1,109 @@
+"""
+This module contains the maintenance of the partitions of the orders tables (see `db_scripts/partitioning.sql`).
+
+A background task of each worker periodically creates the monthly partitions of the upcoming months, so that
+new orders never fall into the default partition, and, if a retention is set, detaches the partitions older than
+the retention and moves them to the `ecommerce_archive` schema. The database functions serialize the workers
+with an advisory lock and skip the partitions that already exist.
+"""
+
+import asyncio
+import logging
+from typing import Any
+from common.database.postgresql import get_cursor
+
+
+_task: asyncio.Task | None = None
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def maintain_partitions(
+    months_ahead: int, retention_months: int = 0
+) -> dict[str, Any]:
+    """
+    Creates the partitions up to a number of months ahead, and archives the partitions older than the retention.
+
+    Args:
+        months_ahead (int): The number of months to create the partitions for, after the current one.
+        retention_months (int, optional): The number of past months to keep, 0 to keep all. Defaults to 0.
+
+    Returns:
+        dict[str, Any]: The number of partitions created and the names of the archived partitions.
+    """
+    async with get_cursor() as cursor:
+        await cursor.execute("select create_order_partitions(%s)", [months_ahead])
+        record: tuple[Any, ...] | None = await cursor.fetchone()
+        created: int = record[0] if record else 0
+
+        archived: list[str] = []
+        if retention_months > 0:
+            await cursor.execute(
+                "select archive_order_partitions(%s)", [retention_months]
+            )
+            archived = [row[0] for row in await cursor.fetchall()]
+
+    return {"created": created, "archived": archived}
+
+
+async def _maintain(interval: float, months_ahead: int, retention_months: int) -> None:
+    while True:
+        try:
+            result: dict[str, Any] = await maintain_partitions(
+                months_ahead, retention_months
+            )
+            if result["created"] or result["archived"]:
+                logger.info(
+                    "Maintained order partitions: %d created, %d archived",
+                    result["created"],
+                    len(result["archived"]),
+                    extra={"fields": result},
+                )
+        except Exception as e:
+            logger.warning("Order partition maintenance failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def start_partition_maintenance(
+    interval: float, months_ahead: int = 3, retention_months: int = 0
+) -> None:
+    """
+    Starts maintaining the partitions periodically, immediately at first.
+
+    Args:
+        interval (float): The number of seconds between maintenance runs.
+        months_ahead (int, optional): The number of months to create the partitions for. Defaults to 3.
+        retention_months (int, optional): The number of past months to keep, 0 to keep all. Defaults to 0.
+
+    Raises:
+        Exception: If the maintenance is already running.
+    """
+    global _task
+    if _task is not None:
+        raise Exception("Partition maintenance is already running")
+
+    _task = asyncio.get_running_loop().create_task(
+        _maintain(interval, months_ahead, retention_months),
+        name="partition-maintenance",
+    )
+
+
+async def stop_partition_maintenance() -> None:
+    """
+    Stops the maintenance task, if running.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__: list[str] = [
+    "maintain_partitions",
+    "start_partition_maintenance",
+    "stop_partition_maintenance",
+]
@@ -0,0 +1,115 @@
+"""
+This module contains the in-process map of the order statuses (`ecommerce.order_statuses`).
+
+The orders reference their status by ID. The few statuses are loaded once per worker at startup, so the database
+functions return and take status IDs and no request joins or looks up the status table; the names are mapped here.
+The allowed transitions between the statuses are also defined here, and checked by `update_order_status`
+in the same statement as the version of the order.
+"""
+
+import logging
+from typing import Any
+from uuid import UUID
+from common.database.postgresql import get_cursor
+
+
+# Status name -> the statuses an order can move to
+ORDER_STATUS_TRANSITIONS: dict[str, tuple[str, ...]] = {
+    "New": ("Approved", "Voided"),
+    "Approved": ("Closed", "Voided"),
+    "Voided": (),
+    "Closed": (),
+}
+
+_ids_by_name: dict[str, UUID] = {}
+_names_by_id: dict[UUID, str] = {}
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def load_order_statuses() -> dict[str, UUID]:
+    """
+    Loads the order statuses from the database into the map, replacing the loaded ones.
+
+    Returns:
+        dict[str, UUID]: The IDs of the statuses by name.
+
+    Raises:
+        Exception: If there are no order statuses.
+    """
+    async with get_cursor() as cursor:
+        await cursor.execute("select id, status from order_statuses")
+        rows: list[tuple[Any, ...]] = await cursor.fetchall()
+    if not rows:
+        raise Exception("No order statuses, run db_scripts/tables.sql first")
+
+    _ids_by_name.clear()
+    _names_by_id.clear()
+    for status_id, name in rows:
+        _ids_by_name[name] = status_id
+        _names_by_id[status_id] = name
+    logger.info("Loaded %d order statuses", len(rows))
+    return dict(_ids_by_name)
+
+
+async def init_order_statuses() -> None:
+    """
+    Loads the order statuses at startup. If the database is unavailable, the service starts anyway
+    and the statuses are loaded by the first order request.
+    """
+    try:
+        await load_order_statuses()
+    except Exception as e:
+        logger.warning("Order statuses not loaded: %s", e)
+
+
+async def ensure_order_statuses() -> None:
+    """
+    Loads the order statuses if they have not been loaded yet, e.g. if the database was down at startup.
+    """
+    if not _ids_by_name:
+        await load_order_statuses()
+
+
+def status_id(name: str) -> UUID | None:
+    """
+    Returns the ID of a status, None if the status is unknown.
+    """
+    return _ids_by_name.get(name)
+
+
+def status_name(status: UUID | str) -> str:
+    """
+    Returns the name of a status from its ID, e.g. as returned in the JSON of the database functions.
+
+    Raises:
+        Exception: If the status is unknown, i.e. it was added after the statuses were loaded.
+    """
+    name: str | None = _names_by_id.get(
+        status if isinstance(status, UUID) else UUID(status)
+    )
+    if name is None:
+        raise Exception(f"Unknown order status {status}")
+    return name
+
+
+def statuses_to(name: str) -> list[UUID]:
+    """
+    Returns the IDs of the statuses an order can move to the status from.
+    """
+    return [
+        _ids_by_name[source]
+        for source, targets in ORDER_STATUS_TRANSITIONS.items()
+        if name in targets and source in _ids_by_name
+    ]
+
+
+__all__: list[str] = [
+    "ORDER_STATUS_TRANSITIONS",
+    "load_order_statuses",
+    "init_order_statuses",
+    "ensure_order_statuses",
+    "status_id",
+    "status_name",
+    "statuses_to",
+]
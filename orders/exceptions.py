@@ -1,10 +1,231 @@
 """
 This module defines custom exceptions for the application for different scenarios.
-...
 """
 
 from common.exceptions import AppException
 from fastapi import status
 
 
-__all__: list[str] = []
+CREATE_ORDER_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "create_order",
+    ],
+    "Order not fetched",
+    "not_fetched",
+)
+
+CREATE_ORDER_NOT_CREATED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "create_order",
+    ],
+    "Order not created",
+    "not_created",
+)
+
+CREATE_ORDER_BAD_REQUEST: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "db",
+        "create_order",
+    ],
+    "Order is invalid",
+    "bad_request",
+)
+
+CREATE_ORDER_CUSTOMER_NOT_FOUND: AppException = AppException(
+    status.HTTP_404_NOT_FOUND,
+    [
+        "db",
+        "create_order",
+    ],
+    "Customer not found",
+    "not_found",
+)
+
+CREATE_ORDER_ITEM_NOT_FOUND: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "db",
+        "create_order",
+    ],
+    "Item not found",
+    "bad_request",
+)
+
+GET_ORDER_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "get_order",
+    ],
+    "Order not fetched",
+    "not_fetched",
+)
+
+GET_ORDER_NOT_FOUND_404: AppException = AppException(
+    status.HTTP_404_NOT_FOUND,
+    [
+        "db",
+        "get_order",
+    ],
+    "Order not found",
+    "not_found",
+)
+
+GET_ORDER_NOT_FOUND_500: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "get_order",
+    ],
+    "Order not found",
+    "not_found",
+)
+
+GET_ORDER_BAD_REQUEST: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "db",
+        "get_order",
+    ],
+    "Order ID is required",
+    "bad_request",
+)
+
+UPDATE_ORDER_STATUS_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order not fetched",
+    "not_fetched",
+)
+
+UPDATE_ORDER_STATUS_NOT_UPDATED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order not updated",
+    "not_updated",
+)
+
+UPDATE_ORDER_STATUS_BAD_REQUEST: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order status is invalid",
+    "bad_request",
+)
+
+UPDATE_ORDER_STATUS_NOT_FOUND: AppException = AppException(
+    status.HTTP_404_NOT_FOUND,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order not found",
+    "not_found",
+)
+
+UPDATE_ORDER_STATUS_CONFLICT: AppException = AppException(
+    status.HTTP_409_CONFLICT,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order status transition is not allowed",
+    "conflict",
+)
+
+UPDATE_ORDER_STATUS_PRECONDITION_FAILED: AppException = AppException(
+    status.HTTP_412_PRECONDITION_FAILED,
+    [
+        "db",
+        "update_order_status",
+    ],
+    "Order has been modified",
+    "precondition_failed",
+)
+
+UPDATE_ORDER_STATUS_PRECONDITION_REQUIRED: AppException = AppException(
+    status.HTTP_428_PRECONDITION_REQUIRED,
+    [
+        "http",
+        "headers",
+        "If-Match",
+    ],
+    "The ETag of the order is required in the If-Match header",
+    "precondition_required",
+)
+
+GET_SUMMARY_NOT_FETCHED: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "get_customer_order_summary",
+    ],
+    "Summary not fetched",
+    "not_fetched",
+)
+
+GET_SUMMARY_CUSTOMER_NOT_FOUND: AppException = AppException(
+    status.HTTP_404_NOT_FOUND,
+    [
+        "db",
+        "get_customer_order_summary",
+    ],
+    "Customer not found",
+    "not_found",
+)
+
+GET_SUMMARY_NOT_FOUND_500: AppException = AppException(
+    status.HTTP_500_INTERNAL_SERVER_ERROR,
+    [
+        "db",
+        "get_customer_order_summary",
+    ],
+    "Summary not found",
+    "not_found",
+)
+
+GET_SUMMARY_BAD_REQUEST: AppException = AppException(
+    status.HTTP_400_BAD_REQUEST,
+    [
+        "db",
+        "get_customer_order_summary",
+    ],
+    "Customer ID is required",
+    "bad_request",
+)
+
+__all__: list[str] = [
+    "CREATE_ORDER_NOT_FETCHED",
+    "CREATE_ORDER_NOT_CREATED",
+    "CREATE_ORDER_BAD_REQUEST",
+    "CREATE_ORDER_CUSTOMER_NOT_FOUND",
+    "CREATE_ORDER_ITEM_NOT_FOUND",
+    "GET_ORDER_NOT_FETCHED",
+    "GET_ORDER_NOT_FOUND_404",
+    "GET_ORDER_NOT_FOUND_500",
+    "GET_ORDER_BAD_REQUEST",
+    "UPDATE_ORDER_STATUS_NOT_FETCHED",
+    "UPDATE_ORDER_STATUS_NOT_UPDATED",
+    "UPDATE_ORDER_STATUS_BAD_REQUEST",
+    "UPDATE_ORDER_STATUS_NOT_FOUND",
+    "UPDATE_ORDER_STATUS_CONFLICT",
+    "UPDATE_ORDER_STATUS_PRECONDITION_FAILED",
+    "UPDATE_ORDER_STATUS_PRECONDITION_REQUIRED",
+    "GET_SUMMARY_NOT_FETCHED",
+    "GET_SUMMARY_CUSTOMER_NOT_FOUND",
+    "GET_SUMMARY_NOT_FOUND_500",
+    "GET_SUMMARY_BAD_REQUEST",
+]
@@ -0,0 +1,38 @@
+"""
+This module contains the startup and shutdown of the orders service, run by the lifespan of `common.app`
+once the database pool is open: the map of the order statuses and the maintenance of the order partitions.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from orders.config import Settings
+from orders.crud import (
+    init_order_statuses,
+    start_partition_maintenance,
+    stop_partition_maintenance,
+)
+
+
+@asynccontextmanager
+async def orders_lifespan(settings: Settings) -> AsyncIterator[None]:
+    """
+    Starts and stops the orders service.
+
+    Args:
+        settings (Settings): The settings of the service.
+    """
+    await init_order_statuses()
+    if settings.partition_maintenance_interval > 0:
+        start_partition_maintenance(
+            settings.partition_maintenance_interval,
+            settings.partition_months_ahead,
+            settings.partition_retention_months,
+        )
+    yield
+    await stop_partition_maintenance()
+
+
+__all__: list[str] = [
+    "orders_lifespan",
+]
@@ -1,5 +1,7 @@
-# from .orders import router as orders_router
+from .orders import router as orders_router
+from .summaries import router as summaries_router
 
 __all__: list[str] = [
-    # "orders_router",
+    "orders_router",
+    "summaries_router",
 ]
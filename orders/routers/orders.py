@@ -0,0 +1,155 @@
+"""
+This module contains the routes for the orders resource.
+It includes routes for creating a new order, retrieving an order by id, updating the status of an order,
+and retrieving the orders of a customer, the most recent first.
+The routes return the appropriate response data using schemas for the request data and response data.
+Single order responses carry a strong ETag with the version of the order, and status updates require it
+in the `If-Match` header, so that concurrent updates are rejected with 412 Precondition Failed instead of lost.
+"""
+
+from datetime import datetime
+from fastapi import APIRouter, Query, Request, Response, status
+from common.conditional import etag_version, make_etag
+from common.ids import ID
+from common.negotiation import NegotiatedRoute
+from common.validations import require_json_accept
+from orders.schemas import (
+    CreateOrderSchema,
+    GetCustomerOrdersSchema,
+    GetOrderSchema,
+    UpdateOrderStatusSchema,
+)
+from orders.crud import (
+    db_create_order,
+    db_get_order_by_id,
+    db_get_orders_by,
+    db_update_order_status,
+)
+from orders.exceptions import UPDATE_ORDER_STATUS_PRECONDITION_REQUIRED
+
+router = APIRouter(
+    prefix="/api/orders",
+    tags=["orders"],
+    route_class=NegotiatedRoute,
+)
+
+
+@router.post(
+    "/",
+    response_model=GetOrderSchema,
+    status_code=status.HTTP_201_CREATED,
+)
+@require_json_accept
+async def create_order(
+    request: Request, response: Response, order_data: CreateOrderSchema
+) -> GetOrderSchema:
+    """
+    Create a new order.
+
+    Args:
+        request (Request): The incoming request object.
+        response (Response): The outgoing response object, used to set the ETag header.
+        order_data (CreateOrderSchema): The order data to create.
+
+    Returns:
+        GetOrderSchema: The created order data.
+    """
+    order, version = await db_create_order(order_data)
+    response.headers["ETag"] = make_etag(order["id"], version)
+    return order
+
+
+@router.get(
+    "/{order_id}",
+    response_model=GetOrderSchema,
+    status_code=status.HTTP_200_OK,
+)
+@require_json_accept
+async def get_order_by_id(
+    request: Request, response: Response, order_id: ID
+) -> GetOrderSchema:
+    """
+    Get an order by its ID.
+
+    Args:
+        request (Request): The incoming request object.
+        response (Response): The outgoing response object, used to set the ETag header.
+        order_id (ID): The ID of the order to retrieve.
+
+    Returns:
+        GetOrderSchema: The order data.
+    """
+    order, version = await db_get_order_by_id(order_id)
+    response.headers["ETag"] = make_etag(order_id, version)
+    return order
+
+
+@router.patch(
+    "/{order_id}/status",
+    response_model=GetOrderSchema,
+    status_code=status.HTTP_200_OK,
+)
+@require_json_accept
+async def update_order_status(
+    request: Request,
+    response: Response,
+    order_id: ID,
+    status_data: UpdateOrderStatusSchema,
+) -> GetOrderSchema:
+    """
+    Update the status of an order, e.g. approve it.
+    The `If-Match` header must carry the ETag of the order as last read: if the order has been updated since,
+    412 Precondition Failed is returned, and 409 Conflict if the order cannot move to the status.
+
+    Args:
+        request (Request): The incoming request object.
+        response (Response): The outgoing response object, used to set the ETag header.
+        order_id (ID): The ID of the order to update.
+        status_data (UpdateOrderStatusSchema): The new status.
+
+    Returns:
+        GetOrderSchema: The updated order data.
+    """
+    version: int | None = etag_version(request.headers.get("If-Match", ""), order_id)
+    if version is None:
+        raise UPDATE_ORDER_STATUS_PRECONDITION_REQUIRED
+
+    order, new_version = await db_update_order_status(
+        order_id, status_data.status, version
+    )
+    response.headers["ETag"] = make_etag(order_id, new_version)
+    return order
+
+
+@router.get(
+    "/",
+    response_model=GetCustomerOrdersSchema,
+    status_code=status.HTTP_200_OK,
+)
+@require_json_accept
+async def get_orders_by(
+    request: Request,
+    customer_id: ID,
+    since: datetime | None = None,
+    limit: int | None = Query(None, ge=1, le=1000),
+) -> GetCustomerOrdersSchema:
+    """
+    Get the orders of a customer, the most recent first.
+    Giving `since` limits the lookup to the recent partitions of the orders.
+
+    Args:
+        request (Request): The incoming request object.
+        customer_id (ID): The ID of the customer.
+        since (datetime | None, optional): The earliest creation time of the orders. Defaults to None.
+        limit (int | None, optional): The maximum number of orders. Defaults to None, i.e. all.
+
+    Returns:
+        GetCustomerOrdersSchema: The orders data.
+    """
+    orders: GetCustomerOrdersSchema = await db_get_orders_by(customer_id, since, limit)
+    return orders
+
+
+__all__: list[str] = [
+    "router",
+]
@@ -0,0 +1,48 @@
+"""
+This module contains the routes for the order summaries of the customers resource.
+It includes a route for retrieving the summary of the orders of a customer,
+which reads a single row maintained with the orders instead of aggregating them.
+The routes return the appropriate response data using schemas for the response data.
+"""
+
+from fastapi import APIRouter, Request, status
+from common.ids import ID
+from common.negotiation import NegotiatedRoute
+from common.validations import require_json_accept
+from orders.schemas import GetCustomerOrderSummarySchema
+from orders.crud import db_get_customer_summary
+
+router = APIRouter(
+    prefix="/api/customers",
+    tags=["customers"],
+    route_class=NegotiatedRoute,
+)
+
+
+@router.get(
+    "/{customer_id}/summary",
+    response_model=GetCustomerOrderSummarySchema,
+    status_code=status.HTTP_200_OK,
+)
+@require_json_accept
+async def get_customer_summary(
+    request: Request, customer_id: ID
+) -> GetCustomerOrderSummarySchema:
+    """
+    Get the summary of the orders of a customer: the number of orders, their total value and the last order time.
+    The voided orders are not counted.
+
+    Args:
+        request (Request): The incoming request object.
+        customer_id (ID): The ID of the customer.
+
+    Returns:
+        GetCustomerOrderSummarySchema: The summary data.
+    """
+    summary: GetCustomerOrderSummarySchema = await db_get_customer_summary(customer_id)
+    return summary
+
+
+__all__: list[str] = [
+    "router",
+]
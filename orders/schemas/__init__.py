@@ -3,6 +3,8 @@ from .orders import (
     CreateOrderSchema,
     GetOrderSchema,
     GetCustomerOrdersSchema,
+    GetCustomerOrderSummarySchema,
+    UpdateOrderStatusSchema,
     CreateOrderItemSchema,
     GetOrderItemSchema,
 )
@@ -12,6 +14,8 @@ __all__: list[str] = [
     "CreateOrderSchema",
     "GetOrderSchema",
     "GetCustomerOrdersSchema",
+    "GetCustomerOrderSummarySchema",
+    "UpdateOrderStatusSchema",
     "CreateOrderItemSchema",
     "GetOrderItemSchema",
 ]
@@ -6,7 +6,12 @@ The schema includes field validation and documentation examples for each field.
 """
 
 import re
-from pydantic import BaseModel, ConfigDict, UUID4, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
+from common.ids import ID
+
+
+# Special chars allowed in names besides alphanumerics, compiled once at import
+_NAME_ALLOWED_SPECIAL_CHARS: re.Pattern[str] = re.compile(r"[ \\/\.,;\-+()_%@!\'\"]")
 
 
 class ItemSchema(BaseModel):
@@ -14,7 +19,7 @@ class ItemSchema(BaseModel):
     Item object
     """
 
-    id: UUID4
+    id: ID
     name: str
     price: float
 
@@ -28,7 +33,7 @@ class ItemSchema(BaseModel):
         name: str = v.strip()
         if not name:
             raise ValueError("Field 'name' cannot be empty")
-        if not re.sub(r"[ \\/\.,;\-+()_%@!\'\"]", "", name).isalnum():
+        if not _NAME_ALLOWED_SPECIAL_CHARS.sub("", name).isalnum():
             raise ValueError("Field 'name' must contain only allowed chars")
         if len(name) > 512:
             raise ValueError("Field 'name' must not be greater than 512 characters")
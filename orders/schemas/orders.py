@@ -6,13 +6,17 @@ The GetOrderItemSchema class represents an order item to be returned with fields
 
 The CreateOrderSchema class represents an order to be created with fields for customer_id and items.
 The GetOrderSchema class represents an order to be returned with fields for id, customer_id, items, and created_at.
+The UpdateOrderStatusSchema class represents a status change of an order with a field for status.
 The GetCustomerOrdersSchema class represents a list of customer's orders to be returned.
+The GetCustomerOrderSummarySchema class represents the summary of a customer's orders to be returned
+with fields for customer_id, order_count, lifetime_value, and last_order_at.
 
 Each class includes field validation and documentation examples for each field.
 """
 
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict, UUID4, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
+from common.ids import ID
 
 
 class CreateOrderItemSchema(BaseModel):
@@ -20,7 +24,7 @@ class CreateOrderItemSchema(BaseModel):
     Create Order Item request object
     """
 
-    item_id: UUID4
+    item_id: ID
     quantity: int
 
     @field_validator("quantity")
@@ -48,7 +52,7 @@ class GetOrderItemSchema(CreateOrderItemSchema):
     Get Order Item response object
     """
 
-    id: UUID4
+    id: ID
     name: str
     price: float
 
@@ -72,7 +76,7 @@ class CreateOrderSchema(BaseModel):
     Create Order request object
     """
 
-    customer_id: UUID4
+    customer_id: ID
     items: list[CreateOrderItemSchema]
 
     @field_validator("items")
@@ -107,7 +111,7 @@ class GetOrderSchema(BaseModel):
     Get Order response object
     """
 
-    id: UUID4
+    id: ID
     created_at: datetime
     status: str
     items: list[GetOrderItemSchema]
@@ -134,6 +138,25 @@ class GetOrderSchema(BaseModel):
     }
 
 
+class UpdateOrderStatusSchema(BaseModel):
+    """
+    Update Order Status request object
+    """
+
+    status: str
+
+    model_config: ConfigDict = {
+        "extra": "forbid",
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "status": "Approved",
+                }
+            ]
+        },
+    }
+
+
 class GetCustomerOrdersSchema(BaseModel):
     """
     Get Customer Orders response object
@@ -167,10 +190,36 @@ class GetCustomerOrdersSchema(BaseModel):
     }
 
 
+class GetCustomerOrderSummarySchema(BaseModel):
+    """
+    Get Customer Order Summary response object
+    """
+
+    customer_id: ID
+    order_count: int
+    lifetime_value: float
+    last_order_at: datetime | None
+
+    model_config: ConfigDict = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "customer_id": "00000000-0000-0000-0000-000000000000",
+                    "order_count": 42,
+                    "lifetime_value": 42.0,
+                    "last_order_at": "2022-01-01T00:00:00+0000",
+                }
+            ]
+        },
+    }
+
+
 __all__: list[str] = [
     "CreateOrderItemSchema",
     "GetOrderItemSchema",
     "CreateOrderSchema",
     "GetOrderSchema",
+    "UpdateOrderStatusSchema",
     "GetCustomerOrdersSchema",
+    "GetCustomerOrderSummarySchema",
 ]
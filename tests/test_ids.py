@@ -0,0 +1,51 @@
+"""
+Tests of the 422 responses for invalid IDs, which the clients and the Robot Framework suite assert on.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from customers.main import app
+
+# A version 1 UUID
+V1_ID: str = "8f4b07e0-cbf1-11f1-9ea6-02fc00000001"
+
+
+@pytest.fixture(scope="module")
+def client() -> TestClient:
+    # Without the lifespan: the IDs are validated before any database access
+    return TestClient(app)
+
+
+def test_malformed_id(client: TestClient) -> None:
+    response = client.get("/api/customers/abc", headers={"accept": "application/json"})
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [
+            {
+                "type": "uuid_parsing",
+                "loc": ["path", "customer_id"],
+                "msg": "Input should be a valid UUID, invalid length: found 3",
+                "input": "abc",
+                "ctx": {"error": "invalid length: found 3"},
+            }
+        ]
+    }
+
+
+def test_unsupported_id_version(client: TestClient) -> None:
+    response = client.get(
+        f"/api/customers/{V1_ID}", headers={"accept": "application/json"}
+    )
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [
+            {
+                "type": "uuid_version",
+                "loc": ["path", "customer_id"],
+                "msg": "UUID version 4 or 7 expected",
+                "input": V1_ID,
+                "ctx": {"expected_version": [4, 7]},
+            }
+        ]
+    }
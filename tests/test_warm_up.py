@@ -0,0 +1,63 @@
+"""
+Tests that the connection warm-ups keep the hot read statements prepared. They need the database
+of `DATABASE_URL` with at least one customer and one order, and are skipped without it.
+"""
+
+import asyncio
+
+import psycopg
+import pytest
+
+from common.database.postgresql import (
+    close_db_connection,
+    init_db_connection,
+    open_db_connection,
+    pool_connection,
+)
+from customers.config import settings
+from customers.crud import db_warm_up_connection as warm_up_customers_connection
+from orders.crud import db_warm_up_connection as warm_up_orders_connection
+
+# The functions of the statements each warm-up must leave prepared
+HOT_FUNCTIONS: tuple[bytes, ...] = (
+    b"get_customer_by_id(",
+    b"get_customer_version(",
+    b"get_customer_by(",
+    b"get_customer_changes(",
+    b"get_order_by_id(",
+    b"get_customer_orders(",
+    b"get_customer_order_summary(",
+)
+
+
+def _has_sample_rows() -> bool:
+    try:
+        with psycopg.connect(settings.database_url, connect_timeout=2) as connection:
+            return all(
+                connection.execute(f"select exists (select from {table})").fetchone()[0]
+                for table in ("customers", "orders")
+            )
+    except psycopg.Error:
+        return False
+
+
+@pytest.mark.skipif(
+    not _has_sample_rows(), reason="needs a database with a customer and an order"
+)
+def test_warm_up_prepares_hot_statements() -> None:
+    async def prepared_queries() -> list[bytes]:
+        init_db_connection(
+            settings.database_url,
+            {"min_size": 1, "max_size": 1},
+            [warm_up_customers_connection, warm_up_orders_connection],
+        )
+        try:
+            await open_db_connection(wait=True)
+            async with pool_connection(5.0) as connection:
+                return [key[0] for key in connection._prepared._names]
+        finally:
+            await close_db_connection()
+
+    queries: list[bytes] = asyncio.run(prepared_queries())
+    for function in HOT_FUNCTIONS:
+        assert any(function in query for query in queries), function
@@ -0,0 +1,352 @@
+"""
+This module contains the micro-benchmarks of the request and response hot path.
+
+It measures, without a server or a database:
+- the validation of `CreateCustomerSchema` and `ItemSchema`, including the name validators
+- the construction and JSON dumping of `GetCustomersSchema` and `GetCustomerOrdersSchema` from 1 to 10k elements
+- the rendering of `AppException.content()`
+- the `require_json_accept` wrapper, accepting and rejecting a request
+
+Each benchmark is calibrated to run at least `--min-time` seconds per round, and the median time per operation
+over `--rounds` rounds is reported. The results can be saved as JSON with `--output` and compared against
+a baseline saved the same way, e.g. before a dependency upgrade, with `--baseline`: the command fails
+if a benchmark is slower than the baseline by more than `--threshold`.
+
+Usage:
+    python -m tools.benchmarks --output baseline.json
+    python -m tools.benchmarks --baseline baseline.json --threshold 0.1
+    python -m tools.benchmarks --filter customers --json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from importlib.metadata import version
+from typing import Any, Callable
+from uuid import uuid4
+
+from starlette.requests import Request
+
+from common.exceptions import MUST_ACCEPT_JSON, AppException
+from common.validations import require_json_accept
+from customers.schemas import CreateCustomerSchema, GetCustomersSchema
+from orders.schemas import GetCustomerOrdersSchema, ItemSchema
+
+SIZES: tuple[int, ...] = (1, 100, 10000)
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Time per operation of a benchmark
+    """
+
+    name: str
+    median_us: float
+    min_us: float
+    stdev_us: float
+    rounds: int
+    loops: int
+
+
+def _customers(size: int) -> dict[str, Any]:
+    return {
+        "customers": [
+            {
+                "id": str(uuid4()),
+                "name": f"Customer O'Neil-Smith {index}",
+                "email": f"customer.{index}@example.com",
+            }
+            for index in range(size)
+        ]
+    }
+
+
+def _orders(size: int) -> dict[str, Any]:
+    return {
+        "orders": [
+            {
+                "id": str(uuid4()),
+                "created_at": "2024-01-01T00:00:00+00:00",
+                "status": "New",
+                "items": [
+                    {
+                        "id": str(uuid4()),
+                        "item_id": str(uuid4()),
+                        "name": f"Item {item}",
+                        "price": 42.5,
+                        "quantity": item + 1,
+                    }
+                    for item in range(3)
+                ],
+            }
+            for _ in range(size)
+        ]
+    }
+
+
+def _request(accept: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "query_string": b"",
+            "headers": [(b"accept", accept.encode())],
+        }
+    )
+
+
+def _run_coroutine(coroutine: Any) -> Any:
+    """
+    Runs a coroutine that never suspends without an event loop, to measure the coroutine itself.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    raise Exception("Coroutine suspended")
+
+
+def _benchmarks() -> dict[str, Callable[[], Any]]:
+    """
+    Returns the benchmarks by name, with their inputs prepared.
+    """
+    benchmarks: dict[str, Callable[[], Any]] = {}
+
+    customer: dict[str, Any] = {
+        "name": "John O'Neil-Smith",
+        "email": "john@example.com",
+    }
+    customer_json: str = json.dumps(customer)
+    item: dict[str, Any] = {"id": str(uuid4()), "name": "Foo (50% off)", "price": 42.0}
+    benchmarks["customers.create.validate"] = lambda: (
+        CreateCustomerSchema.model_validate(customer)
+    )
+    benchmarks["customers.create.validate_json"] = lambda: (
+        CreateCustomerSchema.model_validate_json(customer_json)
+    )
+    benchmarks["catalog.item.validate"] = lambda: ItemSchema.model_validate(item)
+
+    for size in SIZES:
+        customers: dict[str, Any] = _customers(size)
+        customers_model: GetCustomersSchema = GetCustomersSchema.model_validate(
+            customers
+        )
+        orders: dict[str, Any] = _orders(size)
+        orders_model: GetCustomerOrdersSchema = GetCustomerOrdersSchema.model_validate(
+            orders
+        )
+        benchmarks[f"customers.list.validate[{size}]"] = (
+            lambda customers=customers: GetCustomersSchema.model_validate(customers)
+        )
+        benchmarks[f"customers.list.dump_json[{size}]"] = (
+            customers_model.model_dump_json
+        )
+        benchmarks[f"orders.list.validate[{size}]"] = (
+            lambda orders=orders: GetCustomerOrdersSchema.model_validate(orders)
+        )
+        benchmarks[f"orders.list.dump_json[{size}]"] = orders_model.model_dump_json
+
+    benchmarks["exceptions.content"] = MUST_ACCEPT_JSON.content
+
+    @require_json_accept
+    async def endpoint(request: Request) -> None:
+        return None
+
+    accepted: Request = _request("application/json")
+    rejected: Request = _request("text/html")
+
+    def reject() -> None:
+        try:
+            _run_coroutine(endpoint(request=rejected))
+        except AppException:
+            pass
+
+    benchmarks["validations.require_json_accept.accept"] = lambda: _run_coroutine(
+        endpoint(request=accepted)
+    )
+    benchmarks["validations.require_json_accept.reject"] = reject
+    return benchmarks
+
+
+def run_benchmark(
+    name: str, func: Callable[[], Any], rounds: int = 7, min_time: float = 0.05
+) -> BenchmarkResult:
+    """
+    Measures the time per call of a function.
+
+    Args:
+        name (str): The name of the benchmark.
+        func (Callable[[], Any]): The function to measure.
+        rounds (int, optional): The number of measured rounds. Defaults to 7.
+        min_time (float, optional): The minimum duration of a round in seconds. Defaults to 0.05.
+
+    Returns:
+        BenchmarkResult: The median, minimum and standard deviation of the time per call.
+    """
+    # Calibrate the number of calls per round, which also warms up caches
+    loops: int = 1
+    while True:
+        started: float = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+
+    times: list[float] = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - started) / loops * 1e6)
+
+    return BenchmarkResult(
+        name=name,
+        median_us=statistics.median(times),
+        min_us=min(times),
+        stdev_us=statistics.stdev(times) if len(times) > 1 else 0.0,
+        rounds=rounds,
+        loops=loops,
+    )
+
+
+def run_benchmarks(
+    name_filter: str = "", rounds: int = 7, min_time: float = 0.05
+) -> dict[str, Any]:
+    """
+    Runs the benchmarks whose name contains the name filter.
+
+    Returns:
+        dict[str, Any]: The environment (Python and package versions) and the results.
+    """
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {
+            package: version(package)
+            for package in ("fastapi", "pydantic", "pydantic-core")
+        },
+        "results": [
+            asdict(run_benchmark(name, func, rounds, min_time))
+            for name, func in _benchmarks().items()
+            if name_filter in name
+        ],
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """
+    Compares the median times of the results with the baseline.
+
+    Args:
+        results (dict[str, Any]): The results of `run_benchmarks`.
+        baseline (dict[str, Any]): The baseline results, saved from `run_benchmarks`.
+        threshold (float): The relative slowdown above which a benchmark regressed, e.g. 0.1 for 10%.
+
+    Returns:
+        list[dict[str, Any]]: The name, baseline and current median, ratio and regression flag of the benchmarks
+            present in both.
+    """
+    base: dict[str, float] = {
+        result["name"]: result["median_us"] for result in baseline["results"]
+    }
+    comparison: list[dict[str, Any]] = []
+    for result in results["results"]:
+        if result["name"] not in base:
+            continue
+        ratio: float = result["median_us"] / base[result["name"]]
+        comparison.append(
+            {
+                "name": result["name"],
+                "baseline_us": base[result["name"]],
+                "median_us": result["median_us"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return comparison
+
+
+def _print_results(results: dict[str, Any], comparison: list[dict[str, Any]]) -> None:
+    """
+    Prints the results, and their comparison with the baseline if any, as a table.
+    """
+    packages: str = ", ".join(f"{k} {v}" for k, v in results["packages"].items())
+    print(f"Python {results['python']}, {packages}")
+    print()
+    compared: dict[str, dict[str, Any]] = {entry["name"]: entry for entry in comparison}
+    for result in results["results"]:
+        line: str = (
+            f"  {result['median_us']:12.2f} us  ±{result['stdev_us']:9.2f}  {result['name']}"
+        )
+        entry: dict[str, Any] | None = compared.get(result["name"])
+        if entry is not None:
+            line += f"  ({entry['ratio']:.2f}x baseline{', REGRESSION' if entry['regression'] else ''})"
+        print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.benchmarks",
+        description="Run the micro-benchmarks of the schemas, validators, exceptions and serialization.",
+    )
+    parser.add_argument(
+        "--filter", default="", help="run only the benchmarks containing this text"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=7, help="the number of measured rounds"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="the minimum duration of a round in seconds",
+    )
+    parser.add_argument("--output", help="save the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="the relative slowdown that fails the comparison, e.g. 0.1 for 10%%",
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results: dict[str, Any] = run_benchmarks(args.filter, args.rounds, args.min_time)
+    comparison: list[dict[str, Any]] = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            comparison = compare(results, json.load(file), args.threshold)
+        results["comparison"] = comparison
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results, comparison)
+    return 1 if any(entry["regression"] for entry in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+__all__: list[str] = [
+    "BenchmarkResult",
+    "compare",
+    "run_benchmark",
+    "run_benchmarks",
+]
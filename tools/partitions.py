@@ -0,0 +1,188 @@
+"""
+This module contains the maintenance command of the partitions of the orders tables (see `db_scripts/partitioning.sql`).
+
+- `list` shows the partitions of `orders` and `order_items`, with their size and estimated number of rows,
+  and the archived ones
+- `create` creates the monthly partitions up to a number of months ahead, or from a past month, e.g. before
+  loading historical orders, which would otherwise fall into the default partition
+- `archive` detaches the partitions older than the retention and moves them to the `ecommerce_archive` schema;
+  with `--export-dir`, every archived table is then exported to a gzip compressed CSV file and dropped,
+  which keeps the history out of the database at a fraction of its size
+
+The orders service runs `create` and `archive` periodically if PARTITION_MAINTENANCE_INTERVAL is set.
+
+Usage:
+    python -m tools.partitions list
+    python -m tools.partitions create --months-ahead 6 --since 2023-01-01
+    python -m tools.partitions archive --retention-months 24 --export-dir /var/backups/orders
+"""
+
+import argparse
+import gzip
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any
+
+import psycopg
+
+
+def list_partitions(database_url: str) -> list[dict[str, Any]]:
+    """
+    Returns the partitions of the orders tables and the archived tables.
+
+    Returns:
+        list[dict[str, Any]]: The schema, name, size in bytes and estimated number of rows of the tables.
+    """
+    with psycopg.connect(database_url) as connection:
+        rows: list[tuple[Any, ...]] = connection.execute(
+            "SELECT n.nspname, c.relname, pg_total_relation_size(c.oid), c.reltuples::bigint"
+            "  FROM pg_class c"
+            "  JOIN pg_namespace n ON n.oid = c.relnamespace"
+            " WHERE c.relkind = 'r'"
+            "   AND n.nspname IN ('ecommerce', 'ecommerce_archive')"
+            "   AND c.relname ~ '^(orders|order_items)_(p[0-9]{6}|default)$'"
+            " ORDER BY n.nspname, c.relname"
+        ).fetchall()
+    return [
+        {"schema": row[0], "name": row[1], "size": row[2], "rows": max(row[3], 0)}
+        for row in rows
+    ]
+
+
+def create_partitions(
+    database_url: str, months_ahead: int, since: datetime | None = None
+) -> int:
+    """
+    Creates the missing monthly partitions, from the month of `since` or the current one, up to months ahead.
+
+    Returns:
+        int: The number of partitions created.
+    """
+    with psycopg.connect(database_url) as connection:
+        record: tuple[Any, ...] | None = connection.execute(
+            "SELECT ecommerce.create_order_partitions(%s, %s)",
+            [months_ahead, since or datetime.now(timezone.utc)],
+        ).fetchone()
+    return record[0] if record else 0
+
+
+def archive_partitions(
+    database_url: str, retention_months: int, export_dir: str | None = None
+) -> list[str]:
+    """
+    Archives the partitions older than the retention, and exports and drops the archived tables if requested.
+
+    Args:
+        database_url (str): The URL of the database.
+        retention_months (int): The number of past months to keep in the partitioned tables.
+        export_dir (str | None, optional): The directory to export the archived tables to,
+            as `<table>.csv.gz` files with a header, before dropping them. Defaults to None, i.e. kept.
+
+    Returns:
+        list[str]: The archived tables.
+    """
+    with psycopg.connect(database_url) as connection:
+        archived: list[str] = [
+            row[0]
+            for row in connection.execute(
+                "SELECT ecommerce.archive_order_partitions(%s)", [retention_months]
+            ).fetchall()
+        ]
+        connection.commit()
+        if export_dir is None:
+            return archived
+
+        # Including the tables archived by the service
+        tables: list[str] = [
+            f"{partition['schema']}.{partition['name']}"
+            for partition in list_partitions(database_url)
+            if partition["schema"] == "ecommerce_archive"
+        ]
+        os.makedirs(export_dir, exist_ok=True)
+        for table in tables:
+            path: str = os.path.join(export_dir, f"{table.split('.')[1]}.csv.gz")
+            # The file is complete before the table is dropped
+            with connection.cursor() as cursor, gzip.open(path + ".tmp", "wb") as file:
+                with cursor.copy(
+                    f"COPY {table} TO STDOUT (FORMAT csv, HEADER)"
+                ) as copy:
+                    for block in copy:
+                        file.write(block)
+            os.replace(path + ".tmp", path)
+            connection.execute(f"DROP TABLE {table}")
+            connection.commit()
+    return archived
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.partitions",
+        description="Maintain the monthly partitions of the orders tables.",
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("DATABASE_URL"),
+        help="the database (default: DATABASE_URL)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the partitions and archived tables")
+    create = commands.add_parser("create", help="create the upcoming partitions")
+    create.add_argument(
+        "--months-ahead",
+        type=int,
+        default=3,
+        help="the number of months after the current one (default: 3)",
+    )
+    create.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="create the partitions from this date, e.g. 2023-01-01",
+    )
+    archive = commands.add_parser("archive", help="archive the old partitions")
+    archive.add_argument(
+        "--retention-months",
+        type=int,
+        required=True,
+        help="the number of past months to keep",
+    )
+    archive.add_argument(
+        "--export-dir",
+        help="export the archived tables to gzip compressed CSV files in this directory, and drop them",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    if args.command == "create":
+        since: datetime | None = args.since
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        created: int = create_partitions(args.database_url, args.months_ahead, since)
+        print(f"{created} partitions created")
+    elif args.command == "archive":
+        archived: list[str] = archive_partitions(
+            args.database_url, args.retention_months, args.export_dir
+        )
+        print(f"{len(archived)} partitions archived")
+        for table in archived:
+            print(f"  {table}")
+    else:
+        for partition in list_partitions(args.database_url):
+            print(
+                f"  {partition['size'] / 2**20:>10,.1f} MiB  {partition['rows']:>12,} rows  "
+                f"{partition['schema']}.{partition['name']}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+__all__: list[str] = [
+    "archive_partitions",
+    "create_partitions",
+    "list_partitions",
+]
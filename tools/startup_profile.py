@@ -0,0 +1,241 @@
+"""
+This module contains the startup profiling command of the service entry points.
+
+It reports where the cold start of a service goes:
+- the import time of the modules imported by the entry point, measured in a fresh interpreter with `-X importtime`
+- the in-process import time of the entry point
+- the time to run the lifespan startup (cache, connection pool) and shutdown
+- the time of the first request, sent in-process to the ASGI application
+
+Usage:
+    python -m tools.startup_profile customers.main:app
+    python -m tools.startup_profile orders.main:app --path /health --top 20
+    python -m tools.startup_profile gateway.main:app --json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+
+@dataclass
+class ImportTime:
+    """
+    Import time of a module imported directly by the entry point, including its own imports
+    """
+
+    module: str
+    cumulative_ms: float
+
+
+@dataclass
+class StartupProfile:
+    """
+    Startup time breakdown of a service entry point
+    """
+
+    target: str
+    import_total_ms: float = 0.0
+    imports: list[ImportTime] = field(default_factory=list)
+    import_ms: float = 0.0
+    startup_ms: float = 0.0
+    first_request_path: str = ""
+    first_request_status: int = 0
+    first_request_ms: float = 0.0
+    shutdown_ms: float = 0.0
+
+    @property
+    def time_to_first_request_ms(self) -> float:
+        return self.import_ms + self.startup_ms + self.first_request_ms
+
+
+def _profile_imports(module: str) -> tuple[float, list[ImportTime]]:
+    """
+    Imports the module in a fresh interpreter with `-X importtime` and parses its report.
+
+    Returns:
+        tuple[float, list[ImportTime]]: The cumulative import time of the module and
+            the import times of the modules it imports directly, slowest first.
+
+    Raises:
+        Exception: If the module cannot be imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"Unable to import {module}:\n{result.stderr}")
+
+    # Report lines look like "import time:   self [us] | cumulative | <indent>module",
+    # children are reported before their parent and indented by two spaces per level
+    entries: list[tuple[int, str, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|", 2)
+        stripped: str = name.lstrip(" ")
+        level: int = (len(name) - len(stripped) - 1) // 2
+        entries.append((level, stripped, int(cumulative)))
+
+    total_us: int = 0
+    children: list[ImportTime] = []
+    pending: list[ImportTime] = []
+    for level, name, cumulative in entries:
+        if level == 0:
+            if name == module:
+                total_us = cumulative
+                children = pending
+            pending = []
+        elif level == 1:
+            pending.append(ImportTime(module=name, cumulative_ms=cumulative / 1000))
+
+    children.sort(key=lambda entry: entry.cumulative_ms, reverse=True)
+    return total_us / 1000, children
+
+
+async def _first_request(app: Any, path: str) -> int:
+    """
+    Sends a GET request to the ASGI application in-process and returns the response status.
+    """
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("127.0.0.1", 80),
+        "client": ("127.0.0.1", 0),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"127.0.0.1"), (b"accept", b"application/json")],
+        "state": {},
+    }
+    response_status: int = 0
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal response_status
+        if message["type"] == "http.response.start":
+            response_status = message["status"]
+
+    await app(scope, receive, send)
+    return response_status
+
+
+async def _profile_lifespan(app: Any, profile: StartupProfile) -> None:
+    """
+    Runs the lifespan of the application and sends the first request in between.
+    """
+    started: float = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        profile.startup_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        profile.first_request_status = await _first_request(
+            app, profile.first_request_path
+        )
+        profile.first_request_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+    profile.shutdown_ms = (time.perf_counter() - started) * 1000
+
+
+def profile_startup(target: str, path: str = "/health") -> StartupProfile:
+    """
+    Profiles the cold start of an ASGI application.
+
+    Args:
+        target (str): The application in the "<module>:<attribute>" format, e.g. "customers.main:app".
+        path (str, optional): The path of the first request. Defaults to "/health".
+
+    Returns:
+        StartupProfile: The startup time breakdown.
+
+    Raises:
+        Exception: If the target is not in the "<module>:<attribute>" format or cannot be imported.
+    """
+    module, _, attribute = target.partition(":")
+    if not module or not attribute:
+        raise Exception("Target must be in the <module>:<attribute> format")
+
+    profile = StartupProfile(target=target, first_request_path=path)
+    profile.import_total_ms, profile.imports = _profile_imports(module)
+
+    started: float = time.perf_counter()
+    app: Any = getattr(importlib.import_module(module), attribute)
+    profile.import_ms = (time.perf_counter() - started) * 1000
+
+    asyncio.run(_profile_lifespan(app, profile))
+    return profile
+
+
+def _print_profile(profile: StartupProfile, top: int) -> None:
+    """
+    Prints the startup time breakdown as a table.
+    """
+    print(f"Startup profile of {profile.target}")
+    print()
+    print(f"Imports ({profile.import_total_ms:.1f} ms in a fresh interpreter):")
+    for entry in profile.imports[:top]:
+        print(f"  {entry.cumulative_ms:9.1f} ms  {entry.module}")
+    if len(profile.imports) > top:
+        rest: float = sum(entry.cumulative_ms for entry in profile.imports[top:])
+        print(f"  {rest:9.1f} ms  ({len(profile.imports) - top} more)")
+    print()
+    print("Timeline:")
+    print(f"  {profile.import_ms:9.1f} ms  import")
+    print(f"  {profile.startup_ms:9.1f} ms  lifespan startup")
+    print(
+        f"  {profile.first_request_ms:9.1f} ms  first request "
+        f"GET {profile.first_request_path} -> {profile.first_request_status}"
+    )
+    print(f"  {profile.time_to_first_request_ms:9.1f} ms  time to first request")
+    print(f"  {profile.shutdown_ms:9.1f} ms  lifespan shutdown")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.startup_profile",
+        description="Report the import-time and lifespan-time breakdown of a service entry point.",
+    )
+    parser.add_argument("target", help='the application, e.g. "customers.main:app"')
+    parser.add_argument(
+        "--path", default="/health", help="the path of the first request"
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="the number of imports to list"
+    )
+    parser.add_argument("--json", action="store_true", help="print the profile as JSON")
+    args = parser.parse_args(argv)
+
+    profile: StartupProfile = profile_startup(args.target, args.path)
+    if args.json:
+        result: dict[str, Any] = asdict(profile)
+        result["time_to_first_request_ms"] = profile.time_to_first_request_ms
+        print(json.dumps(result, indent=2))
+    else:
+        _print_profile(profile, args.top)
+    return 0 if profile.first_request_status < 400 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+
+__all__: list[str] = [
+    "ImportTime",
+    "StartupProfile",
+    "profile_startup",
+]